@@ -0,0 +1,131 @@
+"""
+Compare the original one-file-at-a-time upload with the pooled, concurrent uploader.
+
+A synthetic report folder shaped like a real run (JSON and HTML per tool plus a Checkov
+tree with one file per framework and check) is uploaded for several repositories:
+  legacy      new client per repository, container exists() check, serial uploads
+  pooled      shared client and connection pool, serial uploads
+  concurrent  shared client and pool, `--concurrency` uploads at a time
+  unchanged   the next run of the same repositories with identical reports; every file is
+              copied server-side from the previous run's folder instead of uploaded
+
+By default an in-memory Azurite stand-in (benchmarks/fake_blob_server.py) is started with
+`--latency-ms` of simulated round trip; pass --connection-string to use a running Azurite.
+
+Usage:
+    python benchmarks/bench_blob_upload.py [--repos 5] [--files 200] [--file-kb 16]
+        [--concurrency 8] [--latency-ms 5] [--output results.json]
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from benchmarks.fake_blob_server import start_server  # noqa: E402
+from modules.blob_uploader import BlobUploader, sanitize_container_name  # noqa: E402
+
+ACCOUNT_KEY = "Eby8vdM02xNOcqFeqCnf2P=="
+
+
+def make_report_dir(base, name, files, file_kb):
+    report_dir = os.path.join(base, name, "20240101_000000")
+    tools = ["gitleaks", "trufflehog", "semgrep", "syft", "grype", "bandit", "safety", "dependency-check", "hadolint"]
+    paths = [os.path.join("json", f"{tool}.json") for tool in tools]
+    paths += [os.path.join("html", f"{tool}.html") for tool in tools]
+    paths.append("summary.html")
+    i = 0
+    while len(paths) < files:
+        paths.append(os.path.join("html", "checkov", f"framework{i % 8}", f"check_{i}.json"))
+        i += 1
+    for rel in paths[:files]:
+        path = os.path.join(report_dir, rel)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(os.urandom(file_kb * 1024))
+    return report_dir
+
+
+def legacy_upload(report_dir, repo_name, connection_string):
+    """The upload loop as it was before the shared uploader."""
+    from azure.storage.blob import BlobServiceClient
+
+    blob_service_client = BlobServiceClient.from_connection_string(connection_string)
+    container_client = blob_service_client.get_container_client(sanitize_container_name(repo_name))
+    if not container_client.exists():
+        container_client.create_container()
+    for root, dirs, files in os.walk(report_dir):
+        for file in files:
+            abs_path = os.path.join(root, file)
+            rel_path = os.path.relpath(abs_path, report_dir)
+            with open(abs_path, "rb") as data:
+                container_client.upload_blob(f"{os.path.basename(report_dir)}/{rel_path}", data, overwrite=True)
+
+
+def timed(label, report_dirs, upload):
+    start = time.perf_counter()
+    stats = [upload(report_dir, name) for name, report_dir in report_dirs]
+    seconds = time.perf_counter() - start
+    files = sum(len(fs) for _, report_dir in report_dirs for _, _, fs in os.walk(report_dir))
+    if all(stats):
+        sent = sum(stat["bytes"] for stat in stats)
+    else:
+        # The legacy loop sends every file and returns nothing
+        sent = sum(os.path.getsize(os.path.join(root, f)) for _, report_dir in report_dirs for root, _, fs in os.walk(report_dir) for f in fs)
+    print(f"{label:<12}{seconds:>10.2f}{files / seconds:>12.0f}{sent / 1048576:>12.1f}")
+    return {"seconds": seconds, "files_per_second": files / seconds, "bytes_sent": sent}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark report uploads to Blob Storage")
+    parser.add_argument("--repos", type=int, default=5)
+    parser.add_argument("--files", type=int, default=200, help="Files per report folder")
+    parser.add_argument("--file-kb", type=int, default=16)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency-ms", type=float, default=5, help="Simulated round trip of the stand-in server")
+    parser.add_argument("--connection-string", default=None, help="Use a running Azurite instead of the stand-in")
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    connection_string = args.connection_string
+    if connection_string is None:
+        server, _ = start_server(latency_ms=args.latency_ms)
+        connection_string = (
+            f"DefaultEndpointsProtocol=http;AccountName=devstoreaccount1;AccountKey={ACCOUNT_KEY};"
+            f"BlobEndpoint=http://127.0.0.1:{server.server_port}/devstoreaccount1;"
+        )
+
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        def report_dirs(mode):
+            return [
+                (f"bench-{mode}-{i}", make_report_dir(workdir, f"{mode}-{i}", args.files, args.file_kb))
+                for i in range(args.repos)
+            ]
+
+        print(f"{'mode':<12}{'seconds':>10}{'files/s':>12}{'MB sent':>12}")
+        results["legacy"] = timed(
+            "legacy", report_dirs("legacy"), lambda d, n: legacy_upload(d, n, connection_string)
+        )
+        results["pooled"] = timed("pooled", report_dirs("pooled"), BlobUploader(connection_string, 1).upload_directory)
+        uploader = BlobUploader(connection_string, args.concurrency)
+        concurrent_dirs = report_dirs("concurrent")
+        results["concurrent"] = timed("concurrent", concurrent_dirs, uploader.upload_directory)
+        # Same content in a later report folder, as when nothing changed between two scans
+        next_dirs = []
+        for name, report_dir in concurrent_dirs:
+            next_dir = os.path.join(os.path.dirname(report_dir), "20240102_000000")
+            shutil.copytree(report_dir, next_dir)
+            next_dirs.append((name, next_dir))
+        results["unchanged"] = timed("unchanged", next_dirs, uploader.upload_directory)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=4)
+
+
+if __name__ == "__main__":
+    main()
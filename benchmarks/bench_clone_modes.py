@@ -0,0 +1,102 @@
+"""
+Compare clone time and disk use across history modes.
+
+For every mode the repository is cloned into a temporary folder, then `git log -p`
+walks the cloned history the way Gitleaks does, which triggers on-demand blob fetches
+in partial clones. Results are printed and optionally written as JSON.
+
+Usage:
+    python benchmarks/bench_clone_modes.py <repo-url> [--branch main] [--depth 200]
+        [--since 2024-01-01] [--repeat 3] [--output results.json]
+
+Local repositories must be given as file:// URLs; git ignores --depth and --filter for plain paths,
+and the source repository needs `git config uploadpack.allowFilter true` for partial clones.
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from modules.repo_manager import history_clone_args  # noqa: E402
+
+
+def dir_size(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for file in files:
+            fp = os.path.join(root, file)
+            if not os.path.islink(fp):
+                total += os.path.getsize(fp)
+    return total
+
+
+def run_clone(url, branch, clone_args, workdir):
+    target = os.path.join(workdir, "clone")
+    start = time.perf_counter()
+    subprocess.run(["git", "clone", "--quiet", "--branch", branch, *clone_args, url, target], check=True)
+    clone_seconds = time.perf_counter() - start
+    clone_bytes = dir_size(os.path.join(target, ".git"))
+    start = time.perf_counter()
+    log = subprocess.run(["git", "log", "-p", "--no-color"], cwd=target, capture_output=True, check=True)
+    history_seconds = time.perf_counter() - start
+    commits = int(subprocess.run(
+        ["git", "rev-list", "--count", "HEAD"], cwd=target, capture_output=True, text=True, check=True
+    ).stdout.strip())
+    result = {
+        "clone_seconds": clone_seconds,
+        "git_dir_bytes": clone_bytes,
+        "history_scan_seconds": history_seconds,
+        "git_dir_bytes_after_history_scan": dir_size(os.path.join(target, ".git")),
+        "history_patch_bytes": len(log.stdout),
+        "commits": commits,
+    }
+    shutil.rmtree(target)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark clone history modes")
+    parser.add_argument("url")
+    parser.add_argument("--branch", default="main")
+    parser.add_argument("--depth", type=int, default=200)
+    parser.add_argument("--since", default=None, help="Date for the 'since' mode (skipped if omitted)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    modes = {
+        "shallow": history_clone_args({"mode": "shallow"}),
+        "depth": history_clone_args({"mode": "depth", "depth": args.depth}),
+        "full": history_clone_args({"mode": "full"}),
+        # Plain full clone without --filter, the baseline the partial clones are measured against
+        "full-unfiltered": history_clone_args({"mode": "full"}, partial=False),
+    }
+    if args.since:
+        modes["since"] = history_clone_args({"mode": "since", "since": args.since})
+
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for label, clone_args in modes.items():
+            runs = [run_clone(args.url, args.branch, clone_args, workdir) for _ in range(args.repeat)]
+            results[label] = {key: statistics.median(run[key] for run in runs) for key in runs[0]}
+            results[label]["clone_args"] = clone_args
+    print(f"{'mode':<16}{'clone s':>10}{'.git MB':>10}{'history s':>12}{'.git MB after':>15}{'commits':>9}")
+    for label, r in results.items():
+        print(
+            f"{label:<16}{r['clone_seconds']:>10.2f}{r['git_dir_bytes'] / 1048576:>10.1f}"
+            f"{r['history_scan_seconds']:>12.2f}{r['git_dir_bytes_after_history_scan'] / 1048576:>15.1f}{r['commits']:>9}"
+        )
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=4)
+
+
+if __name__ == "__main__":
+    main()
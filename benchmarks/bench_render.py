@@ -0,0 +1,105 @@
+"""
+Micro-benchmark for HTML report rendering.
+
+Renders many small reports (as in Checkov's per-framework tree) and one large report twice:
+  legacy   new Environment and FileSystemLoader per report, whole HTML built as a string
+  shared   modules.json_to_html (shared environment, cached templates, streamed output)
+and prints the time per report and the peak memory of the large render.
+
+Usage:
+    python benchmarks/bench_render.py [--reports 200] [--large-items 50000] [--repeat 3]
+"""
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from jinja2 import Environment, FileSystemLoader, TemplateNotFound  # noqa: E402
+from modules.json_to_html import TEMPLATE_DIR, render_html_from_json  # noqa: E402
+
+
+def legacy_render(json_path, html_path, report_title="Security Report", scanner_name=None):
+    """The render path as it was before the shared environment."""
+    with open(json_path) as f:
+        data = json.load(f)
+    if isinstance(data, dict) and scanner_name and "tool_name" not in data:
+        data["tool_name"] = scanner_name.capitalize()
+    if isinstance(data, dict) and "results" in data:
+        items = data["results"]
+    elif isinstance(data, list):
+        items = data
+    else:
+        items = [data]
+    columns = sorted({key for item in items if isinstance(item, dict) for key in item})
+    env = Environment(loader=FileSystemLoader(TEMPLATE_DIR))
+    try:
+        template = env.get_template(f"{scanner_name}_template.html")
+    except TemplateNotFound:
+        template = env.get_template("report_template.html")
+    html = template.render(report_title=report_title, items=items, columns=columns, data=data,
+                           year=datetime.datetime.now().year)
+    with open(html_path, "w", encoding="utf-8") as f:
+        f.write(html)
+
+
+def make_reports(workdir, reports, large_items):
+    small = []
+    for i in range(reports):
+        path = os.path.join(workdir, f"small_{i}.json")
+        with open(path, "w") as f:
+            json.dump([{"RuleID": f"rule-{j}", "File": f"src/file_{j}.py", "StartLine": j, "Description": "Finding"}
+                       for j in range(20)], f, indent=4)
+        small.append(path)
+    large = os.path.join(workdir, "large.json")
+    with open(large, "w") as f:
+        json.dump([{"RuleID": f"rule-{j}", "File": f"src/file_{j}.py", "StartLine": j, "Description": "x" * 200}
+                   for j in range(large_items)], f, indent=4)
+    return small, large
+
+
+def time_small(render, small, workdir):
+    start = time.perf_counter()
+    for path in small:
+        render(path, os.path.join(workdir, "out.html"), "Report", "gitleaks")
+    return (time.perf_counter() - start) / len(small)
+
+
+def peak_large(render, large, workdir):
+    tracemalloc.start()
+    render(large, os.path.join(workdir, "large.html"), "Report", "gitleaks")
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark HTML report rendering")
+    parser.add_argument("--reports", type=int, default=200, help="Number of small reports")
+    parser.add_argument("--large-items", type=int, default=50000, help="Findings in the large report")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    renderers = {"legacy": legacy_render, "shared": render_html_from_json}
+    with tempfile.TemporaryDirectory() as workdir, contextlib.redirect_stdout(io.StringIO()):
+        small, large = make_reports(workdir, args.reports, args.large_items)
+        results = {}
+        for label, render in renderers.items():
+            per_report = statistics.median(time_small(render, small, workdir) for _ in range(args.repeat))
+            results[label] = (per_report, peak_large(render, large, workdir))
+    print(f"{'mode':<10}{'ms/report':>12}{'large peak MB':>16}")
+    for label, (per_report, peak) in results.items():
+        print(f"{label:<10}{per_report * 1000:>12.2f}{peak / 1048576:>16.1f}")
+    print(f"speedup per report: {results['legacy'][0] / results['shared'][0]:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
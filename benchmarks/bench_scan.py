@@ -0,0 +1,314 @@
+"""
+End-to-end offline benchmark of the scan orchestration.
+
+Generates synthetic git repositories (file count, file size, share of IaC files, Dockerfiles,
+commit count), puts the stand-in scanners of benchmarks/fake_tools.py first on PATH, starts the
+in-memory Blob service of benchmarks/fake_blob_server.py and runs main.main() against them with
+--trace. Nothing touches the network or needs a real scanner installed.
+
+For every run the wall time of main.main() is recorded together with the time spent per
+pipeline stage (clone, scan, render, upload), per scanner, in render_html_from_json
+(render-html spans), generate_summary_report (summary) and blob uploads, taken from the run's
+trace. Results are written as JSON; pass an earlier result file with --compare to print the
+change of every measurement.
+
+Usage:
+    python benchmarks/bench_scan.py [--repos 4] [--files 300] [--file-kb 2] [--iac-ratio 0.2]
+        [--dockerfile-ratio 0.5] [--commits 5] [--findings 200] [--delay-ms 200] [--ms-per-mb 0]
+        [--large-repo-factor 1] [--vendored-files 0] [--exclude node_modules] [--busy]
+        [--latency-ms 2] [--workers 4] [--repeat 3] [--scheduler lpt|pipeline] [--cache] [--output results.json]
+        [--compare previous.json] [--keep]
+"""
+import argparse
+import contextlib
+import glob
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.insert(0, REPO_ROOT)
+
+from benchmarks import fake_tools  # noqa: E402
+from benchmarks.fake_blob_server import start_server  # noqa: E402
+
+GIT_ENV = {
+    "GIT_AUTHOR_NAME": "Bench", "GIT_AUTHOR_EMAIL": "bench@example.com",
+    "GIT_COMMITTER_NAME": "Bench", "GIT_COMMITTER_EMAIL": "bench@example.com",
+}
+
+
+def _file_content(rel_path, size, rng):
+    if rel_path.endswith(".tf"):
+        block = 'resource "aws_s3_bucket" "b{n}" {{\n  bucket = "bench-{n}"\n  acl    = "public-read"\n}}\n'
+    elif rel_path.endswith(".yaml"):
+        block = "apiVersion: v1\nkind: Pod\nmetadata:\n  name: pod-{n}\nspec:\n  containers:\n  - name: app\n    image: nginx:latest\n"
+    else:
+        block = "def handler_{n}(cmd):\n    import subprocess\n    return subprocess.call(cmd, shell=True)\n\n"
+    text, n = "", 0
+    while len(text) < size:
+        text += block.format(n=n + rng.randint(0, 10 ** 6))
+        n += 1
+    return text[:size]
+
+
+def make_repo(path, files, file_kb, iac_ratio, dockerfile, commits, seed, vendored_files=0):
+    """
+    Create a git repository on branch main with `files` files spread over `commits` commits,
+    plus vendored_files checked-in JavaScript dependencies under node_modules/.
+    """
+    rng = random.Random(seed)
+    os.makedirs(path)
+    env = dict(os.environ, **GIT_ENV)
+    subprocess.run(["git", "init", "-q", "-b", "main", path], check=True, env=env)
+    paths = []
+    for i in range(files):
+        if rng.random() < iac_ratio:
+            paths.append(f"infra/module_{i % 10}/main_{i}.tf" if i % 2 else f"k8s/deployment_{i}.yaml")
+        else:
+            paths.append(f"src/pkg_{i % 20}/module_{i}.py")
+    paths += [f"node_modules/dep_{i % 30}/lib/index_{i}.js" for i in range(vendored_files)]
+    with open(os.path.join(path, "requirements.txt"), "w") as f:
+        f.write("".join(f"package-{i}==1.0.{i}\n" for i in range(30)))
+    if dockerfile:
+        with open(os.path.join(path, "Dockerfile"), "w") as f:
+            f.write("FROM python:3.11\nRUN apt-get update && apt-get install -y curl\nCOPY . /app\nCMD python /app/main.py\n")
+    batches = [paths[i::commits] for i in range(commits)]
+    for number, batch in enumerate(batches):
+        for rel_path in batch:
+            full_path = os.path.join(path, rel_path)
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            with open(full_path, "w") as f:
+                f.write(_file_content(rel_path, file_kb * 1024, rng))
+        subprocess.run(["git", "add", "-A"], cwd=path, check=True, env=env)
+        subprocess.run(["git", "commit", "-q", "-m", f"Commit {number}"], cwd=path, check=True, env=env)
+    return path
+
+
+def write_config(workdir, repo_paths, args):
+    import yaml
+
+    config = {
+        "general": {"branch": "main", "skip": False, "tags": [], "requirements_path": os.path.join(repo_paths[0], "requirements.txt"),
+                    "history": {"mode": "shallow"}, "tool_timeout": 600},
+        "concurrency": {"scan_workers": args.workers, "upload_concurrency": 8,
+                        "pipeline": {"queue_size": 1, "status_interval": 3600,
+                                     "stages": {"clone": 2, "scan": 1, "render": 1, "upload": 2}},
+                        "scheduler": {"mode": args.scheduler, "tool_caps": {"dependency-check": 1}}},
+        "reports": {"format": "files", "compress_level": 6, "page_size": 2000},
+        "findings": {"enabled": True, "path": ".scan_state/findings.db"},
+        "metrics": {"enabled": True, "path": "reports/metrics", "history_path": ".scan_state/metrics_history.jsonl"},
+        "cache": {"enabled": args.cache, "path": ".scan_cache"},
+        "incremental": {"enabled": False},
+        "mirrors": {"enabled": False},
+        "dependency_check": {"db_ttl_hours": 24, "update_timeout": 600, "state_path": ".scan_state/dependency-check-db.json",
+                             "batch": {"enabled": False}},
+        "repositories": [{"path": path, "branch": "main", "skip": False} for path in repo_paths],
+        "exclude_paths": args.exclude,
+        "custom_rules": [],
+    }
+    path = os.path.join(workdir, "settings.yaml")
+    with open(path, "w") as f:
+        yaml.safe_dump(config, f)
+    return path
+
+
+def summarize_trace(trace_path):
+    """Total, count and maximum duration (seconds) of the trace's spans, grouped by category and name."""
+    with open(trace_path) as f:
+        events = json.load(f)["traceEvents"]
+    groups = {}
+    for event in events:
+        if event.get("ph") != "X":
+            continue
+        group = groups.setdefault(event["cat"], {}).setdefault(event["name"], {"count": 0, "total_seconds": 0.0, "max_seconds": 0.0})
+        seconds = event["dur"] / 1e6
+        group["count"] += 1
+        group["total_seconds"] += seconds
+        group["max_seconds"] = max(group["max_seconds"], seconds)
+    for names in groups.values():
+        for group in names.values():
+            group["total_seconds"] = round(group["total_seconds"], 4)
+            group["max_seconds"] = round(group["max_seconds"], 4)
+    return groups
+
+
+def scan_argv(config_path, blob_port, verbose):
+    return ["main.py", "--config", config_path, "--blobPort", str(blob_port), "--trace",
+            "--log-level", "INFO" if verbose else "ERROR"]
+
+
+def missing_html(report_dirs):
+    """Tools whose run succeeded but whose HTML report was not rendered, as 'report_dir/tool' strings."""
+    missing = []
+    for report_dir in report_dirs:
+        for manifest_path in glob.glob(os.path.join(report_dir, "manifests", "*.json")):
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+            if manifest.get("status") != "success":
+                continue
+            tool = manifest["tool"]
+            html_path = os.path.join(report_dir, "html", f"{tool}.html")
+            # Checkov reports are rendered per framework into html/checkov/
+            if not os.path.isfile(html_path) and not glob.glob(os.path.join(report_dir, "html", tool, "*.html")):
+                missing.append(f"{report_dir}/{tool}")
+    return missing
+
+
+def run_scan(main_module, config_path, blob_port, verbose):
+    """
+    One main.main() run; returns its wall time and the summary of its trace.
+    Raises RuntimeError when a report failed to render, so a template error cannot pass as a fast run.
+    """
+    # Report folders and trace files are named by the second; never start two runs in the same one
+    time.sleep(1 - time.time() % 1)
+    before = set(glob.glob(os.path.join("reports", "traces", "*.json")))
+    reports_before = set(glob.glob(os.path.join("reports", "*", "*", "manifests")))
+    sys.argv = scan_argv(config_path, blob_port, verbose)
+    output = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+    start = time.perf_counter()
+    with output:
+        main_module.main()
+    wall = time.perf_counter() - start
+    trace_path = sorted(set(glob.glob(os.path.join("reports", "traces", "*.json"))) - before)[-1]
+    report_dirs = [os.path.dirname(path) for path in set(glob.glob(os.path.join("reports", "*", "*", "manifests"))) - reports_before]
+    missing = missing_html(report_dirs)
+    if missing:
+        raise RuntimeError(f"HTML rendering failed for: {', '.join(sorted(missing))}")
+    return {"wall_seconds": round(wall, 4), "spans": summarize_trace(trace_path)}
+
+
+def flatten(run):
+    """Measurements of one run as {'wall_seconds': x, 'stage/clone': y, 'tool/gitleaks': z, ...}."""
+    values = {"wall_seconds": run["wall_seconds"]}
+    for category, names in run["spans"].items():
+        for name, group in names.items():
+            values[f"{category}/{name}"] = group["total_seconds"]
+    return values
+
+
+def median_of(runs):
+    keys = sorted({key for run in runs for key in flatten(run)})
+    return {key: round(statistics.median(flatten(run).get(key, 0.0) for run in runs), 4) for key in keys}
+
+
+def compare(current, previous):
+    print(f"\n{'measurement':<36}{'previous':>12}{'current':>12}{'change':>10}")
+    for key in sorted(set(current) | set(previous)):
+        old, new = previous.get(key), current.get(key)
+        change = f"{(new - old) / old * 100:+.1f}%" if old and new is not None else ""
+        print(f"{key:<36}{'' if old is None else f'{old:.3f}':>12}{'' if new is None else f'{new:.3f}':>12}{change:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline end-to-end benchmark of the scan orchestration")
+    parser.add_argument("--repos", type=int, default=4)
+    parser.add_argument("--files", type=int, default=300, help="Files per repository")
+    parser.add_argument("--file-kb", type=int, default=2)
+    parser.add_argument("--iac-ratio", type=float, default=0.2, help="Share of Terraform/Kubernetes files")
+    parser.add_argument("--dockerfile-ratio", type=float, default=0.5, help="Share of repositories with a Dockerfile")
+    parser.add_argument("--commits", type=int, default=5)
+    parser.add_argument("--findings", type=int, default=200, help="Findings each stand-in tool reports")
+    parser.add_argument("--delay-ms", type=float, default=200, help="Time each stand-in tool takes")
+    parser.add_argument("--ms-per-mb", type=float, default=0, help="Extra stand-in tool time per MB of repository")
+    parser.add_argument("--vendored-files", type=int, default=0, help="Files under node_modules/ per repository")
+    parser.add_argument("--exclude", action="append", default=[], help="exclude_paths pattern (repeatable)")
+    parser.add_argument("--large-repo-factor", type=int, default=1, help="The last repository gets this many times the files")
+    parser.add_argument("--busy", action="store_true", help="Spend the tool delay on the CPU instead of sleeping")
+    parser.add_argument("--latency-ms", type=float, default=2, help="Simulated Blob Storage round trip")
+    parser.add_argument("--workers", type=int, default=4, help="concurrency.scan_workers")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--scheduler", choices=["lpt", "pipeline"], default="lpt", help="concurrency.scheduler.mode")
+    parser.add_argument("--cache", action="store_true", help="Enable the result cache (later repeats hit it)")
+    parser.add_argument("--verbose", action="store_true", help="Show the scan's own log output")
+    parser.add_argument("--output", default=None, help="Write the results as JSON")
+    parser.add_argument("--compare", default=None, help="Earlier result file to compare the medians with")
+    parser.add_argument("--keep", action="store_true", help="Keep the work directory")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench-scan-")
+    cwd = os.getcwd()
+    saved_env = dict(os.environ)
+    server = None
+    try:
+        repo_paths = [
+            make_repo(os.path.join(workdir, "repos", f"bench-repo-{i}"),
+                      args.files * (args.large_repo_factor if i == args.repos - 1 else 1), args.file_kb, args.iac_ratio,
+                      i < round(args.repos * args.dockerfile_ratio), args.commits, seed=i, vendored_files=args.vendored_files)
+            for i in range(args.repos)
+        ]
+        config_path = write_config(workdir, repo_paths, args)
+        bin_dir = fake_tools.install(os.path.join(workdir, "bin"))
+        os.environ.update({
+            "PATH": f"{bin_dir}{os.pathsep}{os.environ.get('PATH', '')}",
+            "FAKE_TOOL_FINDINGS": str(args.findings),
+            "FAKE_TOOL_DELAY_MS": str(args.delay_ms),
+            "FAKE_TOOL_MS_PER_MB": str(args.ms_per_mb),
+            "FAKE_TOOL_BUSY": "1" if args.busy else "0",
+            "SAFETY_API_KEY": "bench",
+        })
+        for name in ("STORAGE_ACCOUNT_ENDPOINT", "STORAGE_ACCOUNT_NAME", "STORAGE_ACCOUNT_KEY", "GITHUB_TOKEN"):
+            os.environ.pop(name, None)
+        server, store = start_server(latency_ms=args.latency_ms)
+
+        # main.py parses the command line, creates logs/ and reports/ and opens its log file on import;
+        # keep all of it in the work directory
+        os.chdir(workdir)
+        argv = sys.argv
+        sys.argv = scan_argv(config_path, server.server_port, args.verbose)
+        import main as main_module
+        sys.argv = argv
+
+        runs = []
+        for number in range(args.repeat):
+            run = run_scan(main_module, config_path, server.server_port, args.verbose)
+            runs.append(run)
+            stages = run["spans"].get("stage", {})
+            print(f"run {number + 1}: {run['wall_seconds']:.2f}s  " + "  ".join(
+                f"{name} {group['total_seconds']:.2f}s" for name, group in sorted(stages.items())
+            ))
+        medians = median_of(runs)
+        print(f"\n{'measurement (median of runs)':<36}{'seconds':>12}")
+        for key, value in medians.items():
+            print(f"{key:<36}{value:>12.3f}")
+        print(f"Blob requests served: {store.requests}")
+
+        results = {
+            "created": time.time(),
+            "parameters": vars(args),
+            "environment": {
+                "python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count(),
+                "commit": subprocess.run(["git", "rev-parse", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True).stdout.strip(),
+            },
+            "runs": runs,
+            "median": medians,
+        }
+        os.chdir(cwd)
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump(results, f, indent=4)
+        if args.compare:
+            with open(args.compare) as f:
+                compare(medians, json.load(f)["median"])
+    finally:
+        os.chdir(cwd)
+        os.environ.clear()
+        os.environ.update(saved_env)
+        if server is not None:
+            server.shutdown()
+        if args.keep:
+            print(f"Work directory kept at {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
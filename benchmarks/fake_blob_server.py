@@ -0,0 +1,194 @@
+"""
+In-memory stand-in for the Azurite Blob service, covering the calls the scanner makes:
+container properties/create, blob upload, server-side blob copy, blob download (with ranges)
+and blob listing (flat or by "/" delimiter).
+An optional per-request latency imitates the round trip to a real storage account.
+
+Usage:
+    python benchmarks/fake_blob_server.py [--port 10000] [--latency-ms 0]
+"""
+import argparse
+import base64
+import hashlib
+import threading
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+from xml.sax.saxutils import escape
+
+
+class BlobStore:
+    def __init__(self):
+        self.containers = {}
+        self.lock = threading.Lock()
+        self.requests = 0
+
+
+def make_handler(store, latency):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _split(self):
+            parsed = urlparse(self.path)
+            parts = unquote(parsed.path).lstrip("/").split("/", 2)
+            query = {key: values[0] for key, values in parse_qs(parsed.query).items()}
+            container = parts[1] if len(parts) > 1 else None
+            blob = parts[2] if len(parts) > 2 else None
+            return container, blob, query
+
+        def _reply(self, status, body=b"", headers=None, error_code=None):
+            self.send_response(status)
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            if error_code:
+                self.send_header("x-ms-error-code", error_code)
+                body = f'<?xml version="1.0" encoding="utf-8"?><Error><Code>{error_code}</Code><Message>{error_code}</Message></Error>'.encode()
+                self.send_header("Content-Type", "application/xml")
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("x-ms-version", "2021-08-06")
+            self.end_headers()
+            if self.command != "HEAD":
+                self.wfile.write(body)
+
+        def _begin(self):
+            with store.lock:
+                store.requests += 1
+            if latency:
+                time.sleep(latency)
+            length = int(self.headers.get("Content-Length", 0) or 0)
+            return self.rfile.read(length) if length else b""
+
+        def do_PUT(self):
+            body = self._begin()
+            container, blob, query = self._split()
+            with store.lock:
+                if blob is None:
+                    if container in store.containers:
+                        return self._reply(409, error_code="ContainerAlreadyExists")
+                    store.containers[container] = {}
+                    return self._reply(201, headers={"ETag": '"0x1"', "Last-Modified": formatdate(usegmt=True)})
+                if container not in store.containers:
+                    return self._reply(404, error_code="ContainerNotFound")
+                copy_source = self.headers.get("x-ms-copy-source")
+                if copy_source:
+                    return self._copy(container, blob, copy_source)
+                header_md5 = self.headers.get("x-ms-blob-content-md5")
+                md5 = base64.b64decode(header_md5) if header_md5 else hashlib.md5(body).digest()
+                store.containers[container][blob] = {
+                    "data": body,
+                    "md5": md5,
+                    "content_type": self.headers.get("x-ms-blob-content-type", "application/octet-stream"),
+                    "modified": formatdate(usegmt=True),
+                }
+            self._reply(201, headers={
+                "ETag": f'"0x{hashlib.md5(body).hexdigest()[:16]}"',
+                "Last-Modified": formatdate(usegmt=True),
+                "Content-MD5": base64.b64encode(md5).decode(),
+                "x-ms-request-server-encrypted": "false",
+            })
+
+        def do_GET(self):
+            self._begin()
+            container, blob, query = self._split()
+            with store.lock:
+                blobs = store.containers.get(container)
+                if blobs is None:
+                    return self._reply(404, error_code="ContainerNotFound")
+                if blob is None and query.get("comp") == "list":
+                    return self._list(container, blobs, query.get("prefix", ""), query.get("delimiter"))
+                if blob is None:
+                    return self._reply(200, headers={"ETag": '"0x1"', "Last-Modified": formatdate(usegmt=True)})
+                item = blobs.get(blob)
+            if item is None:
+                return self._reply(404, error_code="BlobNotFound")
+            data = item["data"]
+            headers = {
+                "Content-Type": item["content_type"],
+                "Content-MD5": base64.b64encode(item["md5"]).decode(),
+                "Last-Modified": item["modified"],
+                "ETag": '"0x1"',
+                "x-ms-blob-type": "BlockBlob",
+                "Accept-Ranges": "bytes",
+            }
+            byte_range = self.headers.get("x-ms-range") or self.headers.get("Range")
+            if byte_range:
+                start, _, end = byte_range.split("=", 1)[1].partition("-")
+                start, end = int(start), min(int(end) if end else len(data) - 1, len(data) - 1)
+                headers["Content-Range"] = f"bytes {start}-{end}/{len(data)}"
+                return self._reply(206, data[start:end + 1], headers)
+            self._reply(200, data, headers)
+
+        do_HEAD = do_GET
+
+        def _copy(self, container, blob, copy_source):
+            """Copy Blob within the account; the copy completes before the reply (as same-account copies usually do)."""
+            parts = unquote(urlparse(copy_source).path).lstrip("/").split("/", 2)
+            item = store.containers.get(parts[1], {}).get(parts[2]) if len(parts) == 3 else None
+            if item is None:
+                return self._reply(404, error_code="CannotVerifyCopySource")
+            store.containers[container][blob] = dict(item, modified=formatdate(usegmt=True))
+            self._reply(202, headers={
+                "ETag": '"0x1"', "Last-Modified": formatdate(usegmt=True),
+                "x-ms-copy-id": hashlib.md5(f"{container}/{blob}".encode()).hexdigest(), "x-ms-copy-status": "success",
+            })
+
+        def _list(self, container, blobs, prefix, delimiter=None):
+            entries = []
+            prefixes = set()
+            for name in sorted(blobs):
+                if not name.startswith(prefix):
+                    continue
+                if delimiter and delimiter in name[len(prefix):]:
+                    folder = name[:name.index(delimiter, len(prefix)) + len(delimiter)]
+                    if folder not in prefixes:
+                        prefixes.add(folder)
+                        entries.append(f"<BlobPrefix><Name>{escape(folder)}</Name></BlobPrefix>")
+                    continue
+                item = blobs[name]
+                entries.append(
+                    f"<Blob><Name>{escape(name)}</Name><Properties>"
+                    f"<Last-Modified>{item['modified']}</Last-Modified><Etag>0x1</Etag>"
+                    f"<Content-Length>{len(item['data'])}</Content-Length>"
+                    f"<Content-Type>{escape(item['content_type'])}</Content-Type>"
+                    f"<Content-MD5>{base64.b64encode(item['md5']).decode()}</Content-MD5>"
+                    f"<BlobType>BlockBlob</BlobType></Properties></Blob>"
+                )
+            body = (
+                '<?xml version="1.0" encoding="utf-8"?>'
+                f'<EnumerationResults ContainerName="{escape(container)}"><Prefix>{escape(prefix)}</Prefix>'
+                + (f'<Delimiter>{escape(delimiter)}</Delimiter>' if delimiter else '') +
+                f'<Blobs>{"".join(entries)}</Blobs><NextMarker /></EnumerationResults>'
+            ).encode()
+            self._reply(200, body, {"Content-Type": "application/xml"})
+
+    return Handler
+
+
+def start_server(port=0, latency_ms=0):
+    """Start the server in a background thread. Returns (server, store); server.server_port holds the port."""
+    store = BlobStore()
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(store, latency_ms / 1000))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, store
+
+
+def main():
+    parser = argparse.ArgumentParser(description="In-memory Azurite Blob service stand-in")
+    parser.add_argument("--port", type=int, default=10000)
+    parser.add_argument("--latency-ms", type=float, default=0)
+    args = parser.parse_args()
+    server, _ = start_server(args.port, args.latency_ms)
+    print(f"Fake Blob service listening on http://127.0.0.1:{server.server_port}/devstoreaccount1")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
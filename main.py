@@ -1,10 +1,14 @@
+import functools
 import json
 import logging
 import os
+import signal
 import sys
+import threading
+import time
 import yaml
+from concurrent.futures import ThreadPoolExecutor
 from logging.handlers import TimedRotatingFileHandler
-import subprocess
 import shutil
 
 from jinja2 import Template
@@ -15,14 +19,31 @@ import argparse
 from scanners import gitleaks, trufflehog, semgrep, syft, grype, bandit, safety, checkov, dependency_check, hadolint
 import socket
 from azure.core.pipeline.policies import HeadersPolicy, UserAgentPolicy
-from azure.core.pipeline import Pipeline
 from azure.core.pipeline.transport import RequestsTransport
 
 from modules.config_loader import load_config
-from modules.repo_manager import clone_repository, is_valid_repository
+from modules.repo_manager import clone_repository, is_valid_repository, get_head_commit, checkout_size, get_remote_head
 from modules.report_generator import generate_summary_report
 from datetime import datetime
-from modules.json_to_html import render_html_from_json, render_html_from_json_recursive
+from modules.json_to_html import render_html_from_json, render_html_from_json_recursive, set_page_size
+from modules.tool_runner import LptScheduler, ToolTask, ToolResult, run_tasks
+from modules.subprocess_utils import DEFAULT_TIMEOUT, set_default_timeout
+from modules.pipeline import Pipeline, Stage
+from modules.result_cache import ResultCache, data_version, get_tool_version, tool_config_hash
+from modules.incremental import IncrementalState, compute_change_set, get_commit_time
+from modules.mirror_store import MirrorStore
+from modules.dependency_db import database_updated, refresh_background_update, start_background_update
+from modules.blob_uploader import get_uploader, sanitize_container_name
+from modules.report_bundle import bundle_paths, create_bundle
+from modules.findings_store import SEVERITY_LEVELS, FindingsStore, run_query_command
+from modules.report_manifest import load_manifest, write_manifest, write_skipped_manifest
+from modules.run_metrics import DEFAULT_ESTIMATES, DurationEstimator, RunMetrics
+from modules.tracing import span, start_tracing, stop_tracing
+from modules.job_queue import get_queue
+from modules.distributed import Worker, enqueue_run, make_tool_sets, wait_for_run
+from modules.watcher import RepoWatcher
+from modules.inventory import build_inventory
+from modules.exclusions import get_exclusions, measure_exclusions
 
 LOG_DIR = "logs"
 REPORT_DIR = "reports"
@@ -56,19 +77,6 @@ def get_connection_string(account_name, account_key, endpoint):
     else:
         return f"DefaultEndpointsProtocol=http;AccountName={account_name};AccountKey={account_key};BlobEndpoint={endpoint};"
 
-def update_dependency_check_database():
-    logging.info("Updating OWASP Dependency-Check database")
-    try:
-        result = subprocess.run([
-            "dependency-check", "--update"
-        ], capture_output=True, text=True, timeout=600)  # Timeout set to 10 minutes
-        if result.returncode != 0:
-            logging.warning(f"Dependency-Check update finished with warnings: {result.stderr}")
-    except subprocess.TimeoutExpired:
-        logging.error("Dependency-Check update timed out")
-    except Exception as e:
-        logging.exception("Dependency-Check update failed")
-
 # Ensure cloned_repos directory exists
 os.makedirs("cloned_repos", exist_ok=True)
 
@@ -92,6 +100,269 @@ def get_report_path(repo_path, tool_name, timestamped_dir, fmt="json"):
     else:
         raise ValueError("Unsupported report format")
 
+def render_tool_html(tool_name, json_path, timestamped_dir):
+    """Render the HTML report for a tool once its JSON report exists."""
+    html_path = get_report_path(None, tool_name, timestamped_dir, fmt="html")
+    repo_name = os.path.basename(os.path.dirname(timestamped_dir.rstrip(os.sep)))
+    try:
+        with span("render-html", "render", repo=repo_name, tool=tool_name):
+            # Special handling for Checkov: if output is a directory, process recursively
+            if tool_name == "checkov" and os.path.isdir(json_path):
+                # Recursively process all JSON files in the directory
+                checkov_html_dir = os.path.join(timestamped_dir, "html", "checkov")
+                os.makedirs(checkov_html_dir, exist_ok=True)
+                render_html_from_json_recursive(json_path, checkov_html_dir, report_title="Checkov Report", scanner_name="checkov")
+            else:
+                # Paginated reports show the severity breakdown from the tool's run manifest on their index page
+                manifest = load_manifest(timestamped_dir, tool_name) or {}
+                severity_counts = sorted(manifest.get("severity", {}).items(), key=lambda item: -SEVERITY_LEVELS.get(item[0], -1))
+                render_html_from_json(
+                    json_path, html_path, report_title=f"{tool_name.capitalize()} Report", scanner_name=tool_name,
+                    severity_counts=severity_counts
+                )
+    except Exception as e:
+        logging.warning(f"Failed to generate HTML for {tool_name}: {e}")
+
+# Every scanner build_scan_tasks can run
+SCANNERS = ("gitleaks", "trufflehog", "semgrep", "syft", "grype", "bandit", "safety", "checkov", "dependency-check", "hadolint")
+
+# Tools that consume another tool's report and must wait for it
+TOOL_DEPENDENCIES = {
+    "grype": ["syft"],  # Grype reads the SBOM Syft writes instead of cataloguing the repository again
+}
+
+# Scanners that can limit themselves to the files or commits changed since the last scan
+INCREMENTAL_RUNNERS = {
+    "gitleaks": gitleaks.run_gitleaks_incremental,
+    "semgrep": semgrep.run_semgrep_incremental,
+    "bandit": bandit.run_bandit_incremental,
+    "checkov": checkov.run_checkov_incremental,
+    "hadolint": hadolint.run_hadolint_incremental,
+}
+
+# Map each tool's report to common finding records for the findings store (Syft's SBOM holds no findings)
+NORMALIZERS = {
+    "gitleaks": gitleaks.normalize_gitleaks_report,
+    "trufflehog": trufflehog.normalize_trufflehog_report,
+    "semgrep": semgrep.normalize_semgrep_report,
+    "grype": grype.normalize_grype_report,
+    "bandit": bandit.normalize_bandit_report,
+    "safety": safety.normalize_safety_report,
+    "checkov": checkov.normalize_checkov_report,
+    "dependency-check": dependency_check.normalize_dependency_check_report,
+    "hadolint": hadolint.normalize_hadolint_report,
+}
+
+def tool_cache_key(repo, tool_name, module, config, commit):
+    """Result cache key for one tool run on one commit of a repository."""
+    # Gitleaks findings depend on how much history was cloned
+    extra = repo.get("history", config["general"].get("history")) if tool_name == "gitleaks" else None
+    if repo.get("exclude_paths"):
+        # The global exclude_paths is part of the hashed settings; the repository's own rules are added here
+        extra = {"history": extra, "exclude_paths": repo["exclude_paths"]}
+    return ResultCache.make_key(
+        repo["path"], commit, tool_name, get_tool_version(tool_name), tool_config_hash(tool_name, config, module, extra),
+        data_version(tool_name, config.get("cache", {}).get("data_max_age_hours", 24), database_updated())
+    )
+
+def run_with_manifest(tool_name, run_func, target, json_path, timestamped_dir, metrics=None, repo_name=None, exit_codes=(0,)):
+    """
+    Run one scanner, then record its run manifest (count, severities, size, duration, exit status,
+    CPU time, peak RSS and output bytes) and add it to the run metrics.
+    :param exit_codes: Exit codes the scanner uses for a completed scan.
+    """
+    start = time.monotonic()
+    with span(tool_name, "tool", repo=repo_name, tool=tool_name):
+        result = run_func(target, json_path)
+    duration = time.monotonic() - start
+    with span("manifest", "report", repo=repo_name, tool=tool_name):
+        manifest = write_manifest(
+            timestamped_dir, tool_name, json_path, NORMALIZERS.get(tool_name), result, duration, exit_codes
+        )
+    if metrics is not None:
+        metrics.record(repo_name, tool_name, manifest)
+    return result
+
+def store_if_succeeded(cache, key, report_dir, tool_name, metadata):
+    """Cache a tool's reports only when its run manifest records a successful run."""
+    manifest = load_manifest(report_dir, tool_name) or {}
+    if manifest.get("status") != "success":
+        logging.info(f"Not caching {tool_name}: its run manifest records status '{manifest.get('status')}'")
+        return
+    cache.store(key, report_dir, tool_name, metadata)
+
+def build_scan_tasks(repo, local_path, timestamped_dir, config, cache=None, commit=None, changes=None, exclude_tools=(),
+                     metrics=None, inventory=None, exclusions=None):
+    """
+    Build the task graph for one repository: one task per scanner plus one HTML
+    render task per scanner that waits for the scanner's JSON report.
+    With a result cache and a resolved commit, tools whose result is cached are restored
+    instead of run, and fresh results are stored once their HTML is rendered.
+    With a change set, tools in INCREMENTAL_RUNNERS only scan what changed since the last scan.
+    Tools in exclude_tools are left out (e.g. because they run in a cross-repository batch).
+    Each tool run (or cache hit) is added to metrics when given.
+    With an inventory of the checkout, tools whose APPLIES_TO matches nothing in it are not run;
+    a skipped manifest records why (inventory.always_run lists tools that are never skipped).
+    With exclusions, every tool that walks the checkout is given them as its own exclusion flags.
+    """
+    def excluding(func):
+        return functools.partial(func, exclusions=exclusions) if exclusions else func
+
+    requirements_path = config["general"]["requirements_path"]
+    # List of (tool, scanner_module, run_function, target) tuples
+    tools = [
+        ("gitleaks", gitleaks, excluding(gitleaks.run_gitleaks), local_path),
+        ("trufflehog", trufflehog, excluding(trufflehog.run_trufflehog), local_path),
+        ("semgrep", semgrep, excluding(semgrep.run_semgrep), local_path),
+        ("syft", syft, excluding(syft.run_syft), local_path),
+        ("grype", grype, excluding(functools.partial(grype.run_grype, sbom_path=get_report_path(repo["path"], "syft", timestamped_dir))), local_path),
+        ("bandit", bandit, excluding(bandit.run_bandit), local_path),
+        ("safety", safety, safety.run_safety, requirements_path),
+        ("checkov", checkov, excluding(checkov.run_checkov), local_path),
+        ("dependency-check", dependency_check, excluding(dependency_check.run_dependency_check), local_path),
+    ]
+    dockerfile_path = os.path.join(local_path, "Dockerfile")
+    excluded_by = exclusions.match("Dockerfile") if exclusions else None
+    if os.path.exists(dockerfile_path) and excluded_by is None:
+        tools.append(("hadolint", hadolint, hadolint.run_hadolint, dockerfile_path))
+    elif os.path.exists(dockerfile_path) and "hadolint" not in exclude_tools:
+        logging.info(f"Skipping Hadolint for {repo['path']}: the Dockerfile is excluded by {excluded_by.pattern}")
+        write_skipped_manifest(timestamped_dir, "hadolint", f"Dockerfile excluded by exclude_paths rule {excluded_by.pattern}")
+    elif "hadolint" not in exclude_tools:
+        logging.warning(f"Dockerfile not found for repository {repo['path']}, skipping Hadolint")
+        if inventory is not None:
+            reason = "Dockerfiles only below the repository root" if inventory.dockerfiles else inventory.missing(hadolint.APPLIES_TO)
+            write_skipped_manifest(timestamped_dir, "hadolint", reason)
+
+    if not os.path.isfile(requirements_path) and "safety" not in exclude_tools:
+        logging.warning(f"Requirements file {requirements_path} not found, skipping Safety")
+        write_skipped_manifest(timestamped_dir, "safety", f"{requirements_path} not found")
+        exclude_tools = set(exclude_tools) | {"safety"}
+
+    tools = [tool for tool in tools if tool[0] not in exclude_tools]
+    if inventory is not None:
+        always_run = config.get("inventory", {}).get("always_run", [])
+        applicable = []
+        for tool in tools:
+            applies_to = getattr(tool[1], "APPLIES_TO", None)
+            if tool[0] in always_run or inventory.applies(applies_to):
+                applicable.append(tool)
+            else:
+                logging.info(f"Skipping {tool[0]} for {repo['path']}: not applicable ({inventory.missing(applies_to)})")
+                write_skipped_manifest(timestamped_dir, tool[0], inventory.missing(applies_to))
+        tools = applicable
+    tool_names = {tool[0] for tool in tools}
+    repo_name = os.path.basename(repo["path"].rstrip('/'))
+    tasks = []
+    for tool_name, module, run_func, target in tools:
+        json_path = get_report_path(repo["path"], tool_name, timestamped_dir, fmt="json")
+        cache_key = None
+        if cache is not None and commit:
+            cache_key = tool_cache_key(repo, tool_name, module, config, commit)
+            with span("cache-restore", "cache", repo=repo_name, tool=tool_name):
+                restored = cache.restore(cache_key, timestamped_dir, tool_name)
+            if restored:
+                if metrics is not None:
+                    metrics.record(repo_name, tool_name, load_manifest(timestamped_dir, tool_name) or {}, cached=True)
+                tasks.append(ToolTask(name=tool_name, func=lambda: None, output_path=json_path, cached=True))
+                continue
+        if changes is not None and tool_name in INCREMENTAL_RUNNERS:
+            incremental_func = INCREMENTAL_RUNNERS[tool_name]
+            if tool_name != "hadolint":
+                # Gitleaks scans the new commits, and every runner falls back to a full scan without a
+                # previous report; both need the rules themselves (an excluded Dockerfile never gets here)
+                incremental_func = excluding(incremental_func)
+            run_func = lambda target, json_path, incremental_func=incremental_func: incremental_func(target, json_path, changes)
+        tasks.append(ToolTask(
+            name=tool_name,
+            func=lambda tool_name=tool_name, run_func=run_func, target=target, json_path=json_path, module=module: run_with_manifest(
+                tool_name, run_func, target, json_path, timestamped_dir, metrics, repo_name, module.EXIT_CODES
+            ),
+            depends_on=[dep for dep in TOOL_DEPENDENCIES.get(tool_name, []) if dep in tool_names],
+            output_path=json_path,
+        ))
+        tasks.append(ToolTask(
+            name=f"{tool_name}-html",
+            func=lambda tool_name=tool_name, json_path=json_path: render_tool_html(tool_name, json_path, timestamped_dir),
+            depends_on=[tool_name],
+        ))
+        if cache_key:
+            metadata = {"repo": repo["path"], "commit": commit}
+            tasks.append(ToolTask(
+                name=f"{tool_name}-cache",
+                func=lambda key=cache_key, tool_name=tool_name, metadata=metadata: store_if_succeeded(
+                    cache, key, timestamped_dir, tool_name, metadata
+                ),
+                # Cached once the HTML exists, and only when the scanner itself succeeded
+                depends_on=[tool_name, f"{tool_name}-html"],
+                requires=[tool_name],
+            ))
+    return tasks
+
+def run_batched_dependency_check(jobs, config, cache=None, shards=1, timeout=3600, metrics=None):
+    """
+    Run Dependency-Check for every scanned repository in `shards` batch invocations
+    (one JVM and one database load per shard), then render each repository's HTML report.
+    Repositories whose result is cached are restored instead of scanned, repositories whose
+    inventory has nothing Dependency-Check analyses are skipped, and repositories that failed to
+    clone are marked failed so a missing path never fails the shard of the others.
+    Each shard's process is added to metrics once, under the repository name "batch-<n>".
+    """
+    pending = []
+    always_run = config.get("inventory", {}).get("always_run", [])
+    for job in jobs:
+        json_path = get_report_path(job["repo"]["path"], "dependency-check", job["report_dir"])
+        if not job.get("commit") or not os.path.isdir(job["local_path"]):
+            logging.warning(f"Leaving {job['repo']['path']} out of the Dependency-Check batch: it was not cloned")
+            job["results"]["dependency-check"] = ToolResult("dependency-check", "failed", error="Repository not cloned")
+            continue
+        inventory = job.get("inventory")
+        if inventory is not None and "dependency-check" not in always_run and not inventory.applies(dependency_check.APPLIES_TO):
+            write_skipped_manifest(job["report_dir"], "dependency-check", inventory.missing(dependency_check.APPLIES_TO))
+            job["results"]["dependency-check"] = ToolResult("dependency-check", "skipped", error="Not applicable")
+            continue
+        job["dependency_check_key"] = None
+        if cache is not None and job.get("commit"):
+            job["dependency_check_key"] = tool_cache_key(job["repo"], "dependency-check", dependency_check, config, job["commit"])
+            if cache.restore(job["dependency_check_key"], job["report_dir"], "dependency-check"):
+                if metrics is not None:
+                    manifest = load_manifest(job["report_dir"], "dependency-check") or {}
+                    metrics.record(os.path.basename(job["repo"]["path"].rstrip('/')), "dependency-check", manifest, cached=True)
+                job["results"]["dependency-check"] = ToolResult("dependency-check", "success")
+                continue
+        pending.append((job, json_path))
+    shards = max(1, min(shards, len(pending)))
+    shard_lists = [pending[i::shards] for i in range(shards)]
+    shard_lists = [shard for shard in shard_lists if shard]
+    with ThreadPoolExecutor(max_workers=shards, thread_name_prefix="dependency-check") as executor:
+        def run_shard(number, shard):
+            with span("dependency-check", "tool", repo=f"batch-{number}", tool="dependency-check", repos=len(shard)):
+                return dependency_check.run_dependency_check_batch(
+                    [(job["local_path"], json_path) for job, json_path in shard], timeout=timeout,
+                    exclusions={job["local_path"]: job.get("exclusions") for job, _ in shard},
+                )
+
+        shard_results = list(executor.map(run_shard, range(1, len(shard_lists) + 1), shard_lists))
+    for number, (shard, result) in enumerate(zip(shard_lists, shard_results), 1):
+        for job, json_path in shard:
+            # Every repository in a shard shares the batch's exit status, duration and resource usage
+            manifest = write_manifest(
+                job["report_dir"], "dependency-check", json_path, NORMALIZERS["dependency-check"],
+                result, result.duration if result else 0.0, dependency_check.EXIT_CODES
+            )
+        if metrics is not None:
+            # Recorded once per shard so the batch process is not counted once per repository
+            metrics.record(f"batch-{number}", "dependency-check", manifest)
+    for job, json_path in pending:
+        if os.path.isfile(json_path):
+            render_tool_html("dependency-check", json_path, job["report_dir"])
+            job["results"]["dependency-check"] = ToolResult("dependency-check", "success")
+            if job["dependency_check_key"]:
+                metadata = {"repo": job["repo"]["path"], "commit": job["commit"]}
+                store_if_succeeded(cache, job["dependency_check_key"], job["report_dir"], "dependency-check", metadata)
+        else:
+            job["results"]["dependency-check"] = ToolResult("dependency-check", "failed", error="Missing from batch report")
+
 def is_azurite_running(host='127.0.0.1', port=10000, timeout=1):
     try:
         with socket.create_connection((host, port), timeout=timeout):
@@ -99,29 +370,23 @@ def is_azurite_running(host='127.0.0.1', port=10000, timeout=1):
     except (OSError, ConnectionRefusedError):
         return False
 
-def upload_reports_to_blob_storage(report_dir, repo_name, connection_string):
-    from azure.storage.blob import BlobServiceClient
-    sanitized_repo_name = repo_name.lower().replace('_', '-').replace('.', '-')
-    blob_service_client = BlobServiceClient.from_connection_string(connection_string)
-    container_client = blob_service_client.get_container_client(sanitized_repo_name)
-    try:
-        if not container_client.exists():
-            container_client.create_container()
-        logging.info(f"Container '{sanitized_repo_name}' exists or was created successfully.")
-    except Exception as e:
-        logging.error(f"Error during container creation or existence check: {e}")
-        return
-    for root, dirs, files in os.walk(report_dir):
-        for file in files:
-            abs_path = os.path.join(root, file)
-            rel_path = os.path.relpath(abs_path, report_dir)
-            blob_path = f"{os.path.basename(report_dir)}/{rel_path}"
-            try:
-                with open(abs_path, 'rb') as data:
-                    container_client.upload_blob(blob_path, data, overwrite=True)
-                logging.info(f"Uploaded {blob_path} to container '{sanitized_repo_name}'")
-            except Exception as e:
-                logging.error(f"Error uploading {blob_path}: {e}")
+def upload_reports_to_blob_storage(report_dir, repo_name, connection_string, max_concurrency=8, report_format="files"):
+    """
+    Upload a report folder through the run-wide uploader (shared client, pool and container cache).
+    report_format "files" uploads the folder, "bundle" its archive and index, "both" all of them.
+    """
+    uploader = get_uploader(connection_string, max_concurrency)
+    if report_format in ("files", "both"):
+        uploader.upload_directory(report_dir, repo_name)
+    if report_format in ("bundle", "both"):
+        bundle = [path for path in bundle_paths(report_dir) if os.path.isfile(path)]
+        if not bundle:
+            logging.warning(f"No report bundle found for {report_dir}, nothing uploaded")
+            return
+        stats = uploader.upload_files(
+            sanitize_container_name(repo_name), [(path, os.path.basename(path)) for path in bundle]
+        )
+        logging.info(f"Uploaded report bundle for {repo_name}: {stats['uploaded']} uploaded, {stats['failed']} failed")
 
 # Load environment variables for Azurite connection
 account_name = os.getenv("STORAGE_ACCOUNT_NAME", "devstoreaccount1")
@@ -159,7 +424,30 @@ def parse_arguments():
     group.add_argument("-prod", "--production", action="store_true", help="Run in production mode")
     parser.add_argument("--config", type=str, default=CONFIG_PATH, help="Path to config YAML file")
     parser.add_argument("--log-level", type=str, default="INFO", help="Logging level (DEBUG, INFO, WARNING, ERROR)")
+    parser.add_argument("--workers", type=int, default=None, help="Number of scanner tools to run in parallel per repository (overrides concurrency.scan_workers)")
+    parser.add_argument("--no-cache", action="store_true", help="Ignore and do not update the scan result cache")
+    parser.add_argument("--incremental", action="store_true", help="Only scan files and commits changed since the last scan (overrides incremental.enabled)")
+    parser.add_argument("--trace", action="store_true", help="Write a timeline of the run to reports/traces/<timestamp>.json (Chrome/Perfetto trace format)")
+    parser.add_argument("--profile", action="store_true", help="Like --trace, and also profile the Python work with cProfile (reports/traces/<timestamp>.prof)")
+    distributed = parser.add_mutually_exclusive_group(required=False)
+    distributed.add_argument("--watch", action="store_true", help="Keep running and rescan a repository whenever its branch moves (see watch in settings.yaml)")
+    distributed.add_argument("--coordinator", action="store_true", help="Queue one job per repository (and tool set) for workers, wait for them and merge the reports")
+    distributed.add_argument("--enqueue", action="store_true", help="Like --coordinator, but exit after queueing and print the run id (merge later with --merge)")
+    distributed.add_argument("--worker", action="store_true", help="Take scan jobs from the queue until it stays empty (distributed.worker.idle_timeout)")
+    distributed.add_argument("--merge", metavar="RUN_ID", help="Build the summaries and upload the reports of a distributed run")
     parser.add_argument("--blobPort", type=int, default=None, help="Azurite Blob service port (dev only, default: 10000)")
+    subparsers = parser.add_subparsers(dest="command")
+    query = subparsers.add_parser("query", help="Query normalized findings across repositories and runs")
+    query.add_argument("--repo", help="Repository name ('%%' wildcards allowed)")
+    query.add_argument("--tool", help="Tool name, e.g. grype")
+    query.add_argument("--rule", help="Rule or CVE id, e.g. CVE-2024-3094 ('%%' wildcards allowed)")
+    query.add_argument("--severity", help="Minimum severity: critical, high, medium, low or info")
+    query.add_argument("--since", help="Only runs since an ISO date or a relative age such as 7d or 12h")
+    query.add_argument("--latest", action="store_true", help="Only each repository's most recent run")
+    query.add_argument("--group-by", choices=["repo", "tool", "rule_id", "severity", "file", "run_id"], help="Count findings per value instead of listing them")
+    query.add_argument("--limit", type=int, default=100, help="Maximum rows to print (default: 100)")
+    query.add_argument("--json", action="store_true", help="Print rows as JSON")
+    query.add_argument("--sql", help="Run a read-only SQL statement against the store instead")
     args = parser.parse_args()
     # Enforce --blobPort is only allowed in dev mode
     if args.production and args.blobPort is not None:
@@ -183,6 +471,11 @@ def main():
     # Only override log level if not default (INFO)
     if args.log_level.upper() != "INFO":
         logging.getLogger().setLevel(args.log_level.upper())
+    findings_config = config.get("findings", {})
+    if args.command == "query":
+        sys.exit(run_query_command(findings_config.get("path", ".scan_state/findings.db"), args))
+    if args.trace or args.profile:
+        start_tracing(profile=args.profile)
     blob_port = args.blobPort if (args.blobPort is not None and not getattr(args, 'production', False)) else 10000
     account_name = os.getenv("STORAGE_ACCOUNT_NAME", "devstoreaccount1")
     account_key = os.getenv("STORAGE_ACCOUNT_KEY", "Eby8vdM02xNOcqFeqCnf2P==")
@@ -193,64 +486,387 @@ def main():
     else:
         endpoint = f"http://127.0.0.1:{blob_port}/devstoreaccount1"
     azurite_connection_string = get_connection_string(account_name, account_key, endpoint)
-    update_dependency_check_database()
+    scan_workers = args.workers or config.get("concurrency", {}).get("scan_workers", 1)
+    set_default_timeout(config["general"].get("tool_timeout", DEFAULT_TIMEOUT))
+    if getattr(args, 'production', False):
+        azure_account_name = os.getenv("STORAGE_ACCOUNT_NAME")
+        azure_account_key = os.getenv("STORAGE_ACCOUNT_KEY")
+        azure_endpoint = os.getenv("STORAGE_ACCOUNT_ENDPOINT", f"https://{azure_account_name}.blob.core.windows.net")
+        upload_connection_string = get_connection_string(azure_account_name, azure_account_key, azure_endpoint)
+    else:
+        upload_connection_string = azurite_connection_string
+    cache_config = config.get("cache", {})
+    cache = None
+    if cache_config.get("enabled", False) and not args.no_cache:
+        cache = ResultCache(
+            cache_config.get("path", ".scan_cache"),
+            max_entries=cache_config.get("max_entries", 500),
+            max_size_mb=cache_config.get("max_size_mb", 2048),
+            max_age_days=cache_config.get("max_age_days", 30),
+        )
+    incremental_config = config.get("incremental", {})
+    incremental_state = None
+    if args.incremental or incremental_config.get("enabled", False):
+        incremental_state = IncrementalState(incremental_config.get("state_path", ".scan_state/incremental.json"))
+    mirror_config = config.get("mirrors", {})
+    mirror_store = None
+    if mirror_config.get("enabled", False):
+        mirror_store = MirrorStore(mirror_config.get("path", ".mirrors"), max_size_mb=mirror_config.get("max_size_mb"))
+    findings_store = None
+    if findings_config.get("enabled", False):
+        findings_store = FindingsStore(findings_config.get("path", ".scan_state/findings.db"))
+    metrics_config = config.get("metrics", {})
+    run_metrics = None
+    if metrics_config.get("enabled", True):
+        run_metrics = RunMetrics(
+            metrics_config.get("path", os.path.join(REPORT_DIR, "metrics")),
+            history_path=metrics_config.get("history_path", ".scan_state/metrics_history.jsonl"),
+            history_runs=metrics_config.get("history_runs", 10),
+            regression_factor=metrics_config.get("regression_factor", 1.5),
+            prometheus_textfile=metrics_config.get("prometheus_textfile"),
+        )
+    inventory_enabled = config.get("inventory", {}).get("enabled", True)
+    distributed_config = config.get("distributed", {})
+    # The coordinator and the merge step queue and summarize scans; only plain runs and workers scan here
+    scans_here = not (args.coordinator or args.enqueue or args.merge)
+    distributed = args.worker or not scans_here
+    scheduler_config = config.get("concurrency", {}).get("scheduler", {})
+    scheduler = None
+    # Watch mode scans one repository at a time as its branch moves, so there is nothing to order
+    if scheduler_config.get("mode", "pipeline") == "lpt" and not distributed and not args.watch:
+        # scan_workers is shared by all repositories instead of applying to each one
+        scheduler = LptScheduler(scan_workers, tool_caps=scheduler_config.get("tool_caps", {}))
+        estimator = DurationEstimator(
+            metrics_config.get("history_path", ".scan_state/metrics_history.jsonl"),
+            history_runs=metrics_config.get("history_runs", 10),
+        )
+    report_config = config.get("reports", {})
+    report_format = report_config.get("format", "files")
+    set_page_size(report_config.get("page_size", 0))
+    db_config = config.get("dependency_check", {})
+    batch_config = db_config.get("batch", {})
+    # Each distributed job or watch scan covers a single repository, so there is nothing to batch
+    batch_enabled = batch_config.get("enabled", False) and not distributed and not args.watch
+    if scans_here:
+        start_background_update(
+            db_config.get("state_path", ".scan_state/dependency-check-db.json"),
+            ttl_hours=db_config.get("db_ttl_hours", 24),
+            timeout=db_config.get("update_timeout", 600),
+        )
+
+    def clone_stage(repo, local_base_path="cloned_repos"):
+        branch = repo.get("branch", config["general"]["branch"])
+        history = repo.get("history", config["general"].get("history"))
+        local_path = clone_repository(
+            repo["path"], branch, GITHUB_TOKEN, local_base_path=local_base_path, mirror_store=mirror_store, history=history
+        )
+        commit = get_head_commit(local_path) if os.path.isdir(local_path) else None
+        inventory = None
+        exclusions = get_exclusions(config, repo)
+        if os.path.isdir(local_path) and (inventory_enabled or exclusions):
+            # One walk builds the inventory and counts what each exclude_paths rule leaves out
+            with span("inventory", "clone", repo=os.path.basename(repo["path"].rstrip('/'))):
+                if inventory_enabled:
+                    inventory = build_inventory(local_path, exclusions)
+                else:
+                    measure_exclusions(local_path, exclusions)
+        return {
+            "repo": repo, "branch": branch, "local_path": local_path, "commit": commit, "inventory": inventory,
+            "exclusions": exclusions,
+        }
+
+    def prepare_scan(job):
+        """
+        Create the report folder (unless the job already names one) and build the repository's task graph,
+        limited to job["tools"] when the job only covers some of the scanners.
+        """
+        repo = job["repo"]
+        logging.info(f"Scanning repository: {repo['path']} on branch {job['branch']}")
+        if "report_dir" not in job:
+            job["report_dir"] = get_timestamped_report_path(repo["path"])
+        if job.get("inventory") is not None:
+            job["inventory"].write(job["report_dir"])
+        if job.get("exclusions"):
+            job["exclusions"].write(job["report_dir"])
+        exclude_tools = {"dependency-check"} if batch_enabled else set()
+        if job.get("tools"):
+            exclude_tools |= set(SCANNERS) - set(job["tools"])
+        changes = None
+        if incremental_state is not None:
+            previous = incremental_state.get(repo["path"], job["branch"])
+            changes = compute_change_set(
+                job["local_path"], job["branch"], previous, job["commit"],
+                max_changed_files=incremental_config.get("max_changed_files"), exclusions=job.get("exclusions")
+            )
+        return build_scan_tasks(
+            repo, job["local_path"], job["report_dir"], config, cache=cache, commit=job["commit"], changes=changes,
+            exclude_tools=exclude_tools, metrics=run_metrics, inventory=job.get("inventory"), exclusions=job.get("exclusions")
+        )
+
+    def finish_scan(job, results):
+        repo = job["repo"]
+        job["results"] = results
+        if incremental_state is not None and job["commit"]:
+            incremental_state.record(
+                repo["path"], job["branch"], job["commit"], get_commit_time(job["local_path"]), job["report_dir"],
+                [job["local_path"]], exclude_paths=get_exclusions(config, repo).patterns
+            )
+        failed = [name for name, result in job["results"].items() if result.status != "success"]
+        if failed:
+            logging.warning(f"Tasks without a successful result for {repo['path']}: {', '.join(failed)}")
+        return job
+
+    def scan_stage(job):
+        return finish_scan(job, run_tasks(prepare_scan(job), max_workers=scan_workers))
+
+    def schedule_stage(job):
+        """Hand the repository's tasks to the shared scheduler, with duration estimates from past runs."""
+        tasks = prepare_scan(job)
+        repo_name = os.path.basename(job["repo"]["path"].rstrip('/'))
+        size = job["inventory"].bytes if job.get("inventory") is not None else checkout_size(job["local_path"])
+        if run_metrics is not None:
+            run_metrics.set_repo_size(repo_name, size)
+        scheduler.submit(job, tasks, {task.name: estimator.estimate(repo_name, task.name, size) for task in tasks})
+
+    def render_stage(job):
+        repo_name = os.path.basename(job["repo"]["path"].rstrip('/'))
+        if findings_store is not None:
+            with span("findings-store", "report", repo=repo_name):
+                findings_store.load_run(
+                    os.path.relpath(job["report_dir"], job.get("report_root", REPORT_DIR)), repo_name,
+                    job["branch"], job["commit"], job["report_dir"], job["local_path"], NORMALIZERS
+                )
+        with span("summary", "report", repo=repo_name):
+            generate_summary_report(job["report_dir"], os.path.join(job["report_dir"], "summary.html"))
+        if report_format in ("bundle", "both"):
+            with span("bundle", "report", repo=repo_name):
+                create_bundle(job["report_dir"], compresslevel=report_config.get("compress_level", 6))
+        return job
+
+    def upload_stage(job):
+        repo_name = os.path.basename(job["repo"]["path"].rstrip('/'))
+        upload_reports_to_blob_storage(
+            job["report_dir"], repo_name, upload_connection_string,
+            max_concurrency=config.get("concurrency", {}).get("upload_concurrency", 8), report_format=report_format
+        )
+        if getattr(args, 'production', False):
+            logging.info("Production mode: uploaded reports to Azure Blob Storage.")
+        return job
+
+    def run_job(queued):
+        """Clone and scan the repository (or tool set) of one distributed job into the run's report folder."""
+        payload = queued.payload
+        # Jobs of one repository may run in several workers on the same host, so each worker clones apart
+        job = clone_stage(dict(payload["repo"], branch=payload["branch"]), os.path.join("cloned_repos", queued.worker))
+        if not os.path.isdir(job["local_path"]):
+            raise RuntimeError(f"Could not clone {payload['repo']['path']} (branch {payload['branch']})")
+        job.update(report_dir=payload["report_dir"], tools=payload["tools"])
+        commit_time = get_commit_time(job["local_path"]) if job["commit"] else None
+        for subfolder in ("json", "html"):
+            os.makedirs(os.path.join(job["report_dir"], subfolder), exist_ok=True)
+        try:
+            results = run_tasks(prepare_scan(job), max_workers=scan_workers)
+        finally:
+            shutil.rmtree(job["local_path"], ignore_errors=True)
+        failed = [name for name, result in results.items() if result.status != "success"]
+        if failed:
+            logging.warning(f"Tasks without a successful result for {payload['repo']['path']}: {', '.join(failed)}")
+        if distributed_config.get("upload", False):
+            upload_stage(job)
+        return {
+            "commit": job["commit"],
+            "commit_time": commit_time,
+            "local_path": job["local_path"],
+            "results": {name: result.status for name, result in results.items()},
+        }
+
+    def merge_run(job_queue, run_id):
+        """
+        Gather the finished jobs of a distributed run per repository, then build each repository's
+        summary (and findings store entry and bundle) and upload its reports, as a local run would.
+        Incremental state is only advanced for repositories whose jobs all finished.
+        """
+        merged = {}
+        for queued in job_queue.jobs(run_id):
+            payload = queued.payload
+            entry = merged.setdefault(payload["report_dir"], {
+                "repo": payload["repo"], "branch": payload["branch"], "report_dir": payload["report_dir"],
+                "report_root": report_root, "commit": None, "local_path": None, "jobs": [],
+            })
+            entry["jobs"].append(queued)
+            if queued.status == "done" and queued.result:
+                entry["commit"] = entry["commit"] or queued.result["commit"]
+                entry["local_path"] = entry["local_path"] or queued.result["local_path"]
+        if not merged:
+            logging.warning(f"No jobs found for run {run_id}")
+            return
+        ready = []
+        for entry in merged.values():
+            path = entry["repo"]["path"]
+            done = [queued for queued in entry["jobs"] if queued.status == "done"]
+            commits = {queued.result["commit"] for queued in done if queued.result}
+            if len(commits) > 1:
+                logging.warning(f"Jobs of {path} scanned different commits ({', '.join(sorted(map(str, commits)))})")
+            for queued in entry["jobs"]:
+                if queued.status != "done":
+                    logging.warning(f"Job {queued.id} for {path} is {queued.status} after {queued.attempts} attempt(s): {queued.error}")
+            if not done:
+                continue
+            if incremental_state is not None and len(done) == len(entry["jobs"]) and len(commits) == 1 and entry["commit"]:
+                incremental_state.record(
+                    path, entry["branch"], entry["commit"], done[0].result["commit_time"], entry["report_dir"],
+                    [queued.result["local_path"] for queued in done if queued.result],
+                    exclude_paths=get_exclusions(config, entry["repo"]).patterns
+                )
+            ready.append(entry)
+        run_pipeline([("render", render_stage), ("upload", upload_stage)], ready)
+        logging.info(f"Merged run {run_id}: {len(ready)} of {len(merged)} repositories have reports")
+
+    def run_distributed():
+        job_queue = get_queue(distributed_config.get("queue", {}))
+        if args.worker:
+            Worker(
+                job_queue, run_job,
+                lease_seconds=distributed_config.get("lease_seconds", 900),
+                heartbeat_seconds=distributed_config.get("heartbeat_seconds", 60),
+                poll_interval=distributed_config.get("poll_interval", 10),
+                idle_timeout=distributed_config.get("idle_timeout", 300),
+            ).run()
+            return
+        run_id = args.merge or trace_started
+        if not args.merge:
+            tool_sets = make_tool_sets(SCANNERS, distributed_config.get("tool_sets"), TOOL_DEPENDENCIES)
+            enqueue_run(job_queue, run_id, repos, config["general"]["branch"], tool_sets, report_root)
+        if args.enqueue:
+            print(run_id)
+            return
+        if args.coordinator:
+            wait_for_run(
+                job_queue, run_id, poll_interval=distributed_config.get("poll_interval", 10),
+                status_interval=pipeline_config.get("status_interval", 30), timeout=distributed_config.get("wait_timeout"),
+            )
+        merge_run(job_queue, run_id)
+        purged = job_queue.purge(distributed_config.get("purge_days", 30))
+        if purged:
+            logging.info(f"Removed {purged} finished jobs older than {distributed_config.get('purge_days', 30)} days from the queue")
+
+    def watch_scan(repo, head):
+        """Clone, scan, render and upload one repository whose branch moved; returns the scanned commit."""
+        refresh_background_update()
+        job = clone_stage(repo)
+        if not job["commit"]:
+            raise RuntimeError(f"Could not clone {repo['path']} (branch {job['branch']})")
+        if job["commit"] != head:
+            logging.info(f"{repo['path']} moved on to {job['commit'][:12]} since it was checked")
+        for stage in (scan_stage, render_stage, upload_stage):
+            job = stage(job)
+        if run_metrics is not None:
+            run_metrics.flush()
+        if cache is not None:
+            cache.evict()
+        return job["commit"]
+
+    def run_watch():
+        watch_config = config.get("watch", {})
+        watcher = RepoWatcher(
+            [dict(repo, branch=repo.get("branch", config["general"]["branch"])) for repo in repos],
+            lambda path, branch: get_remote_head(path, branch, GITHUB_TOKEN),
+            watch_scan,
+            poll_interval=watch_config.get("poll_interval", 300),
+            jitter=watch_config.get("jitter", 0.2),
+            max_concurrent=watch_config.get("max_concurrent_scans", 1),
+            check_workers=watch_config.get("check_workers", 4),
+            backoff_base=watch_config.get("backoff_base", 60),
+            backoff_max=watch_config.get("backoff_max", 3600),
+            status_path=watch_config.get("status_path", ".scan_state/watch.json"),
+            status_port=watch_config.get("status_port"),
+            status_host=watch_config.get("status_host", "127.0.0.1"),
+        )
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda signum, frame: watcher.stop())
+        watcher.run()
+
+    # Distributed runs write reports where every worker and the merge step can reach them
+    report_root = distributed_config.get("report_dir", REPORT_DIR)
+    repos = []
     for repo in config["repositories"]:
         if repo.get("skip", False):
             logging.info(f"Skipping repository: {repo['path']}")
             continue
-        branch = repo.get("branch", config["general"]["branch"])
-        local_path = clone_repository(repo["path"], branch, GITHUB_TOKEN)
-        logging.info(f"Scanning repository: {repo['path']} on branch {branch}")
-        timestamped_dir = get_timestamped_report_path(repo["path"])
-        # List of (tool, run_function) pairs
-        tools = [
-            ("gitleaks", gitleaks.run_gitleaks),
-            ("trufflehog", trufflehog.run_trufflehog),
-            ("semgrep", semgrep.run_semgrep),
-            ("syft", syft.run_syft),
-            ("grype", grype.run_grype),
-            ("bandit", bandit.run_bandit),
-            ("safety", lambda path, out: safety.run_safety(config["general"]["requirements_path"], out)),
-            ("checkov", checkov.run_checkov),
-            ("dependency-check", dependency_check.run_dependency_check),
-        ]
-        for tool_name, run_func in tools:
-            json_path = get_report_path(repo["path"], tool_name, timestamped_dir, fmt="json")
-            run_func(local_path, json_path)
-            html_path = get_report_path(repo["path"], tool_name, timestamped_dir, fmt="html")
-            try:
-                # Special handling for Checkov: if output is a directory, process recursively
-                if tool_name == "checkov" and os.path.isdir(json_path):
-                    # Recursively process all JSON files in the directory
-                    checkov_html_dir = os.path.join(timestamped_dir, "html", "checkov")
-                    os.makedirs(checkov_html_dir, exist_ok=True)
-                    render_html_from_json_recursive(json_path, checkov_html_dir, report_title="Checkov Report", scanner_name="checkov")
-                else:
-                    render_html_from_json(json_path, html_path, report_title=f"{tool_name.capitalize()} Report", scanner_name=tool_name)
-            except Exception as e:
-                logging.warning(f"Failed to generate HTML for {tool_name}: {e}")
-        dockerfile_path = os.path.join(local_path, "Dockerfile")
-        if os.path.exists(dockerfile_path):
-            hadolint_json = get_report_path(repo["path"], "hadolint", timestamped_dir, fmt="json")
-            hadolint.run_hadolint(dockerfile_path, hadolint_json)
-            hadolint_html = get_report_path(repo["path"], "hadolint", timestamped_dir, fmt="html")
-            try:
-                render_html_from_json(hadolint_json, hadolint_html, report_title="Hadolint Report", scanner_name="hadolint")
-            except Exception as e:
-                logging.warning(f"Failed to generate HTML for hadolint: {e}")
-        else:
-            logging.warning(f"Dockerfile not found for repository {repo['path']}, skipping Hadolint")
-        repo_name = os.path.basename(repo["path"].rstrip('/'))
-        generate_summary_report(timestamped_dir, os.path.join(timestamped_dir, "summary.html"))
-        if not getattr(args, 'production', False):
-            upload_reports_to_blob_storage(timestamped_dir, repo_name, azurite_connection_string)
+        repos.append(repo)
+    if scheduler is not None:
+        # Clone the repositories expected to take longest first, so their scans can start first
+        repos.sort(key=lambda repo: -sum(
+            estimator.estimate(os.path.basename(repo["path"].rstrip('/')), tool) for tool in DEFAULT_ESTIMATES
+        ))
+    pipeline_config = config.get("concurrency", {}).get("pipeline", {})
+    stage_limits = pipeline_config.get("stages", {})
+
+    def traced_stage(name, func):
+        def run(item):
+            repo = item.get("repo", item)
+            with span(name, "stage", repo=os.path.basename(repo["path"].rstrip('/'))):
+                return func(item)
+        return run
+
+    def run_pipeline(stage_funcs, items):
+        pipeline = Pipeline(
+            [Stage(name, traced_stage(name, func), stage_limits.get(name, 1)) for name, func in stage_funcs],
+            queue_size=pipeline_config.get("queue_size", 1),
+            status_interval=pipeline_config.get("status_interval", 30),
+        )
+        pipeline.run(items)
+
+    def feed_scheduler():
+        try:
+            run_pipeline([("clone", clone_stage), ("schedule", schedule_stage)], repos)
+        finally:
+            scheduler.close()
+
+    trace_started = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+    with span("scan-run", "run", repos=len(repos)):
+        if scheduler is not None:
+            # Cloned repositories are submitted to the scheduler; each one moves on to rendering when its last task ends
+            feeder = threading.Thread(target=feed_scheduler, name="scheduler-feed", daemon=True)
+            feeder.start()
+            scanned_jobs = (finish_scan(job, results) for job, results in scheduler.completed())
+        if args.watch:
+            run_watch()
+        elif distributed:
+            run_distributed()
+        elif batch_enabled:
+            # Dependency-Check runs once across all repositories, so rendering and uploading wait for every scan
+            if scheduler is not None:
+                scanned = list(scanned_jobs)
+            else:
+                scanned = []
+                run_pipeline([("clone", clone_stage), ("scan", scan_stage), ("collect", scanned.append)], repos)
+            run_batched_dependency_check(
+                scanned, config, cache=cache, shards=batch_config.get("shards", 1), timeout=batch_config.get("timeout", 3600),
+                metrics=run_metrics
+            )
+            run_pipeline([("render", render_stage), ("upload", upload_stage)], scanned)
+        elif scheduler is not None:
+            run_pipeline([("render", render_stage), ("upload", upload_stage)], scanned_jobs)
         else:
-            azure_account_name = os.getenv("STORAGE_ACCOUNT_NAME")
-            azure_account_key = os.getenv("STORAGE_ACCOUNT_KEY")
-            azure_endpoint = os.getenv("STORAGE_ACCOUNT_ENDPOINT", f"https://{azure_account_name}.blob.core.windows.net")
-            azure_connection_string = get_connection_string(azure_account_name, azure_account_key, azure_endpoint)
-            upload_reports_to_blob_storage(timestamped_dir, repo_name, azure_connection_string)
-            logging.info("Production mode: uploaded reports to Azure Blob Storage.")
+            run_pipeline([("clone", clone_stage), ("scan", scan_stage), ("render", render_stage), ("upload", upload_stage)], repos)
+        if scheduler is not None:
+            feeder.join()
+            schedule_report = scheduler.report(label=lambda job: os.path.basename(job["repo"]["path"].rstrip('/')))
+            if run_metrics is not None:
+                run_metrics.schedule = schedule_report
+        if run_metrics is not None and scans_here and not args.watch:
+            # Watch mode flushes the metrics after every scan
+            run_metrics.write()
+        if cache is not None:
+            cache.evict()
+        if mirror_store is not None:
+            mirror_store.gc([repo["path"] for repo in config["repositories"]], keep_paths=[repo["path"] for repo in repos])
+    if args.trace or args.profile:
+        trace_base = os.path.join(REPORT_DIR, "traces", trace_started)
+        stats = stop_tracing(f"{trace_base}.json", f"{trace_base}.prof")
+        if stats is not None:
+            stats.sort_stats("cumulative").print_stats(25)
     logging.info("All scans completed.")
     # Removed the generation of the summary.html in the root reports folder
 
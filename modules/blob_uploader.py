@@ -0,0 +1,198 @@
+import hashlib
+import logging
+import mimetypes
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from modules.tracing import span
+
+_uploaders = {}
+_uploaders_lock = threading.Lock()
+
+
+def sanitize_container_name(repo_name):
+    return repo_name.lower().replace('_', '-').replace('.', '-')
+
+
+def file_md5(path, chunk_size=1024 * 1024):
+    digest = hashlib.md5()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.digest()
+
+
+class BlobUploader:
+    """
+    Uploads report folders to Blob Storage with one client and HTTP connection pool for the
+    whole run. Container existence is checked once per container and files are uploaded
+    concurrently. Every blob is stored with its MD5; a file whose MD5 matches the same path in
+    the repository's previous report folder is copied server-side instead of uploaded again.
+    """
+
+    def __init__(self, connection_string, max_concurrency=8):
+        import requests
+        from azure.core.pipeline.transport import RequestsTransport
+        from azure.storage.blob import BlobServiceClient
+
+        self.max_concurrency = max(1, max_concurrency)
+        session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=self.max_concurrency)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        self.client = BlobServiceClient.from_connection_string(
+            connection_string, transport=RequestsTransport(session=session, session_owner=False)
+        )
+        self._containers = {}
+        self._containers_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="upload")
+
+    def container(self, name):
+        """Return a container client, creating the container on first use only."""
+        with self._containers_lock:
+            if name in self._containers:
+                return self._containers[name]
+            container_client = self.client.get_container_client(name)
+            if not container_client.exists():
+                container_client.create_container()
+            logging.info(f"Container '{name}' exists or was created successfully.")
+            self._containers[name] = container_client
+            return container_client
+
+    @staticmethod
+    def _previous_prefix(container_client, prefix):
+        """The latest top-level folder that sorts before prefix (report folders are named by time), or None."""
+        earlier = [
+            item.name.rstrip("/") for item in container_client.walk_blobs(delimiter="/")
+            if item.name.endswith("/") and item.name.rstrip("/") < prefix
+        ]
+        return max(earlier) if earlier else None
+
+    @staticmethod
+    def _existing_md5s(container_client, prefix):
+        """One listing call returns the stored MD5 of every blob under the prefix, by blob name."""
+        existing = {}
+        for blob in container_client.list_blobs(name_starts_with=prefix):
+            md5 = blob.content_settings.content_md5 if blob.content_settings else None
+            if md5:
+                existing[blob.name] = bytes(md5)
+        return existing
+
+    def previous_copies(self, container_name, prefix):
+        """
+        Map each blob of the previous report folder to its path under prefix, with its stored MD5.
+        :return: Dict of {blob path under prefix: (previous blob name, MD5)}; empty for the first run
+                 or when the container cannot be listed.
+        """
+        container_client = self.container(container_name)
+        try:
+            previous = self._previous_prefix(container_client, prefix)
+            if previous is None:
+                return {}
+            existing = self._existing_md5s(container_client, f"{previous}/")
+        except Exception as e:
+            logging.warning(f"Could not list earlier reports in '{container_name}', uploading everything: {e}")
+            return {}
+        logging.debug(f"Comparing {len(existing)} blobs with the previous report folder {previous}/")
+        return {f"{prefix}/{name[len(previous) + 1:]}": (name, md5) for name, md5 in existing.items()}
+
+    def _copy_blob(self, container_client, source_name, blob_path):
+        """Server-side copy within the container: nothing is sent but the request."""
+        with span("copy-blob", "upload", container=container_client.container_name, blob=blob_path):
+            source_url = container_client.get_blob_client(source_name).url
+            container_client.get_blob_client(blob_path).start_copy_from_url(source_url)
+
+    def _store_file(self, container_client, abs_path, blob_path, md5, source_name=None):
+        """
+        Copy an unchanged file from its previous blob, or upload it.
+        :return: (copied, bytes uploaded)
+        """
+        if source_name is not None:
+            try:
+                self._copy_blob(container_client, source_name, blob_path)
+                return True, 0
+            except Exception as e:
+                logging.warning(f"Could not copy {source_name} to {blob_path}, uploading it instead: {e}")
+        return False, self._upload_file(container_client, abs_path, blob_path, md5)
+
+    def _upload_file(self, container_client, abs_path, blob_path, md5):
+        from azure.storage.blob import ContentSettings
+
+        content_type, _ = mimetypes.guess_type(abs_path)
+        with span("upload-blob", "upload", container=container_client.container_name, blob=blob_path), open(abs_path, "rb") as data:
+            container_client.upload_blob(
+                blob_path, data, overwrite=True,
+                content_settings=ContentSettings(content_type=content_type, content_md5=bytearray(md5)),
+            )
+        return os.path.getsize(abs_path)
+
+    def upload_files(self, container_name, files, previous=None):
+        """
+        Upload (abs_path, blob_path) pairs into a container.
+        :param previous: Result of previous_copies; files whose MD5 matches are copied, not uploaded.
+        :return: Dict with uploaded, skipped (copied unchanged) and failed counts and uploaded bytes.
+        """
+        stats = {"uploaded": 0, "skipped": 0, "failed": 0, "bytes": 0}
+        if not files:
+            return stats
+        container_client = self.container(container_name)
+        previous = previous or {}
+        futures = {}
+        for abs_path, blob_path in files:
+            md5 = file_md5(abs_path)
+            source_name, previous_md5 = previous.get(blob_path, (None, None))
+            if previous_md5 != md5:
+                source_name = None
+            future = self._executor.submit(self._store_file, container_client, abs_path, blob_path, md5, source_name)
+            futures[future] = blob_path
+        for future in as_completed(futures):
+            blob_path = futures[future]
+            try:
+                copied, uploaded_bytes = future.result()
+                if copied:
+                    stats["skipped"] += 1
+                    logging.debug(f"Copied unchanged {blob_path} in container '{container_name}'")
+                else:
+                    stats["bytes"] += uploaded_bytes
+                    stats["uploaded"] += 1
+                    logging.debug(f"Uploaded {blob_path} to container '{container_name}'")
+            except Exception as e:
+                stats["failed"] += 1
+                logging.error(f"Error uploading {blob_path}: {e}")
+        return stats
+
+    def upload_directory(self, report_dir, repo_name):
+        """
+        Upload a timestamped report folder under '<timestamp>/' in the repository's container.
+        Files unchanged since the previous folder are copied from it server-side.
+        """
+        container_name = sanitize_container_name(repo_name)
+        prefix = os.path.basename(report_dir)
+        files = []
+        for root, dirs, filenames in os.walk(report_dir):
+            for file in filenames:
+                abs_path = os.path.join(root, file)
+                rel_path = os.path.relpath(abs_path, report_dir).replace(os.sep, "/")
+                files.append((abs_path, f"{prefix}/{rel_path}"))
+        try:
+            stats = self.upload_files(container_name, files, self.previous_copies(container_name, prefix))
+        except Exception as e:
+            logging.error(f"Error during container creation or existence check: {e}")
+            return None
+        logging.info(
+            f"Uploaded {stats['uploaded']} files ({stats['bytes'] / 1048576:.1f} MB) to container '{container_name}', "
+            f"{stats['skipped']} unchanged, {stats['failed']} failed"
+        )
+        return stats
+
+
+def get_uploader(connection_string, max_concurrency=8):
+    """Return the process-wide uploader for a connection string, creating it on first use."""
+    with _uploaders_lock:
+        uploader = _uploaders.get(connection_string)
+        if uploader is None:
+            uploader = BlobUploader(connection_string, max_concurrency)
+            _uploaders[connection_string] = uploader
+        return uploader
+
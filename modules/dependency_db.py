@@ -0,0 +1,134 @@
+import fcntl
+import json
+import logging
+import os
+import threading
+import time
+
+from modules.subprocess_utils import run_streaming
+
+_current = None
+# A failed update is not retried sooner than this by refresh_background_update
+RETRY_FAILED_UPDATE_SECONDS = 3600
+
+
+class DependencyCheckDatabase:
+    """
+    Lifecycle of the local Dependency-Check vulnerability database.
+    The last successful update is recorded in a state file and skipped while it is younger
+    than the TTL; a lock file keeps parallel runs from updating at the same time; the update
+    runs in a background thread so only Dependency-Check scans have to wait for it.
+    """
+
+    def __init__(self, state_path=".scan_state/dependency-check-db.json", ttl_hours=24, timeout=600):
+        self.state_path = state_path
+        self.lock_path = os.path.splitext(state_path)[0] + ".lock"
+        self.ttl_seconds = ttl_hours * 3600
+        self.timeout = timeout
+        self.succeeded = None
+        self.finished = None
+        self._ready = threading.Event()
+        self._thread = None
+        os.makedirs(os.path.dirname(state_path) or ".", exist_ok=True)
+
+    def last_success(self):
+        try:
+            with open(self.state_path) as f:
+                return json.load(f).get("last_success")
+        except (OSError, ValueError):
+            return None
+
+    def is_fresh(self):
+        last = self.last_success()
+        return last is not None and time.time() - last < self.ttl_seconds
+
+    def _record_success(self, duration):
+        tmp_path = self.state_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"last_success": time.time(), "duration": duration}, f)
+        os.replace(tmp_path, self.state_path)
+
+    def update(self):
+        """Update the database unless it is fresh. Safe to call from several processes at once."""
+        try:
+            if self.is_fresh():
+                logging.info("Dependency-Check database is up to date, skipping update")
+                self.succeeded = True
+                return
+            with open(self.lock_path, "a") as lock_file:
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    logging.info("Another run is updating the Dependency-Check database, waiting for it")
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    # The run holding the lock before us may just have refreshed the database
+                    if self.is_fresh():
+                        logging.info("Dependency-Check database was updated by another run")
+                        self.succeeded = True
+                        return
+                    logging.info("Updating OWASP Dependency-Check database")
+                    result = run_streaming(["dependency-check", "--update"], timeout=self.timeout)
+                    self.succeeded = result is not None and result.returncode == 0
+                    if self.succeeded:
+                        self._record_success(result.duration)
+                        logging.info(f"Dependency-Check database updated in {result.duration:.0f}s")
+                    else:
+                        logging.error("Dependency-Check database update failed, scans will use the existing data")
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+        except Exception:
+            logging.exception("Dependency-Check update failed")
+            self.succeeded = False
+        finally:
+            self.finished = time.time()
+            self._ready.set()
+
+    def start_background(self):
+        """Start the update in a background thread and return immediately."""
+        self._thread = threading.Thread(target=self.update, name="dependency-check-db", daemon=True)
+        self._thread.start()
+        return self
+
+    def wait(self):
+        """Block until the update has finished (or was skipped)."""
+        if not self._ready.is_set():
+            logging.info("Waiting for the Dependency-Check database update to finish")
+        self._ready.wait()
+        return self.succeeded
+
+
+def start_background_update(state_path=".scan_state/dependency-check-db.json", ttl_hours=24, timeout=600):
+    """Start managing the database for this process; run_dependency_check waits for it."""
+    global _current
+    _current = DependencyCheckDatabase(state_path, ttl_hours, timeout).start_background()
+    return _current
+
+
+def refresh_background_update():
+    """
+    Start another background update when the last one has finished and the database has aged past
+    its TTL (or the last update failed over an hour ago); long-running watch mode calls this before each scan.
+    """
+    global _current
+    if _current is None or not _current._ready.is_set() or _current.is_fresh():
+        return _current
+    if _current.succeeded or time.time() - _current.finished > RETRY_FAILED_UPDATE_SECONDS:
+        _current = DependencyCheckDatabase(_current.state_path, _current.ttl_seconds / 3600, _current.timeout).start_background()
+    return _current
+
+
+def database_updated():
+    """Time of the last successful database update of the managed database, or None."""
+    return _current.last_success() if _current is not None else None
+
+
+def wait_for_database():
+    """
+    Wait for the background update started by start_background_update.
+    :return: True if the database is managed by this process (scans can skip their own update), else False.
+    """
+    if _current is None:
+        return False
+    _current.wait()
+    return True
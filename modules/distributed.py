@@ -0,0 +1,146 @@
+import logging
+import os
+import socket
+import threading
+import time
+
+
+def make_tool_sets(tools, split, dependencies=None):
+    """
+    Split the scanners into the tool sets that become separate jobs per repository.
+    :param tools: Every scanner name.
+    :param split: List of tool lists (from distributed.tool_sets); each becomes one job and the
+                  remaining tools form one more.
+    :param dependencies: Dict mapping a tool to the tools whose reports it reads; such tools stay in one set.
+    :return: List of tool lists; [None] (one job with every tool) when nothing is split off.
+    """
+    linked = {tool: set() for tool in tools}
+    for tool, deps in (dependencies or {}).items():
+        for dep in deps:
+            linked.setdefault(tool, set()).add(dep)
+            linked.setdefault(dep, set()).add(tool)
+    sets, taken = [], set()
+    for group in split or []:
+        selected, stack = set(), list(group)
+        while stack:
+            tool = stack.pop()
+            if tool not in selected:
+                selected.add(tool)
+                stack.extend(linked.get(tool, ()))
+        selected = [tool for tool in tools if tool in selected and tool not in taken]
+        if selected:
+            sets.append(selected)
+            taken.update(selected)
+    rest = [tool for tool in tools if tool not in taken]
+    if not sets:
+        return [None]
+    return sets + ([rest] if rest else [])
+
+
+def enqueue_run(queue, run_id, repos, default_branch, tool_sets, report_root):
+    """
+    Queue one job per repository and tool set. Every job of a repository writes into the same
+    report folder, <report_root>/<repo name>/<run_id>, so the merge step finds them together.
+    :return: Number of jobs queued.
+    """
+    payloads = []
+    for repo in repos:
+        repo_name = os.path.basename(repo["path"].rstrip('/'))
+        for tools in tool_sets:
+            payloads.append({
+                "repo": repo,
+                "branch": repo.get("branch", default_branch),
+                "tools": tools,
+                "report_dir": os.path.join(report_root, repo_name, run_id),
+            })
+    queue.enqueue(run_id, payloads)
+    logging.info(f"Queued {len(payloads)} jobs for {len(repos)} repositories as run {run_id}")
+    return len(payloads)
+
+
+def wait_for_run(queue, run_id, poll_interval=10, status_interval=60, timeout=None):
+    """
+    Wait until none of the run's jobs is pending or leased, returning expired leases to the queue
+    meanwhile so jobs of dead workers are retried even when no worker is asking for work.
+    :return: The final job counts per status.
+    """
+    started = last_status = time.monotonic()
+    while True:
+        queue.requeue_expired()
+        counts = queue.counts(run_id)
+        if not counts["pending"] and not counts["leased"]:
+            logging.info(f"Run {run_id} finished: {counts['done']} jobs done, {counts['failed']} failed")
+            return counts
+        if time.monotonic() - last_status >= status_interval:
+            last_status = time.monotonic()
+            logging.info(
+                f"Run {run_id}: {counts['pending']} pending, {counts['leased']} running, "
+                f"{counts['done']} done, {counts['failed']} failed"
+            )
+        if timeout and time.monotonic() - started > timeout:
+            logging.warning(f"Stopped waiting for run {run_id} after {timeout}s: {counts}")
+            return counts
+        time.sleep(poll_interval)
+
+
+class Worker:
+    """
+    Lease jobs from the queue and run them one at a time with handle(job), which returns the job's
+    result. While a job runs, a heartbeat thread keeps its lease alive. A job that raises is given
+    back to the queue for another attempt; a job whose lease was lost (it was handed to another
+    worker after this one stalled) is not completed here.
+    """
+
+    def __init__(self, queue, handle, worker_id=None, lease_seconds=900, heartbeat_seconds=60,
+                 poll_interval=10, idle_timeout=300):
+        self.queue = queue
+        self.handle = handle
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.lease_seconds = lease_seconds
+        self.heartbeat_seconds = heartbeat_seconds
+        self.poll_interval = poll_interval
+        self.idle_timeout = idle_timeout
+
+    def _heartbeat(self, job, stop):
+        while not stop.wait(self.heartbeat_seconds):
+            if not self.queue.heartbeat(job, self.lease_seconds):
+                logging.warning(f"Worker {self.worker_id} lost the lease on job {job.id}; its result will be discarded")
+                return
+
+    def run_job(self, job):
+        stop = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat, args=(job, stop), name=f"heartbeat-{job.id}", daemon=True)
+        heartbeat.start()
+        try:
+            result = self.handle(job)
+        except Exception as e:
+            logging.exception(f"Job {job.id} failed on worker {self.worker_id}")
+            stop.set()
+            heartbeat.join()
+            self.queue.fail(job, e)
+            return False
+        stop.set()
+        heartbeat.join()
+        if not self.queue.complete(job, result):
+            logging.warning(f"Job {job.id} finished after its lease was lost; the result was not recorded")
+            return False
+        return True
+
+    def run(self):
+        """
+        Process jobs until none has been available for idle_timeout seconds (0 = keep polling forever).
+        :return: Number of jobs completed by this worker.
+        """
+        logging.info(f"Worker {self.worker_id} waiting for jobs")
+        completed, idle_since = 0, time.monotonic()
+        while True:
+            job = self.queue.lease(self.worker_id, self.lease_seconds)
+            if job is None:
+                if self.idle_timeout and time.monotonic() - idle_since >= self.idle_timeout:
+                    logging.info(f"Worker {self.worker_id} idle for {self.idle_timeout}s, exiting after {completed} jobs")
+                    return completed
+                time.sleep(self.poll_interval)
+                continue
+            logging.info(f"Worker {self.worker_id} took job {job.id} (attempt {job.attempts}) of run {job.run_id}")
+            completed += self.run_job(job)
+            idle_since = time.monotonic()
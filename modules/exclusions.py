@@ -0,0 +1,198 @@
+"""
+Path exclusions shared by every scanner: the global exclude_paths setting plus a repository's own
+exclude_paths, translated into each tool's exclusion flags.
+
+Patterns follow .gitignore conventions, relative to the repository root:
+  node_modules        a file or directory with this name at any depth
+  docs/build          a pattern containing "/" (or starting with "/") only matches from the root
+  dist/               a trailing "/" only matches directories
+  *.min.js            "*" and "?" stay within one path segment; "**" spans segments (tests/**/fixtures)
+"""
+import json
+import logging
+import os
+import re
+
+
+def _glob_to_regex(glob):
+    """Translate a glob to a regular expression where only "**" crosses "/"."""
+    out, i = [], 0
+    while i < len(glob):
+        if glob.startswith("**/", i):
+            out.append("(?:.*/)?")
+            i += 3
+        elif glob.startswith("**", i):
+            out.append(".*")
+            i += 2
+        elif glob[i] == "*":
+            out.append("[^/]*")
+            i += 1
+        elif glob[i] == "?":
+            out.append("[^/]")
+            i += 1
+        elif glob[i] == "[" and "]" in glob[i + 2:]:
+            end = glob.index("]", i + 2)
+            body = glob[i + 1:end]
+            out.append("[" + ("^" + body[1:] if body.startswith("!") else body).replace("\\", "\\\\") + "]")
+            i = end + 1
+        else:
+            out.append(re.escape(glob[i]))
+            i += 1
+    return "".join(out)
+
+
+def _normalize_root(root):
+    return os.path.normpath(root).replace(os.sep, "/").lstrip("/")
+
+
+class ExcludeRule:
+    """One exclude_paths pattern."""
+
+    def __init__(self, pattern):
+        self.pattern = pattern.strip()
+        body = self.pattern
+        if body.startswith("./"):
+            body = body[2:]
+        self.dir_only = body.endswith("/")
+        self.anchored = "/" in body.rstrip("/")
+        body = body.strip("/")
+        if not self.anchored or body.startswith("**/"):
+            self.anchored = False
+            body = body[3:] if body.startswith("**/") else body
+        self.glob = body
+        self.regex_body = _glob_to_regex(body)
+        prefix = "" if self.anchored else "(?:.*/)?"
+        self._exact = re.compile(f"^{prefix}{self.regex_body}$")
+        self._inside = re.compile(f"^{prefix}{self.regex_body}/")
+
+    def matches(self, rel_path, is_dir=False):
+        """True when the repo-relative path is excluded by this rule, itself or through a parent directory."""
+        rel_path = rel_path.replace(os.sep, "/")
+        if self._inside.match(rel_path):
+            return True
+        return bool(self._exact.match(rel_path)) and (is_dir or not self.dir_only)
+
+    def regex(self, root=None):
+        """
+        Regular expression for tools that search it in the paths they report.
+        :param root: The scan target as the tool prints it; None when the tool reports repo-relative paths.
+        """
+        if self.anchored:
+            head = f"(?:^|/){re.escape(_normalize_root(root))}/" if root else "^"
+        else:
+            head = "(?:^|/)"
+        return head + self.regex_body + ("/" if self.dir_only else "(?:/|$)")
+
+    def globs(self, anchored_prefix, any_prefix):
+        """The rule as globs for the path itself and everything below it."""
+        prefix = anchored_prefix if self.anchored else any_prefix
+        globs = [] if self.dir_only else [f"{prefix}{self.glob}"]
+        return globs + [f"{prefix}{self.glob}/**"]
+
+
+class PathExclusions:
+    """The exclude_paths rules of one repository and the files and bytes each rule kept out of the scan."""
+
+    def __init__(self, patterns=()):
+        self.rules = [ExcludeRule(pattern) for pattern in dict.fromkeys(patterns or []) if pattern and pattern.strip()]
+        self.excluded = {rule.pattern: {"files": 0, "bytes": 0} for rule in self.rules}
+
+    def __bool__(self):
+        return bool(self.rules)
+
+    @property
+    def patterns(self):
+        return [rule.pattern for rule in self.rules]
+
+    def match(self, rel_path, is_dir=False):
+        """The first rule excluding a repo-relative path, or None."""
+        for rule in self.rules:
+            if rule.matches(rel_path, is_dir):
+                return rule
+        return None
+
+    def filter(self, rel_paths):
+        """Drop the excluded paths from a list of repo-relative files (for tools given explicit file lists)."""
+        return [path for path in rel_paths if self.match(path) is None]
+
+    def regexes(self, root=None):
+        return [rule.regex(root) for rule in self.rules]
+
+    def globs(self, anchored_prefix, any_prefix):
+        return [glob for rule in self.rules for glob in rule.globs(anchored_prefix, any_prefix)]
+
+    def _count(self, rule, path, size=None):
+        """Add a file, or every file below a directory, to the rule's totals."""
+        counts = self.excluded[rule.pattern]
+        if size is not None:
+            counts["files"] += 1
+            counts["bytes"] += size
+            return
+        for directory, _, files in os.walk(path):
+            for name in files:
+                try:
+                    counts["bytes"] += os.lstat(os.path.join(directory, name)).st_size
+                    counts["files"] += 1
+                except OSError:
+                    pass
+
+    def to_dict(self):
+        return {
+            "files": sum(counts["files"] for counts in self.excluded.values()),
+            "bytes": sum(counts["bytes"] for counts in self.excluded.values()),
+            "rules": [dict(pattern=pattern, **counts) for pattern, counts in self.excluded.items()],
+        }
+
+    def write(self, report_dir):
+        """Write exclusions.json with the files and bytes excluded per rule."""
+        path = os.path.join(report_dir, "exclusions.json")
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.to_dict(), f, indent=4)
+        os.replace(tmp_path, path)
+        return path
+
+
+def walk_files(local_path, exclusions=None):
+    """
+    Yield (DirEntry, repo-relative path) for every file of a checkout outside .git, skipping what the
+    exclusions match; excluded files and directories are counted against their rule instead.
+    """
+    stack = [local_path]
+    while stack:
+        directory = stack.pop()
+        try:
+            entries = list(os.scandir(directory))
+        except OSError as e:
+            logging.warning(f"Could not read {directory}: {e}")
+            continue
+        for entry in entries:
+            rel_path = os.path.relpath(entry.path, local_path)
+            if entry.is_dir(follow_symlinks=False):
+                if entry.name == ".git":
+                    continue
+                rule = exclusions.match(rel_path, is_dir=True) if exclusions else None
+                if rule is None:
+                    stack.append(entry.path)
+                else:
+                    exclusions._count(rule, entry.path)
+                continue
+            if not entry.is_file(follow_symlinks=False):
+                continue
+            rule = exclusions.match(rel_path) if exclusions else None
+            if rule is None:
+                yield entry, rel_path
+            else:
+                exclusions._count(rule, entry.path, entry.stat(follow_symlinks=False).st_size)
+
+
+def measure_exclusions(local_path, exclusions):
+    """Count what the exclusions keep out of a checkout when no inventory walk does it."""
+    for _ in walk_files(local_path, exclusions):
+        pass
+    return exclusions
+
+
+def get_exclusions(config, repo):
+    """The global exclude_paths followed by the repository's own exclude_paths."""
+    return PathExclusions(list(config.get("exclude_paths") or []) + list(repo.get("exclude_paths") or []))
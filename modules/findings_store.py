@@ -0,0 +1,262 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from modules.incremental import repo_relative
+
+SEVERITY_LEVELS = {"critical": 4, "high": 3, "medium": 2, "low": 1, "info": 0, "unknown": -1}
+# Tool-specific severity words mapped onto SEVERITY_LEVELS
+SEVERITY_ALIASES = {
+    "error": "high",
+    "warning": "medium",
+    "moderate": "medium",
+    "negligible": "info",
+    "informational": "info",
+    "style": "info",
+    "note": "info",
+}
+GROUP_COLUMNS = ("repo", "tool", "rule_id", "severity", "file", "run_id")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    repo TEXT NOT NULL,
+    branch TEXT,
+    commit_sha TEXT,
+    report_dir TEXT,
+    started REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS findings (
+    id INTEGER PRIMARY KEY,
+    run_id TEXT NOT NULL REFERENCES runs(run_id) ON DELETE CASCADE,
+    repo TEXT NOT NULL,
+    commit_sha TEXT,
+    started REAL NOT NULL,
+    tool TEXT NOT NULL,
+    rule_id TEXT,
+    severity TEXT NOT NULL,
+    severity_level INTEGER NOT NULL,
+    file TEXT,
+    line INTEGER,
+    fingerprint TEXT NOT NULL,
+    message TEXT
+);
+CREATE INDEX IF NOT EXISTS runs_repo_started ON runs(repo, started);
+CREATE INDEX IF NOT EXISTS findings_run ON findings(run_id, tool);
+CREATE INDEX IF NOT EXISTS findings_rule ON findings(rule_id, repo);
+CREATE INDEX IF NOT EXISTS findings_severity ON findings(severity_level, started);
+CREATE INDEX IF NOT EXISTS findings_repo_started ON findings(repo, started);
+CREATE INDEX IF NOT EXISTS findings_fingerprint ON findings(fingerprint);
+"""
+
+
+def normalize_severity(value):
+    """Map a tool's severity word onto critical/high/medium/low/info/unknown."""
+    if not value:
+        return "unknown"
+    severity = str(value).strip().lower()
+    severity = SEVERITY_ALIASES.get(severity, severity)
+    return severity if severity in SEVERITY_LEVELS else "unknown"
+
+
+def finding_fingerprint(tool_name, record):
+    """Fingerprint stable across runs: the tool's own when it has one, else tool, rule, file and line."""
+    if record.get("fingerprint"):
+        return str(record["fingerprint"])
+    key = json.dumps([tool_name, record.get("rule_id"), record.get("file"), record.get("line")])
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def parse_since(value):
+    """Accept an ISO date/time or a relative age such as '7d', '12h' or '30m'; return a Unix timestamp."""
+    match = re.fullmatch(r"(\d+)([dhm])", value.strip())
+    if match:
+        amount, unit = int(match.group(1)), match.group(2)
+        return time.time() - amount * {"d": 86400, "h": 3600, "m": 60}[unit]
+    return datetime.fromisoformat(value).timestamp()
+
+
+def report_location(report_dir, tool_name):
+    """Path of a tool's JSON report in a report folder (Checkov writes a directory), or None if missing."""
+    path = os.path.join(report_dir, "json", f"{tool_name}.json")
+    return path if os.path.exists(path) else None
+
+
+class FindingsStore:
+    """
+    SQLite store of normalized findings across repositories and runs.
+    Each scanner module provides a normalize_<tool>_report function; the records it yields
+    are loaded here with the run's repository, commit and time so cross-repo and cross-run
+    questions are answered from indexes instead of re-parsing every report.
+    """
+
+    def __init__(self, path=".scan_state/findings.db"):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        """Connection that commits on success, rolls back on error and is always closed."""
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA foreign_keys=ON")
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def load_run(self, run_id, repo, branch, commit, report_dir, local_path, normalizers, started=None):
+        """
+        Normalize every tool report in report_dir and replace the run's findings in one transaction.
+        :param normalizers: Dict mapping tool name to its normalize function (report path -> records).
+        :return: Number of findings stored.
+        """
+        started = started or time.time()
+        rows = []
+        for tool_name, normalize in normalizers.items():
+            report_path = report_location(report_dir, tool_name)
+            if report_path is None:
+                continue
+            try:
+                records = list(normalize(report_path))
+            except (OSError, ValueError, AttributeError, TypeError) as e:
+                logging.warning(f"Could not normalize {tool_name} report {report_path}: {e}")
+                continue
+            for record in records:
+                file_path = record.get("file")
+                if file_path and local_path:
+                    file_path = repo_relative(str(file_path), local_path)
+                line = record.get("line")
+                severity = normalize_severity(record.get("severity"))
+                rows.append((
+                    run_id, repo, commit, started, tool_name, record.get("rule_id"), severity,
+                    SEVERITY_LEVELS[severity], file_path, line if isinstance(line, int) else None,
+                    finding_fingerprint(tool_name, dict(record, file=file_path)), record.get("message"),
+                ))
+        try:
+            with self._lock, self._connect() as conn:
+                conn.execute("DELETE FROM runs WHERE run_id = ?", (run_id,))
+                conn.execute(
+                    "INSERT INTO runs (run_id, repo, branch, commit_sha, report_dir, started) VALUES (?, ?, ?, ?, ?, ?)",
+                    (run_id, repo, branch, commit, report_dir, started),
+                )
+                conn.executemany(
+                    "INSERT INTO findings (run_id, repo, commit_sha, started, tool, rule_id, severity, severity_level, "
+                    "file, line, fingerprint, message) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+        except sqlite3.Error as e:
+            logging.error(f"Could not store findings for {run_id}: {e}")
+            return 0
+        logging.info(f"Stored {len(rows)} normalized findings for {run_id}")
+        return len(rows)
+
+    def query(self, repo=None, tool=None, rule=None, severity=None, since=None, latest=False, group_by=None, limit=100):
+        """
+        Select findings matching every given filter.
+        :param repo: Repository name; '%' wildcards are allowed.
+        :param rule: Rule or CVE id; '%' wildcards are allowed.
+        :param severity: Minimum severity (e.g. 'high' also returns critical).
+        :param since: Unix timestamp; only runs started at or after it.
+        :param latest: Only each repository's most recent run.
+        :param group_by: Column from GROUP_COLUMNS to count findings by instead of listing them.
+        :return: (column names, rows)
+        """
+        where, params = [], []
+        if repo:
+            # Plain equality keeps the index usable; LIKE only when a wildcard is given
+            where.append("f.repo LIKE ?" if "%" in repo else "f.repo = ?")
+            params.append(repo)
+        if tool:
+            where.append("f.tool = ?")
+            params.append(tool)
+        if rule:
+            where.append("f.rule_id LIKE ?" if "%" in rule else "f.rule_id = ?")
+            params.append(rule)
+        if severity:
+            where.append("f.severity_level >= ?")
+            params.append(SEVERITY_LEVELS[normalize_severity(severity)])
+        if since is not None:
+            where.append("f.started >= ?")
+            params.append(since)
+        if latest:
+            where.append("f.started = (SELECT MAX(r.started) FROM runs r WHERE r.repo = f.repo)")
+        clause = f"WHERE {' AND '.join(where)}" if where else ""
+        if group_by:
+            if group_by not in GROUP_COLUMNS:
+                raise ValueError(f"Cannot group by '{group_by}'")
+            sql = (
+                f"SELECT f.{group_by}, COUNT(*) AS findings, COUNT(DISTINCT f.repo) AS repos, "
+                f"datetime(MAX(f.started), 'unixepoch') AS last_seen "
+                f"FROM findings f {clause} GROUP BY f.{group_by} ORDER BY findings DESC LIMIT ?"
+            )
+        else:
+            sql = (
+                "SELECT f.repo, datetime(f.started, 'unixepoch') AS run_time, f.tool, f.severity, f.rule_id, "
+                "f.file, f.line, substr(f.commit_sha, 1, 12) AS commit_sha, f.message "
+                f"FROM findings f {clause} ORDER BY f.severity_level DESC, f.started DESC LIMIT ?"
+            )
+        params.append(limit)
+        with self._connect() as conn:
+            cursor = conn.execute(sql, params)
+            return [column[0] for column in cursor.description], cursor.fetchall()
+
+    def query_sql(self, sql):
+        """Run a read-only SQL statement against the store."""
+        conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+        try:
+            cursor = conn.execute(sql)
+            return [column[0] for column in cursor.description or []], cursor.fetchall()
+        finally:
+            conn.close()
+
+
+def print_rows(columns, rows, as_json=False, out=None):
+    # Looked up per call, so redirected stdout is honoured
+    out = out or sys.stdout
+    if as_json:
+        json.dump([dict(zip(columns, row)) for row in rows], out, indent=4)
+        out.write("\n")
+        return
+    cells = [[("" if value is None else str(value))[:80] for value in row] for row in rows]
+    widths = [max([len(column)] + [len(row[i]) for row in cells]) for i, column in enumerate(columns)]
+    out.write("  ".join(column.ljust(width) for column, width in zip(columns, widths)).rstrip() + "\n")
+    for row in cells:
+        out.write("  ".join(value.ljust(width) for value, width in zip(row, widths)).rstrip() + "\n")
+
+
+def run_query_command(store_path, args):
+    """Entry point of `main.py query`: print findings matching the command-line filters."""
+    if not os.path.exists(store_path):
+        print(f"No findings store at {store_path}; run a scan first.", file=sys.stderr)
+        return 1
+    store = FindingsStore(store_path)
+    start = time.perf_counter()
+    try:
+        if args.sql:
+            columns, rows = store.query_sql(args.sql)
+        else:
+            columns, rows = store.query(
+                repo=args.repo, tool=args.tool, rule=args.rule, severity=args.severity,
+                since=parse_since(args.since) if args.since else None, latest=args.latest,
+                group_by=args.group_by, limit=args.limit,
+            )
+    except (ValueError, sqlite3.Error) as e:
+        print(f"Query failed: {e}", file=sys.stderr)
+        return 1
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    print_rows(columns, rows, as_json=args.json)
+    print(f"{len(rows)} rows in {elapsed_ms:.1f} ms", file=sys.stderr)
+    return 0
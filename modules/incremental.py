@@ -0,0 +1,199 @@
+import json
+import logging
+import os
+import subprocess
+import tempfile
+import threading
+import time
+from dataclasses import dataclass, field
+
+# File types checkov can analyse; used to narrow an incremental checkov run to changed IaC files
+IAC_EXTENSIONS = (".tf", ".tf.json", ".hcl", ".yaml", ".yml", ".json", ".template", ".bicep")
+IAC_FILENAMES = ("Dockerfile",)
+
+
+@dataclass
+class ChangeSet:
+    """Files that differ between the last scanned commit and the current HEAD (repo-relative paths)."""
+    base_commit: str
+    head_commit: str
+    previous_report_dir: str
+    changed: list = field(default_factory=list)
+    deleted: list = field(default_factory=list)
+    previous_roots: list = field(default_factory=list)  # Checkout paths the previous reports were written under
+
+    @property
+    def stale(self):
+        """Paths whose previous findings can no longer be carried forward."""
+        return set(self.changed) | set(self.deleted)
+
+    def changed_with_suffix(self, suffixes):
+        return [path for path in self.changed if path.endswith(suffixes)]
+
+    def changed_iac(self):
+        return [
+            path for path in self.changed
+            if path.endswith(IAC_EXTENSIONS) or os.path.basename(path) in IAC_FILENAMES
+        ]
+
+    def previous_report(self, tool_name):
+        """Path of the tool's JSON report from the last scan, or None if it is missing."""
+        path = os.path.join(self.previous_report_dir, "json", f"{tool_name}.json")
+        return path if os.path.exists(path) else None
+
+
+def repo_relative(path, target_path, other_roots=()):
+    """
+    Normalize a path reported by a scanner to a repo-relative path, whether the tool
+    printed it relative to the working directory, relative to the scan root or absolute.
+    :param other_roots: Further checkout paths the report may have been written under, such as
+        the clone directory of an earlier scan on another worker or host.
+    """
+    normalized = os.path.normpath(path).lstrip("/")
+    roots = [os.path.normpath(target_path), os.path.abspath(target_path)] + [os.path.normpath(root) for root in other_roots]
+    for root in roots:
+        root = root.lstrip("/")
+        if root and normalized.startswith(root + "/"):
+            return normalized[len(root) + 1:]
+    if normalized.startswith("./"):
+        return normalized[2:]
+    return normalized
+
+
+def write_json_report(data, report_path):
+    """Write a merged report through a temporary file so a partially written report is never left behind."""
+    directory = os.path.dirname(report_path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    with os.fdopen(fd, "w") as f:
+        json.dump(data, f, indent=4)
+    os.replace(tmp_path, report_path)
+
+
+class IncrementalState:
+    """Persistent record of the last scanned commit (and its report folder) per repository and branch."""
+
+    def __init__(self, path=".scan_state/incremental.json"):
+        self.path = path
+        self._lock = threading.Lock()
+        try:
+            with open(path) as f:
+                self._state = json.load(f)
+        except FileNotFoundError:
+            self._state = {}
+        except ValueError as e:
+            logging.warning(f"Ignoring unreadable incremental state {path}: {e}")
+            self._state = {}
+
+    @staticmethod
+    def _key(repo_path, branch):
+        return f"{repo_path}@{branch}"
+
+    def get(self, repo_path, branch):
+        with self._lock:
+            return self._state.get(self._key(repo_path, branch))
+
+    def record(self, repo_path, branch, commit, commit_time, report_dir, scan_roots, exclude_paths=None):
+        """
+        :param scan_roots: Checkout paths the tools scanned (one per worker in a distributed run). Paths
+            under them in the reports are stripped when a later scan, possibly from another checkout,
+            carries findings forward.
+        """
+        with self._lock:
+            self._state[self._key(repo_path, branch)] = {
+                "commit": commit,
+                "commit_time": commit_time,
+                "report_dir": report_dir,
+                "scan_roots": list(dict.fromkeys(
+                    path for root in scan_roots for path in (os.path.normpath(root), os.path.abspath(root))
+                )),
+                "exclude_paths": exclude_paths or [],
+                "scanned_at": time.time(),
+            }
+            write_json_report(self._state, self.path)
+
+
+def get_commit_time(local_path, commit="HEAD"):
+    """Return the committer timestamp of a commit, or None."""
+    try:
+        result = subprocess.run(
+            ["git", "show", "-s", "--format=%ct", commit], cwd=local_path, check=True, capture_output=True, text=True
+        )
+        return int(result.stdout.strip())
+    except (subprocess.CalledProcessError, FileNotFoundError, ValueError):
+        return None
+
+
+def _has_commit(local_path, commit):
+    return subprocess.run(
+        ["git", "cat-file", "-e", f"{commit}^{{commit}}"], cwd=local_path, capture_output=True
+    ).returncode == 0
+
+
+def _ensure_history(local_path, branch, base_commit, base_commit_time):
+    """Deepen a shallow clone until it contains base_commit, so diffs and log ranges work."""
+    if _has_commit(local_path, base_commit):
+        return True
+    if base_commit_time:
+        subprocess.run(
+            ["git", "fetch", "--quiet", f"--shallow-since={int(base_commit_time) - 1}", "origin", branch],
+            cwd=local_path, capture_output=True
+        )
+    if not _has_commit(local_path, base_commit):
+        # Fall back to fetching the commit itself; the diff still works without the commits in between
+        subprocess.run(
+            ["git", "fetch", "--quiet", "--depth", "1", "origin", base_commit], cwd=local_path, capture_output=True
+        )
+    return _has_commit(local_path, base_commit)
+
+
+def compute_change_set(local_path, branch, previous, head_commit, max_changed_files=None, exclusions=None):
+    """
+    Build the ChangeSet between the previously scanned commit and head_commit, without the paths
+    the exclusions match. Returns None when an incremental scan is not possible and the repository
+    must be scanned in full.
+    """
+    if not previous or not head_commit or previous.get("commit") == head_commit:
+        return None
+    patterns = exclusions.patterns if exclusions else []
+    if previous.get("exclude_paths", []) != patterns:
+        # Findings carried forward from the last scan may sit in paths that are now excluded, or miss newly included ones
+        logging.info(f"exclude_paths changed since the last scan of {local_path}, running a full scan")
+        return None
+    if "scan_roots" not in previous:
+        # Without the checkout path, findings of changed files cannot be told apart in the previous reports
+        logging.info(f"Last scan of {local_path} did not record its checkout path, running a full scan")
+        return None
+    if not os.path.isdir(previous.get("report_dir") or ""):
+        logging.info(f"Previous report folder for {local_path} is gone, running a full scan")
+        return None
+    base_commit = previous["commit"]
+    if not _ensure_history(local_path, branch, base_commit, previous.get("commit_time")):
+        logging.warning(f"Commit {base_commit[:12]} is not reachable from {local_path}, running a full scan")
+        return None
+    try:
+        result = subprocess.run(
+            ["git", "diff", "--name-status", "-z", "--no-renames", base_commit, head_commit],
+            cwd=local_path, check=True, capture_output=True, text=True
+        )
+    except subprocess.CalledProcessError as e:
+        logging.warning(f"git diff failed in {local_path}, running a full scan: {e.stderr}")
+        return None
+    changes = ChangeSet(base_commit, head_commit, previous["report_dir"], previous_roots=previous["scan_roots"])
+    fields = result.stdout.split("\0")
+    for status, path in zip(fields[0::2], fields[1::2]):
+        if status.startswith("D"):
+            changes.deleted.append(path)
+        else:
+            changes.changed.append(path)
+    if exclusions:
+        # Tools given explicit file lists bypass their own exclusion flags
+        changes.changed = exclusions.filter(changes.changed)
+    if max_changed_files and len(changes.changed) > max_changed_files:
+        logging.info(f"{len(changes.changed)} files changed in {local_path}, running a full scan")
+        return None
+    logging.info(
+        f"Incremental scan of {local_path}: {base_commit[:12]}..{head_commit[:12]}, "
+        f"{len(changes.changed)} changed and {len(changes.deleted)} deleted files"
+    )
+    return changes
@@ -0,0 +1,176 @@
+"""
+Repository inventory: one walk over a checkout that records what the scanners could look at.
+
+Every scanner module declares APPLIES_TO, a tuple of the facets below; a scanner applies to a
+repository when the inventory has at least one of them (APPLIES_TO = None means always).
+  <language>   source files of a language, e.g. python, javascript, java, go ("source" = any language)
+  manifest     package manifests (requirements.txt, package.json, pom.xml, go.mod, ...)
+  lockfile     resolved dependency lockfiles (poetry.lock, package-lock.json, go.sum, ...)
+  <ecosystem>  the ecosystem of a manifest or lockfile, e.g. pypi, npm, maven, go
+  archive      packaged dependencies checked in as files (.jar, .whl, .nupkg, ...)
+  iac          Terraform, CloudFormation, Kubernetes, Helm, ARM/Bicep and CI pipeline files
+  dockerfile   Dockerfiles and Containerfiles anywhere in the tree
+"""
+import fnmatch
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+
+from modules.exclusions import walk_files
+
+LANGUAGES = {
+    ".py": "python", ".pyi": "python", ".pyw": "python",
+    ".js": "javascript", ".jsx": "javascript", ".mjs": "javascript", ".cjs": "javascript",
+    ".ts": "typescript", ".tsx": "typescript",
+    ".java": "java", ".kt": "kotlin", ".kts": "kotlin", ".scala": "scala",
+    ".go": "go", ".rb": "ruby", ".php": "php", ".cs": "csharp", ".rs": "rust", ".swift": "swift",
+    ".c": "c", ".h": "c", ".cpp": "cpp", ".cc": "cpp", ".hpp": "cpp",
+    ".sh": "shell", ".bash": "shell", ".ex": "elixir", ".exs": "elixir", ".dart": "dart",
+}
+MANIFESTS = {
+    "requirements*.txt": "pypi", "setup.py": "pypi", "setup.cfg": "pypi", "pyproject.toml": "pypi", "Pipfile": "pypi",
+    "package.json": "npm", "pom.xml": "maven", "build.gradle": "gradle", "build.gradle.kts": "gradle",
+    "go.mod": "go", "Cargo.toml": "cargo", "Gemfile": "rubygems", "*.gemspec": "rubygems",
+    "composer.json": "composer", "*.csproj": "nuget", "*.fsproj": "nuget", "*.vbproj": "nuget",
+    "packages.config": "nuget", "Package.swift": "swift", "mix.exs": "hex", "pubspec.yaml": "pub",
+}
+LOCKFILES = {
+    "package-lock.json": "npm", "npm-shrinkwrap.json": "npm", "yarn.lock": "npm", "pnpm-lock.yaml": "npm",
+    "Pipfile.lock": "pypi", "poetry.lock": "pypi", "uv.lock": "pypi", "pdm.lock": "pypi",
+    "Gemfile.lock": "rubygems", "go.sum": "go", "Cargo.lock": "cargo", "composer.lock": "composer",
+    "packages.lock.json": "nuget", "gradle.lockfile": "gradle", "mix.lock": "hex", "pubspec.lock": "pub",
+}
+ARCHIVE_EXTENSIONS = (".jar", ".war", ".ear", ".whl", ".egg", ".nupkg", ".gem", ".dll")
+IAC_EXTENSIONS = (".tf", ".tf.json", ".hcl", ".bicep", ".template")
+IAC_FILENAMES = ("Chart.yaml", "kustomization.yaml", "kustomization.yml", ".gitlab-ci.yml",
+                 "azure-pipelines.yml", "bitbucket-pipelines.yml", "serverless.yml", "serverless.yaml")
+# YAML and JSON files only count as IaC when their first bytes look like a template or manifest
+IAC_MARKERS = ("apiVersion:", "AWSTemplateFormatVersion", "AWS::", "deploymentTemplate.json", "\"apiVersion\"")
+SNIFF_BYTES = 4096
+SNIFF_MAX_FILE_BYTES = 1024 * 1024
+
+
+def _match(name, patterns):
+    for pattern, ecosystem in patterns.items():
+        if name == pattern or fnmatch.fnmatchcase(name, pattern):
+            return ecosystem
+    return None
+
+
+def _is_dockerfile(name):
+    lower = name.lower()
+    return lower in ("dockerfile", "containerfile") or lower.startswith("dockerfile.") or lower.endswith(".dockerfile")
+
+
+def _sniff_iac(path, size):
+    if size > SNIFF_MAX_FILE_BYTES:
+        return False
+    try:
+        with open(path, "r", errors="replace") as f:
+            head = f.read(SNIFF_BYTES)
+    except OSError:
+        return False
+    return any(marker in head for marker in IAC_MARKERS)
+
+
+@dataclass
+class Inventory:
+    """What one checkout contains; paths are relative to the repository root."""
+    files: int = 0
+    bytes: int = 0
+    languages: dict = field(default_factory=dict)  # language -> file count
+    manifests: list = field(default_factory=list)
+    lockfiles: list = field(default_factory=list)
+    ecosystems: set = field(default_factory=set)
+    archives: list = field(default_factory=list)
+    iac: list = field(default_factory=list)
+    dockerfiles: list = field(default_factory=list)
+    seconds: float = 0.0
+
+    @property
+    def facets(self):
+        facets = set(self.languages) | self.ecosystems
+        if self.languages:
+            facets.add("source")
+        for name, paths in (("manifest", self.manifests), ("lockfile", self.lockfiles), ("archive", self.archives),
+                            ("iac", self.iac), ("dockerfile", self.dockerfiles)):
+            if paths:
+                facets.add(name)
+        return facets
+
+    def applies(self, applies_to):
+        """True when the repository has any of the facets a scanner declares (None or empty = always)."""
+        return not applies_to or bool(self.facets & set(applies_to))
+
+    def missing(self, applies_to):
+        """Why a scanner does not apply, for the skipped entry in the summary."""
+        return f"no {' or '.join(applies_to)} files found"
+
+    def to_dict(self):
+        return {
+            "files": self.files,
+            "bytes": self.bytes,
+            "languages": dict(sorted(self.languages.items(), key=lambda item: -item[1])),
+            "ecosystems": sorted(self.ecosystems),
+            "manifests": self.manifests,
+            "lockfiles": self.lockfiles,
+            "archives": self.archives,
+            "iac": self.iac,
+            "dockerfiles": self.dockerfiles,
+            "seconds": round(self.seconds, 3),
+        }
+
+    def write(self, report_dir):
+        path = os.path.join(report_dir, "inventory.json")
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.to_dict(), f, indent=4)
+        os.replace(tmp_path, path)
+        return path
+
+
+def build_inventory(local_path, exclusions=None):
+    """
+    Walk a checkout once (without .git) and classify every file by name; only small YAML and
+    JSON files are opened, to tell Kubernetes and CloudFormation templates from other config.
+    Paths matched by exclusions are left out and counted against their rule.
+    """
+    start = time.monotonic()
+    inventory = Inventory()
+    for entry, rel_path in walk_files(local_path, exclusions):
+        name = entry.name
+        size = entry.stat(follow_symlinks=False).st_size
+        inventory.files += 1
+        inventory.bytes += size
+        lower = name.lower()
+        language = LANGUAGES.get(os.path.splitext(lower)[1])
+        if language:
+            inventory.languages[language] = inventory.languages.get(language, 0) + 1
+        ecosystem = _match(name, LOCKFILES)
+        if ecosystem:
+            inventory.lockfiles.append(rel_path)
+            inventory.ecosystems.add(ecosystem)
+        else:
+            ecosystem = _match(name, MANIFESTS)
+            if ecosystem:
+                inventory.manifests.append(rel_path)
+                inventory.ecosystems.add(ecosystem)
+        if lower.endswith(ARCHIVE_EXTENSIONS):
+            inventory.archives.append(rel_path)
+        if _is_dockerfile(name):
+            inventory.dockerfiles.append(rel_path)
+        elif (lower.endswith(IAC_EXTENSIONS) or name in IAC_FILENAMES
+              or (lower.endswith((".yml", ".yaml")) and rel_path.startswith(os.path.join(".github", "workflows")))
+              or (lower.endswith((".yml", ".yaml", ".json")) and ecosystem is None and _sniff_iac(entry.path, size))):
+            inventory.iac.append(rel_path)
+    for paths in (inventory.manifests, inventory.lockfiles, inventory.archives, inventory.iac, inventory.dockerfiles):
+        paths.sort()
+    inventory.seconds = time.monotonic() - start
+    logging.info(
+        f"Inventory of {local_path}: {inventory.files} files, languages {', '.join(inventory.languages) or 'none'}, "
+        f"{len(inventory.manifests)} manifests, {len(inventory.iac)} IaC files, {len(inventory.dockerfiles)} Dockerfiles "
+        f"({inventory.seconds:.2f}s)"
+    )
+    return inventory
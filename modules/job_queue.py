@@ -0,0 +1,376 @@
+"""
+Job queues for distributed scans.
+
+A coordinator enqueues one job per repository (and tool set), and workers on any number of
+machines lease jobs, keep their lease alive with heartbeats and complete or fail them.
+A lease that is not renewed in time (the worker died or hung) expires and the job goes back
+to pending until it has been attempted max_attempts times.
+
+Every backend provides the same methods: enqueue, lease, heartbeat, complete, fail,
+requeue_expired, jobs, counts and purge. get_queue() picks one from the `distributed.queue`
+settings; QUEUE_BACKENDS maps backend names to classes.
+  sqlite     one SQLite file; fine on one machine or a local disk shared by containers
+  directory  one JSON file per job, moved between status folders with atomic renames;
+             suited to a network share mounted by every worker (SQLite locking over NFS/SMB is unreliable)
+"""
+import json
+import logging
+import os
+import sqlite3
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+STATUSES = ("pending", "leased", "done", "failed")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    run_id TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    lease_expires REAL,
+    result TEXT,
+    error TEXT,
+    created REAL NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs(status, id);
+CREATE INDEX IF NOT EXISTS jobs_run ON jobs(run_id, status);
+"""
+
+
+@dataclass
+class Job:
+    """A queued scan job. attempts doubles as the lease token: it changes every time the job is leased."""
+    id: str
+    run_id: str
+    payload: dict
+    status: str = "pending"
+    attempts: int = 0
+    worker: str = None
+    lease_expires: float = None
+    result: dict = None
+    error: str = None
+    created: float = field(default_factory=time.time)
+
+
+class SqliteJobQueue:
+    """Job queue in one SQLite file. Leases are taken in an IMMEDIATE transaction, so two workers never get the same job."""
+
+    def __init__(self, path=".scan_state/jobs.db", max_attempts=3):
+        self.path = path
+        self.max_attempts = max_attempts
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+        finally:
+            conn.close()
+
+    @contextmanager
+    def _transaction(self):
+        """Write transaction that takes the database lock up front, commits on success and rolls back on error."""
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _job(row):
+        id_, run_id, payload, status, attempts, worker, lease_expires, result, error, created = row
+        return Job(str(id_), run_id, json.loads(payload), status, attempts, worker, lease_expires,
+                   json.loads(result) if result else None, error, created)
+
+    def enqueue(self, run_id, payloads):
+        """Add one pending job per payload (a JSON-serializable dict). Returns the job ids."""
+        now = time.time()
+        with self._transaction() as conn:
+            return [
+                str(conn.execute(
+                    "INSERT INTO jobs (run_id, payload, created, updated) VALUES (?, ?, ?, ?)",
+                    (run_id, json.dumps(payload), now, now),
+                ).lastrowid)
+                for payload in payloads
+            ]
+
+    def _requeue_expired(self, conn, now):
+        expired = conn.execute(
+            "SELECT id, worker, attempts FROM jobs WHERE status = 'leased' AND lease_expires < ?", (now,)
+        ).fetchall()
+        for id_, worker, attempts in expired:
+            status = "pending" if attempts < self.max_attempts else "failed"
+            conn.execute(
+                "UPDATE jobs SET status = ?, worker = NULL, lease_expires = NULL, error = ?, updated = ? WHERE id = ?",
+                (status, f"Lease of worker {worker} expired", now, id_),
+            )
+            logging.warning(f"Job {id_} lease of worker {worker} expired, job is {status} after {attempts} attempt(s)")
+        return len(expired)
+
+    def requeue_expired(self):
+        """Return jobs whose lease expired to pending (or failed after max_attempts). Returns how many expired."""
+        with self._transaction() as conn:
+            return self._requeue_expired(conn, time.time())
+
+    def lease(self, worker, lease_seconds):
+        """Lease the oldest pending job for lease_seconds, or return None when nothing is pending."""
+        now = time.time()
+        with self._transaction() as conn:
+            self._requeue_expired(conn, now)
+            row = conn.execute("SELECT id FROM jobs WHERE status = 'pending' ORDER BY id LIMIT 1").fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = 'leased', worker = ?, lease_expires = ?, attempts = attempts + 1, updated = ? "
+                "WHERE id = ?",
+                (worker, now + lease_seconds, now, row[0]),
+            )
+            return self._job(conn.execute(
+                "SELECT id, run_id, payload, status, attempts, worker, lease_expires, result, error, created "
+                "FROM jobs WHERE id = ?", row,
+            ).fetchone())
+
+    def _update_leased(self, job, assignments, values):
+        """Update a job only while this lease still holds it; returns False once the lease was lost."""
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                f"UPDATE jobs SET {assignments}, updated = ? "
+                "WHERE id = ? AND status = 'leased' AND worker = ? AND attempts = ?",
+                (*values, time.time(), int(job.id), job.worker, job.attempts),
+            )
+            return cursor.rowcount == 1
+
+    def heartbeat(self, job, lease_seconds):
+        """Extend the lease. Returns False if the lease expired and the job was given to someone else."""
+        job.lease_expires = time.time() + lease_seconds
+        return self._update_leased(job, "lease_expires = ?", (job.lease_expires,))
+
+    def complete(self, job, result=None):
+        """Mark the job done with its result. Returns False if the lease was lost first."""
+        return self._update_leased(
+            job, "status = 'done', lease_expires = NULL, result = ?, error = NULL", (json.dumps(result),)
+        )
+
+    def fail(self, job, error):
+        """Give the job back for another attempt, or mark it failed after max_attempts."""
+        status = "pending" if job.attempts < self.max_attempts else "failed"
+        return self._update_leased(
+            job, "status = ?, worker = NULL, lease_expires = NULL, error = ?", (status, str(error))
+        )
+
+    def jobs(self, run_id):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            rows = conn.execute(
+                "SELECT id, run_id, payload, status, attempts, worker, lease_expires, result, error, created "
+                "FROM jobs WHERE run_id = ? ORDER BY id", (run_id,),
+            ).fetchall()
+        finally:
+            conn.close()
+        return [self._job(row) for row in rows]
+
+    def counts(self, run_id):
+        """Number of the run's jobs per status."""
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            rows = conn.execute("SELECT status, COUNT(*) FROM jobs WHERE run_id = ? GROUP BY status", (run_id,)).fetchall()
+        finally:
+            conn.close()
+        return dict({status: 0 for status in STATUSES}, **dict(rows))
+
+    def purge(self, older_than_days):
+        """Delete finished jobs created more than older_than_days ago. Returns how many were deleted."""
+        with self._transaction() as conn:
+            return conn.execute(
+                "DELETE FROM jobs WHERE status IN ('done', 'failed') AND created < ?",
+                (time.time() - older_than_days * 86400,),
+            ).rowcount
+
+
+class DirectoryJobQueue:
+    """
+    Job queue in a folder with one subfolder per status. A job is leased by renaming its file
+    from pending/ to leased/; rename is atomic, so exactly one worker wins it. The lease is
+    renewed by touching the leased file, and it expires lease_seconds after the file was last touched.
+    """
+
+    # A worker that died between taking a job and writing its lease leaves the job this long
+    LEASE_WRITE_GRACE = 60
+
+    def __init__(self, path=".scan_state/jobs", max_attempts=3):
+        self.path = path
+        self.max_attempts = max_attempts
+        for status in STATUSES:
+            os.makedirs(os.path.join(path, status), exist_ok=True)
+
+    def _file(self, status, job_id):
+        return os.path.join(self.path, status, f"{job_id}.json")
+
+    def _read(self, path):
+        with open(path) as f:
+            return Job(**json.load(f))
+
+    def _write(self, path, job):
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(job.__dict__, f)
+        os.replace(tmp_path, path)
+
+    def _names(self, status):
+        return sorted(name for name in os.listdir(os.path.join(self.path, status)) if name.endswith(".json"))
+
+    def enqueue(self, run_id, payloads):
+        ids = []
+        for payload in payloads:
+            # Ids sort by creation time, so workers take jobs in the order they were queued
+            job = Job(f"{time.time_ns():020d}-{uuid.uuid4().hex[:8]}", run_id, payload)
+            self._write(self._file("pending", job.id), job)
+            ids.append(job.id)
+        return ids
+
+    def requeue_expired(self):
+        now = time.time()
+        expired = 0
+        for name in self._names("leased"):
+            path = os.path.join(self.path, "leased", name)
+            try:
+                job = self._read(path)
+                stat = os.stat(path)
+            except (FileNotFoundError, ValueError):
+                continue
+            if job.lease_expires is None:
+                # Taken but the lease is not written yet; only a worker that died in between leaves it like this
+                if now - stat.st_ctime < self.LEASE_WRITE_GRACE:
+                    continue
+            elif max(job.lease_expires, stat.st_mtime) >= now:
+                # Heartbeats set the file's modification time to the new expiry
+                continue
+            status = "pending" if job.attempts < self.max_attempts else "failed"
+            try:
+                os.rename(path, self._file(status, job.id))
+            except FileNotFoundError:
+                continue  # Completed, failed or requeued by someone else meanwhile
+            worker, job.status, job.worker, job.lease_expires = job.worker, status, None, None
+            job.error = f"Lease of worker {worker} expired"
+            self._write(self._file(status, job.id), job)
+            logging.warning(f"Job {job.id} lease of worker {worker} expired, job is {status} after {job.attempts} attempt(s)")
+            expired += 1
+        return expired
+
+    def lease(self, worker, lease_seconds):
+        self.requeue_expired()
+        for name in self._names("pending"):
+            leased_path = os.path.join(self.path, "leased", name)
+            try:
+                os.rename(os.path.join(self.path, "pending", name), leased_path)
+            except FileNotFoundError:
+                continue  # Another worker took it first
+            job = self._read(leased_path)
+            job.status, job.worker, job.attempts = "leased", worker, job.attempts + 1
+            job.lease_expires = time.time() + lease_seconds
+            self._write(leased_path, job)
+            return job
+        return None
+
+    def _owned(self, job):
+        """Path of the job's leased file if this lease still holds it, else None."""
+        path = self._file("leased", job.id)
+        try:
+            current = self._read(path)
+        except (FileNotFoundError, ValueError):
+            return None
+        return path if (current.worker, current.attempts) == (job.worker, job.attempts) else None
+
+    def heartbeat(self, job, lease_seconds):
+        path = self._owned(job)
+        if path is None:
+            return False
+        job.lease_expires = time.time() + lease_seconds
+        try:
+            # Touching (unlike rewriting) cannot bring back a file that was requeued meanwhile
+            os.utime(path, (job.lease_expires, job.lease_expires))
+        except FileNotFoundError:
+            return False
+        return True
+
+    def _finish(self, job, status, **changes):
+        path = self._owned(job)
+        if path is None:
+            return False
+        try:
+            os.rename(path, self._file(status, job.id))
+        except FileNotFoundError:
+            return False
+        for key, value in dict(changes, status=status).items():
+            setattr(job, key, value)
+        self._write(self._file(status, job.id), job)
+        return True
+
+    def complete(self, job, result=None):
+        return self._finish(job, "done", result=result, error=None, lease_expires=None)
+
+    def fail(self, job, error):
+        status = "pending" if job.attempts < self.max_attempts else "failed"
+        return self._finish(job, status, worker=None, error=str(error), lease_expires=None)
+
+    def jobs(self, run_id):
+        jobs = []
+        for status in STATUSES:
+            for name in self._names(status):
+                try:
+                    job = self._read(os.path.join(self.path, status, name))
+                except (FileNotFoundError, ValueError):
+                    continue
+                if job.run_id == run_id:
+                    job.status = status
+                    jobs.append(job)
+        return sorted(jobs, key=lambda job: job.id)
+
+    def counts(self, run_id):
+        counts = {status: 0 for status in STATUSES}
+        for job in self.jobs(run_id):
+            counts[job.status] += 1
+        return counts
+
+    def purge(self, older_than_days):
+        cutoff = time.time() - older_than_days * 86400
+        purged = 0
+        for status in ("done", "failed"):
+            for name in self._names(status):
+                path = os.path.join(self.path, status, name)
+                try:
+                    if self._read(path).created < cutoff:
+                        os.remove(path)
+                        purged += 1
+                except (FileNotFoundError, ValueError):
+                    continue
+        return purged
+
+
+QUEUE_BACKENDS = {
+    "sqlite": SqliteJobQueue,
+    "directory": DirectoryJobQueue,
+}
+
+
+def get_queue(queue_config):
+    """
+    Build the job queue described by the `distributed.queue` settings.
+    :param queue_config: Dict with backend ("sqlite" or "directory"), path and max_attempts.
+    """
+    backend = queue_config.get("backend", "sqlite")
+    if backend not in QUEUE_BACKENDS:
+        raise ValueError(f"Unknown job queue backend '{backend}' (expected one of {', '.join(QUEUE_BACKENDS)})")
+    default_path = ".scan_state/jobs.db" if backend == "sqlite" else ".scan_state/jobs"
+    return QUEUE_BACKENDS[backend](queue_config.get("path", default_path), max_attempts=queue_config.get("max_attempts", 3))
@@ -1,11 +1,159 @@
 import os
 import json
-from jinja2 import Environment, FileSystemLoader, TemplateNotFound
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, TemplateNotFound
 import logging
 import fnmatch
 import datetime
+import threading
 
-def render_html_from_json(json_path, html_path, report_title="Security Report", scanner_name=None):
+TEMPLATE_DIR = os.path.join(os.path.dirname(__file__), '../templates')
+# Key holding each scanner's rows; in paginated mode this list is split across page files
+PAGED_KEYS = {
+    "grype": "matches",
+    "syft": "artifacts",
+    "dependency-check": "dependencies",
+    "safety": "dependencies",
+    "semgrep": "results",
+    "bandit": "results",
+    "trufflehog": "results",
+}
+# Checkov lists its checks per framework; its rows are (framework index, check list, check) triples
+CHECKOV_CHECK_LISTS = ("failed_checks", "passed_checks", "skipped_checks")
+# Reports with more rows than this are paginated (0 = never)
+PAGE_SIZE = 0
+
+_environment = None
+_environment_lock = threading.Lock()
+_templates = {}
+
+def get_environment():
+    """
+    Process-wide Jinja2 environment shared by every render. Compiled templates stay in its
+    cache and their bytecode is kept on disk across runs; templates are never reloaded
+    during a run, so lookups skip the file modification check.
+    """
+    global _environment
+    with _environment_lock:
+        if _environment is None:
+            _environment = Environment(
+                loader=FileSystemLoader(TEMPLATE_DIR),
+                bytecode_cache=FileSystemBytecodeCache(),
+                auto_reload=False,
+            )
+        return _environment
+
+def get_report_template(scanner_name=None):
+    """Return (template, template_name) for a scanner, falling back to the generic report template."""
+    with _environment_lock:
+        cached = _templates.get(scanner_name)
+    if cached is not None:
+        return cached
+    env = get_environment()
+    template_name = 'report_template.html'
+    template = None
+    if scanner_name:
+        specific_template = f'{scanner_name}_template.html'
+        try:
+            template = env.get_template(specific_template)
+            template_name = specific_template
+        except TemplateNotFound:
+            pass
+    if template is None:
+        template = env.get_template(template_name)
+    with _environment_lock:
+        _templates[scanner_name] = (template, template_name)
+    return template, template_name
+
+def set_page_size(page_size):
+    """Set the number of rows per page above which reports are paginated (0 disables pagination)."""
+    global PAGE_SIZE
+    PAGE_SIZE = page_size or 0
+
+def _checkov_rows(data):
+    """Return (rows, page_data) for a Checkov report: every check of every framework, in report order."""
+    frameworks = [
+        framework for framework in (data if isinstance(data, list) else [data])
+        if isinstance(framework, dict) and isinstance(framework.get("results"), dict)
+    ]
+    rows = [
+        (index, name, check)
+        for index, framework in enumerate(frameworks)
+        for name in CHECKOV_CHECK_LISTS
+        for check in framework["results"].get(name) or []
+    ]
+
+    def page_data(page_rows):
+        # Each framework on the page keeps its summary and parsing errors but only this page's checks
+        page = {}
+        for index, name, check in page_rows:
+            if index not in page:
+                framework = frameworks[index]
+                page[index] = dict(framework, results=dict(framework["results"], **{n: [] for n in CHECKOV_CHECK_LISTS}))
+            page[index]["results"][name].append(check)
+        return list(page.values())
+
+    return rows, page_data
+
+def _paged_rows(data, scanner_name):
+    """
+    Return (rows, page_data) for the list a report is paginated on, or (None, None) if it has none.
+    page_data(page_rows) builds the data one page is rendered with.
+    """
+    if scanner_name == "checkov":
+        return _checkov_rows(data)
+    if isinstance(data, list):
+        return data, lambda page_rows: page_rows
+    if isinstance(data, dict):
+        key = PAGED_KEYS.get(scanner_name, 'results')
+        if isinstance(data.get(key), list):
+            return data[key], lambda page_rows: dict(data, **{key: page_rows})
+    return None, None
+
+def render_paginated_html(rows, page_data, template, html_path, report_title, severity_counts=None):
+    """
+    Render a large report as page files of PAGE_SIZE rows plus an index page at html_path.
+    Every page goes through the scanner's own template with its rows replaced by one slice
+    (see _paged_rows), and each page is streamed to disk before the next is built.
+    """
+    page_dir = os.path.splitext(html_path)[0]
+    page_dir_name = os.path.basename(page_dir)
+    os.makedirs(page_dir, exist_ok=True)
+    page_count = (len(rows) + PAGE_SIZE - 1) // PAGE_SIZE
+    year = datetime.datetime.now().year
+    pages = []
+    for number in range(1, page_count + 1):
+        first = (number - 1) * PAGE_SIZE
+        page_rows = rows[first:first + PAGE_SIZE]
+        columns = sorted({column for item in page_rows if isinstance(item, dict) for column in item})
+        page = {
+            "number": number,
+            "count": page_count,
+            "first": first + 1,
+            "last": first + len(page_rows),
+            "total": len(rows),
+            "index": f"../{os.path.basename(html_path)}",
+            "prev": f"page-{number - 1:04d}.html" if number > 1 else None,
+            "next": f"page-{number + 1:04d}.html" if number < page_count else None,
+        }
+        with open(os.path.join(page_dir, f"page-{number:04d}.html"), 'w', encoding='utf-8') as f:
+            f.writelines(template.generate(
+                report_title=report_title, items=page_rows, columns=columns, data=page_data(page_rows), year=year, page=page
+            ))
+        pages.append(dict(page, href=f"{page_dir_name}/page-{number:04d}.html"))
+    index_template = get_environment().get_template('paged_index_template.html')
+    with open(html_path, 'w', encoding='utf-8') as f:
+        f.writelines(index_template.generate(
+            report_title=report_title, total=len(rows), pages=pages, page_size=PAGE_SIZE,
+            severity_counts=severity_counts
+        ))
+    print(f"[INFO] HTML report paginated into {page_count} pages: {html_path}")
+
+def render_html_from_json(json_path, html_path, report_title="Security Report", scanner_name=None, severity_counts=None):
+    """
+    Render a JSON report to HTML with the scanner's template. Reports with more than
+    PAGE_SIZE rows are split into pages behind an index page (see render_paginated_html).
+    :param severity_counts: Optional (severity, count) pairs shown on the index of a paginated report.
+    """
     try:
         # Skip if the path is a directory
         if os.path.isdir(json_path):
@@ -25,36 +173,33 @@ def render_html_from_json(json_path, html_path, report_title="Security Report",
         else:
             items = [data]
         if logging.getLogger().isEnabledFor(logging.DEBUG):
-            print(f"[DEBUG] items for rendering: {items}")
+            print(f"[DEBUG] {len(items)} items for rendering")
+        rows, page_data = _paged_rows(data, scanner_name)
+        if PAGE_SIZE and rows is not None and len(rows) > PAGE_SIZE:
+            template, _ = get_report_template(scanner_name)
+            render_paginated_html(rows, page_data, template, html_path, report_title, severity_counts)
+            return
         # Determine columns
         columns = set()
         for item in items:
             if isinstance(item, dict):
                 columns.update(item.keys())
         columns = sorted(columns)
-        # Prepare Jinja2 environment
-        env = Environment(loader=FileSystemLoader(os.path.join(os.path.dirname(__file__), '../templates')))
-        # Determine template name
-        template_name = 'report_template.html'
-        if scanner_name:
-            specific_template = f'{scanner_name}_template.html'
-            try:
-                template = env.get_template(specific_template)
-                template_name = specific_template
-            except TemplateNotFound:
-                template = env.get_template(template_name)
-        else:
-            template = env.get_template(template_name)
-        # Render HTML
+        template, template_name = get_report_template(scanner_name)
+        # Stream the rendered HTML to the file instead of building it in memory
         year = datetime.datetime.now().year
-        html = template.render(report_title=report_title, items=items, columns=columns, data=data, year=year)
         if logging.getLogger().isEnabledFor(logging.DEBUG):
-            print(f"[DEBUG] Rendered HTML preview:\n{html[:500]}")
             print(f"[DEBUG] Writing HTML to: {html_path}")
-        # Write HTML to file
         os.makedirs(os.path.dirname(html_path), exist_ok=True)
-        with open(html_path, 'w', encoding='utf-8') as f:
-            f.write(html)
+        # A template error part-way through leaves no half-written report behind
+        tmp_path = f"{html_path}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.writelines(template.generate(report_title=report_title, items=items, columns=columns, data=data, year=year))
+            os.replace(tmp_path, html_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
         print(f"[INFO] HTML report generated using {template_name}: {html_path}")
     except Exception as e:
         print(f"[ERROR] Exception during HTML generation: {e}")
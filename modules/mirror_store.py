@@ -0,0 +1,152 @@
+import fcntl
+import hashlib
+import logging
+import os
+import shutil
+import subprocess
+import time
+from contextlib import contextmanager
+
+LAST_USED_FILE = "security-scan-last-used"
+
+
+def _dir_size(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for file in files:
+            try:
+                total += os.path.getsize(os.path.join(root, file))
+            except OSError:
+                pass
+    return total
+
+
+class MirrorStore:
+    """
+    Local store of bare mirrors, one per repository URL. Mirrors are updated with
+    incremental fetches and branches are checked out from them as local clones, whose
+    objects are hard-linked rather than downloaded again.
+    """
+
+    def __init__(self, path=".mirrors", max_size_mb=None):
+        self.path = path
+        self.max_bytes = max_size_mb * 1024 * 1024 if max_size_mb else None
+        os.makedirs(self.path, exist_ok=True)
+
+    def mirror_path(self, repo_path):
+        name = os.path.basename(repo_path.rstrip("/"))
+        if name.endswith(".git"):
+            name = name[:-4]
+        digest = hashlib.sha1(repo_path.encode()).hexdigest()[:12]
+        return os.path.join(self.path, f"{name}-{digest}.git")
+
+    @contextmanager
+    def lock(self, repo_path, shared=False):
+        """
+        Hold a lock on a mirror across processes: exclusive while fetching, shared while
+        checking out, so concurrent runs never read a mirror that is being updated.
+        """
+        lock_path = self.mirror_path(repo_path) + ".lock"
+        with open(lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def update(self, repo_path, fetch_url=None, extra_args=None):
+        """Create the mirror on first use, otherwise fetch only what changed upstream."""
+        fetch_url = fetch_url or repo_path
+        mirror = self.mirror_path(repo_path)
+        with self.lock(repo_path):
+            if os.path.isdir(mirror):
+                logging.info(f"Updating mirror {mirror}")
+                subprocess.run([
+                    "git", "fetch", "--prune", "--quiet", *(extra_args or []), fetch_url,
+                    "+refs/heads/*:refs/heads/*", "+refs/tags/*:refs/tags/*"
+                ], cwd=mirror, check=True)
+            else:
+                logging.info(f"Creating mirror {mirror} for {repo_path}")
+                tmp_mirror = f"{mirror}.tmp"
+                shutil.rmtree(tmp_mirror, ignore_errors=True)
+                subprocess.run(["git", "clone", "--mirror", "--quiet", *(extra_args or []), fetch_url, tmp_mirror], check=True)
+                # Never keep credentials in the mirror's config
+                subprocess.run(["git", "remote", "set-url", "origin", repo_path], cwd=tmp_mirror, check=True)
+                os.rename(tmp_mirror, mirror)
+            with open(os.path.join(mirror, LAST_USED_FILE), "w") as f:
+                f.write(str(time.time()))
+        return mirror
+
+    def checkout(self, repo_path, branch, local_path, extra_args=None):
+        """
+        Check out a branch from the mirror into local_path. Without extra_args this is a
+        full local clone that hard-links the mirror's objects; history-limiting arguments
+        such as --depth need the file:// transport, which copies only the objects required.
+        """
+        mirror = self.mirror_path(repo_path)
+        if os.path.exists(local_path):
+            shutil.rmtree(local_path)
+        source = ["--local", mirror] if not extra_args else ["file://" + os.path.abspath(mirror)]
+        with self.lock(repo_path, shared=True):
+            subprocess.run([
+                "git", "clone", "--quiet", "--single-branch", "--branch", branch,
+                *(extra_args or []), *source, local_path
+            ], check=True)
+        # Point the clone at the real upstream so follow-up fetches bypass the mirror
+        subprocess.run(["git", "remote", "set-url", "origin", repo_path], cwd=local_path, check=True)
+        return local_path
+
+    def gc(self, configured_paths, keep_paths=()):
+        """
+        Delete mirrors of repositories that are no longer configured, then evict the least
+        recently used mirrors (except keep_paths) until the store fits in max_size_mb.
+        """
+        configured = {os.path.basename(self.mirror_path(p)) for p in configured_paths}
+        keep = {os.path.basename(self.mirror_path(p)) for p in keep_paths}
+        mirrors = []
+        for name in os.listdir(self.path):
+            mirror = os.path.join(self.path, name)
+            if not name.endswith(".git") or not os.path.isdir(mirror):
+                continue
+            if name not in configured:
+                logging.info(f"Removing mirror of unconfigured repository: {mirror}")
+                self._remove(mirror)
+                continue
+            try:
+                with open(os.path.join(mirror, LAST_USED_FILE)) as f:
+                    last_used = float(f.read().strip())
+            except (OSError, ValueError):
+                last_used = 0.0
+            mirrors.append((last_used, name, mirror))
+        if not self.max_bytes:
+            return
+        sizes = {mirror: _dir_size(mirror) for _, _, mirror in mirrors}
+        total = sum(sizes.values())
+        for _, name, mirror in sorted(mirrors):
+            if total <= self.max_bytes:
+                break
+            if name in keep:
+                continue
+            logging.info(f"Evicting mirror {mirror} to respect the {self.max_bytes // 1048576} MB limit")
+            self._remove(mirror)
+            total -= sizes[mirror]
+        if total > self.max_bytes:
+            logging.warning(f"Mirror store uses {total / 1048576:.0f} MB, above its limit, with only mirrors in use left")
+
+    def _remove(self, mirror):
+        lock_path = mirror + ".lock"
+        with open(lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            shutil.rmtree(mirror, ignore_errors=True)
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+        try:
+            os.remove(lock_path)
+        except OSError:
+            pass
+
+
+def authenticated_url(repo_path, github_token):
+    """Embed the GitHub token in an https URL for fetching."""
+    if github_token and repo_path.startswith("https://"):
+        return repo_path.replace("https://", f"https://{github_token}@")
+    return repo_path
@@ -0,0 +1,128 @@
+import logging
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+
+_SENTINEL = object()
+
+
+@dataclass
+class Stage:
+    """A pipeline stage: func takes an item and returns the item for the next stage (or None to drop it)."""
+    name: str
+    func: callable
+    concurrency: int = 1
+
+
+@dataclass
+class StageStats:
+    """Per-stage counters, updated by the stage workers."""
+    name: str
+    processed: int = 0
+    failed: int = 0
+    busy_seconds: float = 0.0
+    max_queue_depth: int = 0
+    first_start: float = None
+    last_finish: float = None
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def throughput(self):
+        """Items completed per minute while the stage was active."""
+        if not self.processed or self.first_start is None or self.last_finish is None:
+            return 0.0
+        elapsed = max(self.last_finish - self.first_start, 1e-6)
+        return self.processed * 60.0 / elapsed
+
+
+class Pipeline:
+    """
+    Run items through a sequence of stages connected by bounded queues.
+    Each stage has its own worker threads, so a network-bound stage (clone, upload)
+    works on one repository while a CPU-bound stage (scan) works on another.
+    """
+
+    def __init__(self, stages, queue_size=2, status_interval=30):
+        for stage in stages:
+            stage.concurrency = max(1, stage.concurrency)
+        self.stages = stages
+        self.queues = [queue.Queue(maxsize=max(1, queue_size)) for _ in stages]
+        self.stats = [StageStats(stage.name) for stage in stages]
+        self.status_interval = status_interval
+        self._alive = [stage.concurrency for stage in stages]
+        self._alive_lock = threading.Lock()
+        self._done = threading.Event()
+
+    def _put(self, index, item):
+        self.queues[index].put(item)
+        depth = self.queues[index].qsize()
+        stats = self.stats[index]
+        with stats.lock:
+            stats.max_queue_depth = max(stats.max_queue_depth, depth)
+
+    def _worker(self, index):
+        stage = self.stages[index]
+        stats = self.stats[index]
+        while True:
+            item = self.queues[index].get()
+            if item is _SENTINEL:
+                break
+            start = time.monotonic()
+            with stats.lock:
+                if stats.first_start is None:
+                    stats.first_start = start
+            try:
+                result = stage.func(item)
+                failed = False
+            except Exception:
+                logging.exception(f"Pipeline stage '{stage.name}' failed")
+                result, failed = None, True
+            finish = time.monotonic()
+            with stats.lock:
+                stats.busy_seconds += finish - start
+                stats.last_finish = finish
+                if failed:
+                    stats.failed += 1
+                else:
+                    stats.processed += 1
+            if result is not None and index + 1 < len(self.stages):
+                self._put(index + 1, result)
+        # The last worker of a stage to exit tells the next stage there is nothing more to come
+        with self._alive_lock:
+            self._alive[index] -= 1
+            last = self._alive[index] == 0
+        if last and index + 1 < len(self.stages):
+            for _ in range(self.stages[index + 1].concurrency):
+                self.queues[index + 1].put(_SENTINEL)
+
+    def _monitor(self):
+        while not self._done.wait(self.status_interval):
+            self.log_status()
+
+    def log_status(self):
+        """Log the queue depth and throughput of each stage."""
+        for stage_queue, stats in zip(self.queues, self.stats):
+            logging.info(
+                f"Stage '{stats.name}': queued={stage_queue.qsize()} (max {stats.max_queue_depth}), "
+                f"done={stats.processed}, failed={stats.failed}, throughput={stats.throughput():.2f}/min"
+            )
+
+    def run(self, items):
+        """Feed items into the first stage and block until every stage has drained."""
+        threads = []
+        for index, stage in enumerate(self.stages):
+            for n in range(stage.concurrency):
+                thread = threading.Thread(target=self._worker, args=(index,), name=f"{stage.name}-{n}", daemon=True)
+                thread.start()
+                threads.append(thread)
+        monitor = threading.Thread(target=self._monitor, name="pipeline-monitor", daemon=True)
+        monitor.start()
+        for item in items:
+            self._put(0, item)
+        for _ in range(self.stages[0].concurrency):
+            self.queues[0].put(_SENTINEL)
+        for thread in threads:
+            thread.join()
+        self._done.set()
+        self.log_status()
+        return self.stats
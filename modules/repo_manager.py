@@ -1,12 +1,66 @@
+import hashlib
 import os
 import shutil
 import subprocess
 import logging
+from modules.mirror_store import authenticated_url
 
-def clone_repository(repo_path, branch, github_token, local_base_path="cloned_repos"):
-    """Clone a repository to a local path."""
+HISTORY_MODES = ("shallow", "depth", "since", "full")
+
+# Answers git's credential prompts from the environment, so lazy blob fetches in partial
+# clones of private repositories work without writing the token to .git/config
+ENV_CREDENTIAL_HELPER = '!f() { echo username=x-access-token; echo "password=$GITHUB_TOKEN"; }; f'
+
+def history_clone_args(history, partial=True):
+    """
+    Translate a history setting into git clone arguments.
+    - shallow: only the tip commit (--depth 1), the default
+    - depth: the last `depth` commits
+    - since: commits newer than `since` (any date git understands, e.g. 2024-01-01)
+    - full: the whole history
+    Non-shallow modes use a blobless partial clone (when partial is True): commits and trees
+    are downloaded up front, file contents only when a tool such as Gitleaks reads old revisions.
+    """
+    history = history or {}
+    mode = history.get("mode", "shallow")
+    if mode not in HISTORY_MODES:
+        raise ValueError(f"Unsupported history mode '{mode}', expected one of {', '.join(HISTORY_MODES)}")
+    if mode == "shallow":
+        return ["--depth", "1"]
+    args = ["--filter=blob:none"] if partial else []
+    if mode == "depth":
+        args += ["--depth", str(history.get("depth", 50))]
+    elif mode == "since":
+        args += [f"--shallow-since={history['since']}"]
+    return args
+
+def checkout_name(repo_path, branch):
+    """
+    Checkout directory name for one repository entry. The hash of path and branch keeps two
+    entries of the same repository (or same-named repositories) from sharing a working tree.
+    """
+    name = os.path.basename(repo_path.rstrip("/"))
+    if name.endswith(".git"):
+        name = name[:-4]
+    digest = hashlib.sha1(f"{repo_path}@{branch}".encode()).hexdigest()[:10]
+    return f"{name}-{digest}"
+
+def clone_repository(repo_path, branch, github_token, local_base_path="cloned_repos", mirror_store=None, history=None):
+    """
+    Clone a repository to a local path, through the mirror store when one is given.
+    :param history: History setting (see history_clone_args); defaults to a shallow clone.
+    """
     logging.info(f"Cloning repository: {repo_path} (branch: {branch})")
-    local_path = os.path.join(local_base_path, os.path.basename(repo_path))
+    local_path = os.path.join(local_base_path, checkout_name(repo_path, branch))
+    clone_args = history_clone_args(history)
+
+    if mirror_store is not None:
+        try:
+            mirror_store.update(repo_path, authenticated_url(repo_path, github_token))
+            return mirror_store.checkout(repo_path, branch, local_path, history_clone_args(history, partial=False))
+        except subprocess.CalledProcessError as e:
+            logging.error(f"Failed to clone repository {repo_path} from mirror: {e}")
+            return local_path
 
     # Remove existing directory if it exists
     if os.path.exists(local_path):
@@ -22,8 +76,12 @@ def clone_repository(repo_path, branch, github_token, local_base_path="cloned_re
                 repo_url = repo_path
 
             subprocess.run([
-                "git", "clone", "--branch", branch, repo_url, "--depth", "1", local_path
+                "git", "clone", "--branch", branch, repo_url, *clone_args, local_path
             ], check=True)
+            if github_token and "--filter=blob:none" in clone_args:
+                subprocess.run([
+                    "git", "config", "credential.helper", ENV_CREDENTIAL_HELPER
+                ], cwd=local_path, check=True)
             # --- Sanitize .git/config to remove token from remote URL ---
             if github_token:
                 # Remove token from remote URL after clone
@@ -38,7 +96,7 @@ def clone_repository(repo_path, branch, github_token, local_base_path="cloned_re
                 raise FileNotFoundError(f"Local repository path does not exist: {repo_path}")
 
             subprocess.run([
-                "git", "clone", "--branch", branch, repo_path, "--depth", "1", local_path
+                "git", "clone", "--branch", branch, repo_path, *clone_args, local_path
             ], check=True)
     except (subprocess.CalledProcessError, FileNotFoundError) as e:
         logging.error(f"Failed to clone repository {repo_path}: {e}")
@@ -60,3 +118,49 @@ def is_valid_repository(repo_path):
     except subprocess.CalledProcessError:
         logging.error(f"Invalid Git repository: {repo_path}")
         return False
+
+def get_head_commit(local_path):
+    """Return the commit SHA checked out in a local clone, or None if it cannot be resolved."""
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=local_path, check=True, capture_output=True, text=True
+        )
+        return result.stdout.strip()
+    except (subprocess.CalledProcessError, FileNotFoundError) as e:
+        logging.error(f"Could not resolve HEAD commit in {local_path}: {e}")
+        return None
+
+def checkout_size(local_path):
+    """Total size in bytes of the files in a checkout, excluding .git."""
+    total = 0
+    for root, dirs, files in os.walk(local_path):
+        dirs[:] = [d for d in dirs if d != ".git"]
+        for file in files:
+            try:
+                total += os.lstat(os.path.join(root, file)).st_size
+            except OSError:
+                pass
+    return total
+
+def get_remote_head(repo_path, branch, github_token=None, timeout=60):
+    """
+    Return the commit a remote branch points to, without cloning or fetching (git ls-remote), or None.
+    :param repo_path: Repository URL or local path.
+    """
+    try:
+        result = subprocess.run(
+            ["git", "ls-remote", authenticated_url(repo_path, github_token), f"refs/heads/{branch}"],
+            check=True, capture_output=True, text=True, timeout=timeout,
+            env=dict(os.environ, GIT_TERMINAL_PROMPT="0"),
+        )
+    except (subprocess.CalledProcessError, subprocess.TimeoutExpired, FileNotFoundError) as e:
+        message = str(getattr(e, "stderr", None) or e).strip()
+        if github_token:
+            message = message.replace(github_token, "***")
+        logging.error(f"Could not read the head of {repo_path} (branch: {branch}): {message}")
+        return None
+    line = result.stdout.split("\n", 1)[0]
+    if not line:
+        logging.error(f"Branch {branch} not found in {repo_path}")
+        return None
+    return line.split()[0]
@@ -0,0 +1,187 @@
+"""
+Single-archive report bundles.
+
+A run's report folder is packed into one standard ZIP archive (`<timestamp>.zip`, deflate)
+next to the folder, plus a small JSON index (`<timestamp>.index.json`) giving each member's
+data offset and compressed length. One report can then be read with a single ranged read,
+locally or from Blob Storage, without downloading the whole archive.
+
+Usage:
+    python -m modules.report_bundle <bundle.zip | index.json> <tool> [--html] [--output DIR]
+    python -m modules.report_bundle --container <repo> <timestamp> <tool> [--html] [--output DIR]
+"""
+import argparse
+import json
+import logging
+import os
+import struct
+import sys
+import time
+import zipfile
+import zlib
+
+INDEX_VERSION = 1
+# Fixed part of a ZIP local file header; the name and extra field lengths sit at bytes 26-30
+LOCAL_HEADER_SIZE = 30
+
+
+def bundle_paths(report_dir):
+    """Return (bundle_path, index_path) for a timestamped report folder."""
+    base = report_dir.rstrip(os.sep)
+    return f"{base}.zip", f"{base}.index.json"
+
+
+def _member_index(bundle_path):
+    members = {}
+    with open(bundle_path, "rb") as raw, zipfile.ZipFile(bundle_path) as archive:
+        for info in archive.infolist():
+            raw.seek(info.header_offset)
+            header = raw.read(LOCAL_HEADER_SIZE)
+            name_length, extra_length = struct.unpack("<HH", header[26:30])
+            members[info.filename] = {
+                "offset": info.header_offset + LOCAL_HEADER_SIZE + name_length + extra_length,
+                "length": info.compress_size,
+                "size": info.file_size,
+                "crc32": info.CRC,
+                "compression": "deflate" if info.compress_type == zipfile.ZIP_DEFLATED else "store",
+            }
+    return members
+
+
+def create_bundle(report_dir, compresslevel=6):
+    """
+    Pack a report folder into '<report_dir>.zip' and write its index.
+    :return: (bundle_path, index_path), or None if the folder could not be bundled.
+    """
+    bundle_path, index_path = bundle_paths(report_dir)
+    tmp_bundle, tmp_index = f"{bundle_path}.tmp", f"{index_path}.tmp"
+    try:
+        with zipfile.ZipFile(tmp_bundle, "w", zipfile.ZIP_DEFLATED, compresslevel=compresslevel) as archive:
+            for root, dirs, files in os.walk(report_dir):
+                dirs.sort()
+                for file in sorted(files):
+                    abs_path = os.path.join(root, file)
+                    archive.write(abs_path, os.path.relpath(abs_path, report_dir).replace(os.sep, "/"))
+        index = {
+            "version": INDEX_VERSION,
+            "bundle": os.path.basename(bundle_path),
+            "created": time.time(),
+            "members": _member_index(tmp_bundle),
+        }
+        with open(tmp_index, "w") as f:
+            json.dump(index, f)
+        os.replace(tmp_bundle, bundle_path)
+        os.replace(tmp_index, index_path)
+    except OSError as e:
+        logging.error(f"Could not bundle {report_dir}: {e}")
+        for path in (tmp_bundle, tmp_index):
+            if os.path.exists(path):
+                os.remove(path)
+        return None
+    total = sum(member["size"] for member in index["members"].values())
+    logging.info(
+        f"Bundled {len(index['members'])} report files from {report_dir} "
+        f"({total / 1048576:.1f} MB -> {os.path.getsize(bundle_path) / 1048576:.1f} MB)"
+    )
+    return bundle_path, index_path
+
+
+def decode_member(data, member):
+    """Decompress the raw bytes of one member as read from its offset."""
+    if member["compression"] == "deflate":
+        data = zlib.decompress(data, -zlib.MAX_WBITS)
+    if zlib.crc32(data) != member["crc32"]:
+        raise ValueError("Bundle member failed its CRC check")
+    return data
+
+
+def select_members(index, tool_name, html=False):
+    """Member names holding one tool's report (several for Checkov's per-framework tree)."""
+    members = index["members"]
+    if tool_name in members:
+        return [tool_name]
+    if html:
+        candidates = [f"html/{tool_name}.html"]
+        prefix = f"html/{tool_name}/"
+    else:
+        candidates = [f"json/{tool_name}.json"]
+        prefix = f"json/{tool_name}.json/"
+    names = [name for name in candidates if name in members]
+    return names + sorted(name for name in members if name.startswith(prefix))
+
+
+class LocalBundleReader:
+    def __init__(self, path):
+        if path.endswith(".index.json"):
+            path = path[:-len(".index.json")] + ".zip"
+        self.bundle_path = path
+        with open(path[:-len(".zip")] + ".index.json") as f:
+            self.index = json.load(f)
+
+    def read(self, name):
+        member = self.index["members"][name]
+        with open(self.bundle_path, "rb") as f:
+            f.seek(member["offset"])
+            return decode_member(f.read(member["length"]), member)
+
+
+class BlobBundleReader:
+    """Reads the index blob once, then each member with one ranged download."""
+
+    def __init__(self, connection_string, container, timestamp):
+        from modules.blob_uploader import get_uploader
+        self.container_client = get_uploader(connection_string).container(container)
+        self.bundle_name = f"{timestamp}.zip"
+        self.index = json.loads(self.container_client.download_blob(f"{timestamp}.index.json").readall())
+
+    def read(self, name):
+        member = self.index["members"][name]
+        data = self.container_client.download_blob(
+            self.bundle_name, offset=member["offset"], length=member["length"]
+        ).readall()
+        return decode_member(data, member)
+
+
+def extract(reader, tool_name, output_dir=None, html=False):
+    """Write one tool's report(s) below output_dir, or to stdout when output_dir is None."""
+    names = select_members(reader.index, tool_name, html)
+    if not names:
+        raise KeyError(f"No {'HTML' if html else 'JSON'} report for '{tool_name}' in the bundle")
+    for name in names:
+        data = reader.read(name)
+        if output_dir is None:
+            sys.stdout.buffer.write(data)
+            continue
+        target = os.path.join(output_dir, *name.split("/"))
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target, "wb") as f:
+            f.write(data)
+    return names
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Extract one tool's report from a report bundle")
+    parser.add_argument("source", help="Local bundle (.zip) or index (.index.json), or the run timestamp with --container")
+    parser.add_argument("tool", help="Tool name (e.g. gitleaks) or an exact member path")
+    parser.add_argument("--html", action="store_true", help="Extract the HTML report instead of the JSON one")
+    parser.add_argument("--output", default=None, help="Directory to extract into (default: stdout)")
+    parser.add_argument("--container", default=None, help="Read from this Blob Storage container instead of disk")
+    parser.add_argument("--connection-string", default=os.getenv("STORAGE_CONNECTION_STRING"),
+                        help="Blob Storage connection string (default: $STORAGE_CONNECTION_STRING)")
+    args = parser.parse_args()
+    if args.container:
+        if not args.connection_string:
+            parser.error("--container needs --connection-string or STORAGE_CONNECTION_STRING")
+        reader = BlobBundleReader(args.connection_string, args.container, args.source)
+    else:
+        reader = LocalBundleReader(args.source)
+    try:
+        names = extract(reader, args.tool, args.output, args.html)
+    except KeyError as e:
+        parser.exit(1, f"{e.args[0]}\n")
+    if args.output:
+        print(f"Extracted {len(names)} file(s) into {args.output}")
+
+
+if __name__ == "__main__":
+    main()
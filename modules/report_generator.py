@@ -2,92 +2,116 @@ import os
 import json
 import logging
 from jinja2 import Template
+from modules.findings_store import SEVERITY_LEVELS
+from modules.report_manifest import count_report, load_manifest, skipped_tools, tools_with_status
+
+def _tool_reports(json_dir):
+    """Tool names with a report in json/: Checkov's directory first, then one file per tool."""
+    if not os.path.isdir(json_dir):
+        return []
+    tools = ["checkov"] if os.path.isdir(os.path.join(json_dir, "checkov.json")) else []
+    for json_file in os.listdir(json_dir):
+        if json_file != "checkov.json" and json_file.endswith('.json') and os.path.isfile(os.path.join(json_dir, json_file)):
+            tools.append(os.path.splitext(json_file)[0])
+    return tools
+
+def _html_link(report_dir, tool_name):
+    """Relative link to a tool's HTML report (the first page of Checkov's per-framework tree)."""
+    if tool_name == "checkov":
+        for root, dirs, files in os.walk(os.path.join(report_dir, "html", "checkov")):
+            dirs.sort()
+            for file in sorted(files):
+                if file.endswith('.html'):
+                    return os.path.relpath(os.path.join(root, file), report_dir)
+        return None
+    html_file = os.path.join("html", f"{tool_name}.html")
+    return html_file if os.path.isfile(os.path.join(report_dir, html_file)) else None
+
+def _resources(manifest):
+    """Wall time, CPU time and peak RSS of the tool run recorded in a manifest, for display."""
+    if not manifest or not manifest.get("max_rss_bytes"):
+        return None
+    cpu = manifest.get("cpu_user", 0) + manifest.get("cpu_system", 0)
+    return f"{manifest.get('duration', 0):.1f}s wall, {cpu:.1f}s CPU, {manifest['max_rss_bytes'] / 1048576:.0f} MB peak"
+
+def _failure(manifest):
+    """Why a tool run has no trusted finding count: its status with the exit code and whether it wrote a report."""
+    details = []
+    if manifest.get("exit_code") is not None:
+        details.append(f"exit code {manifest['exit_code']}")
+    if manifest.get("status") == "invalid":
+        details.append("report could not be parsed")
+    elif not manifest.get("bytes"):
+        details.append("no report written")
+    return {
+        "status": "Invalid" if manifest.get("status") == "invalid" else "Failed",
+        "detail": ", ".join(details),
+        "resources": _resources(manifest),
+    }
+
+def _exclusions(report_dir):
+    """Files and bytes each exclude_paths rule kept out of the scan, from exclusions.json."""
+    path = os.path.join(report_dir, "exclusions.json")
+    if not os.path.isfile(path):
+        return None
+    try:
+        with open(path) as f:
+            summary = json.load(f)
+    except (ValueError, OSError) as e:
+        logging.warning(f"Ignoring unreadable {path}: {e}")
+        return None
+    for rule in summary.get("rules", []) + [summary]:
+        rule["size"] = f"{rule.get('bytes', 0) / 1048576:.1f} MB"
+    return summary
 
 def generate_summary_report(report_dir, output_path):
-    """Generate an HTML summary report from JSON files in the json/ subfolder, linking to HTML reports."""
+    """
+    Generate an HTML summary report from the per-tool manifests written next to each report,
+    linking to HTML reports. Reports without a manifest are counted with a streaming pass
+    instead of being loaded. Tools whose run failed or whose report could not be parsed are
+    listed with their status and exit code, tools skipped as not applicable with the reason, and
+    the files and bytes excluded by each exclude_paths rule follow the tool table.
+    """
     logging.info("Generating summary report")
     reports = {}
+    failed = {}
     total_issues = 0
 
     json_dir = os.path.join(report_dir, "json")
-    html_dir = os.path.join(report_dir, "html")
-    # --- Check for checkov as a directory ---
-    checkov_json_dir = os.path.join(json_dir, "checkov.json")
-    checkov_html_dir = os.path.join(html_dir, "checkov")
-    if os.path.isdir(checkov_json_dir):
-        checkov_issue_count = 0
-        checkov_html_link = None
-        for root, dirs, files in os.walk(checkov_json_dir):
-            for file in files:
-                if file.endswith('.json'):
-                    file_path = os.path.join(root, file)
-                    try:
-                        with open(file_path, 'r') as f:
-                            content = json.load(f)
-                        # Count failed checks if present, else total items
-                        if isinstance(content, list):
-                            for entry in content:
-                                if isinstance(entry, dict) and 'results' in entry and 'failed_checks' in entry['results']:
-                                    checkov_issue_count += len(entry['results']['failed_checks'])
-                        elif isinstance(content, dict) and 'results' in content and 'failed_checks' in content['results']:
-                            checkov_issue_count += len(content['results']['failed_checks'])
-                        elif isinstance(content, dict) and 'failed_checks' in content:
-                            checkov_issue_count += len(content['failed_checks'])
-                        else:
-                            checkov_issue_count += 0
-                        # Find the first HTML file for linking
-                        rel_path = os.path.relpath(file_path, checkov_json_dir)
-                        html_candidate = os.path.join(checkov_html_dir, os.path.splitext(rel_path)[0] + '.html')
-                        if not checkov_html_link and os.path.isfile(html_candidate):
-                            checkov_html_link = os.path.relpath(html_candidate, report_dir)
-                    except Exception as e:
-                        logging.warning(f"Skipping invalid Checkov JSON file {file_path}: {e}")
-        reports['checkov'] = {
-            'count': checkov_issue_count,
-            'html': checkov_html_link
-        }
-        total_issues += checkov_issue_count
-    # --- End Checkov directory logic ---
-
-    # Look for JSON files in the json/ subfolder (excluding checkov.json dir)
     if not os.path.isdir(json_dir):
         logging.warning(f"No json/ subfolder found in {report_dir}")
-        json_files = []
-    else:
-        json_files = [f for f in os.listdir(json_dir) if os.path.isfile(os.path.join(json_dir, f)) and f.endswith('.json')]
-    for json_file in json_files:
-        if json_file == "checkov.json":
-            continue  # skip directory, already handled
-        try:
-            file_path = os.path.join(json_dir, json_file)
-            if os.path.getsize(file_path) == 0:
-                logging.warning(f"Skipping empty JSON file {json_file}")
+    for tool_name in _tool_reports(json_dir):
+        manifest = load_manifest(report_dir, tool_name)
+        if manifest is not None:
+            if manifest.get("count") is None:
+                logging.warning(f"No findings counted for {tool_name}: its run manifest records status '{manifest.get('status')}'")
+                failed[tool_name] = _failure(manifest)
+                continue
+            issue_count = manifest["count"]
+            severity = manifest.get("severity", {})
+        else:
+            report_path = os.path.join(json_dir, f"{tool_name}.json")
+            if os.path.isfile(report_path) and os.path.getsize(report_path) == 0:
+                logging.warning(f"Skipping empty JSON file {tool_name}.json")
                 continue
-            with open(file_path, 'r') as f:
-                content = json.load(f)
-                if isinstance(content, list):
-                    issue_count = len(content)
-                elif isinstance(content, dict):
-                    if 'results' in content:
-                        issue_count = len(content['results'])
-                    elif 'matches' in content:
-                        issue_count = len(content['matches'])
-                    elif 'dependencies' in content:
-                        issue_count = sum(1 for d in content['dependencies'] if d.get('vulnerabilities'))
-                    else:
-                        issue_count = 0
-                else:
-                    issue_count = 0
-                tool_name = os.path.splitext(json_file)[0]
-                html_file = f"{tool_name}.html"
-                html_exists = os.path.isfile(os.path.join(html_dir, html_file))
-                reports[tool_name] = {
-                    'count': issue_count,
-                    'html': f"html/{html_file}" if html_exists else None
-                }
-                total_issues += issue_count
-        except (json.JSONDecodeError, OSError) as e:
-            logging.warning(f"Skipping invalid JSON file {json_file}: {e}")
+            try:
+                issue_count = count_report(report_path)
+            except (ValueError, OSError, IndexError) as e:
+                logging.warning(f"Skipping invalid JSON report {report_path}: {e}")
+                continue
+            severity = {}
+        reports[tool_name] = {
+            'count': issue_count,
+            'severity': sorted(severity.items(), key=lambda item: -SEVERITY_LEVELS.get(item[0], -1)),
+            'html': _html_link(report_dir, tool_name),
+            'resources': _resources(manifest)
+        }
+        total_issues += issue_count
+    # Runs that failed without leaving a report have a manifest but nothing in json/
+    for tool_name, manifest in tools_with_status(report_dir, ("failed", "invalid")).items():
+        if tool_name not in reports and tool_name not in failed:
+            failed[tool_name] = _failure(manifest)
+    skipped = {tool: manifest.get("reason") for tool, manifest in skipped_tools(report_dir).items() if tool not in reports}
 
     summary_template = Template("""
     <!DOCTYPE html>
@@ -126,6 +150,8 @@ def generate_summary_report(report_dir, output_path):
                 <th>Tool</th>
                 <th>Issues Found</th>
                 <th>Severity</th>
+                <th>Breakdown</th>
+                <th>Resources</th>
                 <th>Details</th>
             </tr>
             {% for tool, info in reports.items() %}
@@ -141,6 +167,10 @@ def generate_summary_report(report_dir, output_path):
                             <span class="low">Low</span>
                         {% endif %}
                     </td>
+                    <td>
+                        {% for level, level_count in info.severity %}{{ level }}: {{ level_count }}{% if not loop.last %}, {% endif %}{% endfor %}
+                    </td>
+                    <td>{{ info.resources or "" }}</td>
                     <td>
                         {% if info.html %}
                             <a href="{{ info.html }}" target="_blank">View Report</a>
@@ -150,12 +180,46 @@ def generate_summary_report(report_dir, output_path):
                     </td>
                 </tr>
             {% endfor %}
+            {% for tool, info in failed.items() %}
+                <tr>
+                    <td>{{ tool }}</td>
+                    <td colspan="3"><span class="high">{{ info.status }}</span>{% if info.detail %} ({{ info.detail }}){% endif %}</td>
+                    <td>{{ info.resources or "" }}</td>
+                    <td><span style="color: #888;">No results</span></td>
+                </tr>
+            {% endfor %}
+            {% for tool, reason in skipped.items() %}
+                <tr>
+                    <td>{{ tool }}</td>
+                    <td colspan="5" style="color: #888;">Skipped: not applicable{% if reason %} ({{ reason }}){% endif %}</td>
+                </tr>
+            {% endfor %}
+        </table>
+        {% if exclusions %}
+        <h2>Excluded Paths</h2>
+        <p>{{ exclusions.files }} files ({{ exclusions.size }}) were not scanned.</p>
+        <table>
+            <tr>
+                <th>Rule</th>
+                <th>Files</th>
+                <th>Size</th>
+            </tr>
+            {% for rule in exclusions.rules %}
+                <tr>
+                    <td><code>{{ rule.pattern }}</code></td>
+                    <td>{{ rule.files }}</td>
+                    <td>{{ rule.size }}</td>
+                </tr>
+            {% endfor %}
         </table>
+        {% endif %}
     </body>
     </html>
     """)
 
-    summary_html = summary_template.render(reports=reports, total_issues=total_issues)
+    summary_html = summary_template.render(
+        reports=reports, failed=failed, skipped=skipped, exclusions=_exclusions(report_dir), total_issues=total_issues
+    )
     with open(output_path, "w") as f:
         f.write(summary_html)
     logging.info(f"Summary report generated at {output_path}")
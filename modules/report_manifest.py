@@ -0,0 +1,255 @@
+import json
+import logging
+import os
+import re
+import time
+
+from modules.findings_store import normalize_severity
+
+MANIFEST_DIR = "manifests"
+READ_SIZE = 1024 * 1024
+# One JSON token, with leading whitespace skipped: a complete string, a structural character or a bare literal
+TOKEN = re.compile(r'\s*("[^"\\]*(?:\\.[^"\\]*)*"|[{}\[\],:]|[^\s{}\[\]",:]+)')
+# Everything up to the next bracket outside a string, used to step over containers nothing is counted in
+SKIP = re.compile(r'(?:[^"{}\[\]]+|"[^"\\]*(?:\\.[^"\\]*)*")*')
+
+
+def manifest_path(report_dir, tool_name):
+    return os.path.join(report_dir, MANIFEST_DIR, f"{tool_name}.json")
+
+
+def report_size(path):
+    """Size of a report file, or the total size of a report directory (Checkov)."""
+    if os.path.isdir(path):
+        return sum(os.path.getsize(os.path.join(root, file)) for root, _, files in os.walk(path) for file in files)
+    return os.path.getsize(path) if os.path.isfile(path) else 0
+
+
+def _write(report_dir, tool_name, manifest):
+    path = manifest_path(report_dir, tool_name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=4)
+    os.replace(tmp_path, path)
+    return manifest
+
+
+def write_manifest(report_dir, tool_name, report_path, normalize=None, result=None, duration=0.0, exit_codes=(0,)):
+    """
+    Write the small per-tool manifest the summary is built from: finding count, severity
+    breakdown, report size, duration, exit status and the tool process's resource usage.
+    The report is read once, here, while it is still in the page cache.
+    A run succeeded when it left a report, exited with one of exit_codes and its report parses.
+    :param normalize: The tool's normalize function (None for tools without findings, e.g. Syft).
+    :param result: Whatever the scanner returned; its returncode and, for a StreamResult, its CPU
+                   time, peak RSS and output bytes are recorded when present.
+    :param exit_codes: The tool's exit codes for a completed scan (the scanner module's EXIT_CODES).
+    """
+    size = report_size(report_path)
+    exit_code = getattr(result, "returncode", None)
+    # Runners that reuse a previous report or write a placeholder return no process to check
+    succeeded = bool(size) and (exit_code is None or exit_code in exit_codes)
+    if size and not succeeded:
+        logging.warning(f"{tool_name} exited with code {exit_code}; its report is not trusted")
+    manifest = {
+        "tool": tool_name,
+        "status": "success" if succeeded else "failed",
+        "exit_code": exit_code,
+        "count": 0 if succeeded else None,
+        "severity": {},
+        "bytes": size,
+        "duration": round(duration, 3),
+        "cpu_user": round(getattr(result, "user_cpu", 0.0), 3),
+        "cpu_system": round(getattr(result, "system_cpu", 0.0), 3),
+        "max_rss_bytes": getattr(result, "max_rss_bytes", 0),
+        # Tools that write their own report file send nothing to stdout; count the report instead
+        "output_bytes": getattr(result, "bytes_written", 0) or size,
+        "created": time.time(),
+    }
+    if succeeded and normalize is not None:
+        try:
+            for record in normalize(report_path):
+                severity = normalize_severity(record.get("severity"))
+                manifest["severity"][severity] = manifest["severity"].get(severity, 0) + 1
+                manifest["count"] += 1
+        except (OSError, ValueError, AttributeError, TypeError) as e:
+            logging.warning(f"Could not count {tool_name} findings in {report_path}: {e}")
+            manifest.update(status="invalid", count=None, severity={})
+    return _write(report_dir, tool_name, manifest)
+
+
+def write_skipped_manifest(report_dir, tool_name, reason):
+    """Record that a tool was not run on this repository, and why, so the summary can show it."""
+    manifest = {"tool": tool_name, "status": "skipped", "reason": reason, "count": None, "severity": {}, "created": time.time()}
+    return _write(report_dir, tool_name, manifest)
+
+
+def tools_with_status(report_dir, statuses):
+    """Manifests of the tools in a report folder whose status is one of statuses, by tool name."""
+    manifest_dir = os.path.join(report_dir, MANIFEST_DIR)
+    found = {}
+    if not os.path.isdir(manifest_dir):
+        return found
+    for name in sorted(os.listdir(manifest_dir)):
+        if name.endswith(".json"):
+            manifest = load_manifest(report_dir, name[:-len(".json")])
+            if manifest and manifest.get("status") in statuses:
+                found[manifest.get("tool", name[:-len(".json")])] = manifest
+    return found
+
+
+def skipped_tools(report_dir):
+    """Manifests of the tools skipped in a report folder, by tool name."""
+    return tools_with_status(report_dir, ("skipped",))
+
+
+def load_manifest(report_dir, tool_name):
+    try:
+        with open(manifest_path(report_dir, tool_name)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+class _StreamingCounter:
+    """
+    Single pass over a JSON document that keeps only the current nesting path. Containers that
+    cannot hold anything counted are skipped without tokenizing them, and 'dependencies'
+    entries are decoded one at a time, so memory stays bounded whatever the report size.
+    """
+
+    COUNTED = {("*",), ("results", "*"), ("matches", "*"), ("results", "failed_checks", "*"), ("*", "results", "failed_checks", "*")}
+    CAPTURED = ("dependencies", "*")
+
+    def __init__(self):
+        self.counts = {path: 0 for path in self.COUNTED}
+        self.containers = {}
+        self.vulnerabilities = 0
+        self.stack = []  # [container type, current key] per open container
+        self.expect_key = False
+
+    def _path(self):
+        return tuple("*" if kind == "[" else key for kind, key in self.stack)
+
+    def _descends(self, path):
+        """Whether anything below a container at `path` is counted or captured."""
+        return any(
+            len(wanted) > len(path) and wanted[:len(path)] == path
+            for wanted in self.COUNTED | {self.CAPTURED}
+        )
+
+    def feed(self, token):
+        """
+        Consume one token.
+        :return: "skip" or "capture" when a container was opened whose contents need not be
+                 tokenized (the caller then finds its end and calls close or captured), else None.
+        """
+        if token in ("{", "["):
+            path = self._path()
+            if path in self.counts:
+                self.counts[path] += 1
+            if len(path) <= 3:
+                self.containers[path] = token
+            self.stack.append([token, None])
+            self.expect_key = token == "{"
+            if path == self.CAPTURED:
+                return "capture"
+            if not self._descends(path):
+                return "skip"
+        elif token in ("}", "]"):
+            self.close()
+        elif token == ",":
+            self.expect_key = bool(self.stack) and self.stack[-1][0] == "{"
+        elif token == ":":
+            self.expect_key = False
+        elif self.expect_key:
+            self.stack[-1][1] = json.loads(token)
+        else:
+            # A string or literal value
+            path = self._path()
+            if path in self.counts:
+                self.counts[path] += 1
+        return None
+
+    def close(self):
+        self.stack.pop()
+        self.expect_key = False
+
+    def captured(self, text):
+        self.close()
+        entry = json.loads(text)
+        if isinstance(entry, dict):
+            self.vulnerabilities += len(entry.get("vulnerabilities") or [])
+
+    def result(self):
+        """Apply the same shape rules as the normalizers to the counts collected."""
+        top = self.containers.get(())
+        if top == "[":
+            if ("*", "results", "failed_checks") in self.containers:
+                return self.counts[("*", "results", "failed_checks", "*")]
+            return self.counts[("*",)]
+        if self.containers.get(("results",)) == "[":
+            return self.counts[("results", "*")]
+        if ("results", "failed_checks") in self.containers:
+            return self.counts[("results", "failed_checks", "*")]
+        if ("matches",) in self.containers:
+            return self.counts[("matches", "*")]
+        return self.vulnerabilities
+
+
+def count_findings_streaming(path):
+    """Count findings in a JSON report without loading it, for reports that have no manifest."""
+    counter = _StreamingCounter()
+    buffer = ""
+    skip_depth = 0
+    capture = None  # Raw text of the captured container read so far, or None
+    with open(path, encoding="utf-8", errors="replace") as f:
+        eof = False
+        while not eof:
+            chunk = f.read(READ_SIZE)
+            eof = not chunk
+            buffer += chunk
+            pos = 0
+            capture_start = 0
+            while True:
+                if skip_depth:
+                    pos = SKIP.match(buffer, pos).end()
+                    # Out of data, or a string that continues in the next chunk
+                    if pos == len(buffer) or buffer[pos] == '"':
+                        break
+                    skip_depth += 1 if buffer[pos] in "{[" else -1
+                    pos += 1
+                    if not skip_depth:
+                        if capture is None:
+                            counter.close()
+                        else:
+                            counter.captured(capture + buffer[capture_start:pos])
+                            capture = None
+                    continue
+                match = TOKEN.match(buffer, pos)
+                # A token touching the end of the buffer may continue in the next chunk
+                if match is None or (match.end() == len(buffer) and not eof):
+                    break
+                pos = match.end()
+                action = counter.feed(match.group(1))
+                if action:
+                    skip_depth = 1
+                    if action == "capture":
+                        capture, capture_start = "", pos - 1
+            if capture is not None:
+                capture += buffer[capture_start:pos]
+            buffer = buffer[pos:]
+    if buffer.strip() or skip_depth or counter.stack:
+        raise ValueError(f"Truncated or invalid JSON in {path}")
+    return counter.result()
+
+
+def count_report(path):
+    """Streaming count for a report file, or the sum over a Checkov report directory."""
+    if os.path.isdir(path):
+        return sum(
+            count_findings_streaming(os.path.join(root, file))
+            for root, _, files in os.walk(path) for file in files if file.endswith(".json")
+        )
+    return count_findings_streaming(path)
@@ -0,0 +1,265 @@
+import functools
+import hashlib
+import json
+import logging
+import os
+import shutil
+import subprocess
+import threading
+import time
+import uuid
+
+# Command used to ask each tool for its version; part of the cache key so upgrades invalidate entries
+VERSION_COMMANDS = {
+    "gitleaks": ["gitleaks", "version"],
+    "trufflehog": ["trufflehog", "--version"],
+    "semgrep": ["semgrep", "--version"],
+    "syft": ["syft", "version"],
+    "grype": ["grype", "version"],
+    "bandit": ["bandit", "--version"],
+    "safety": ["safety", "--version"],
+    "checkov": ["checkov", "--version"],
+    "dependency-check": ["dependency-check", "--version"],
+    "hadolint": ["hadolint", "--version"],
+}
+
+ENTRY_FILE = "entry.json"
+# Tools whose findings also depend on a vulnerability database or registry rule set that changes
+# without any commit, tool or configuration change
+DATA_DEPENDENT_TOOLS = ("grype", "dependency-check", "safety", "semgrep")
+# Staging directories younger than this may still be written by another process sharing the cache
+STAGING_GRACE_SECONDS = 3600
+
+
+@functools.lru_cache(maxsize=None)
+def get_tool_version(tool_name):
+    """Return the version string reported by a tool, or None if it cannot be determined."""
+    command = VERSION_COMMANDS.get(tool_name)
+    if not command:
+        return None
+    try:
+        result = subprocess.run(command, capture_output=True, text=True, timeout=60)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    output = (result.stdout or result.stderr).strip()
+    if result.returncode != 0 or not output:
+        return None
+    return output.splitlines()[0].strip()
+
+
+@functools.lru_cache(maxsize=None)
+def _grype_db_built(period):
+    """Build time of Grype's vulnerability database; period only makes the lookup repeat as time passes."""
+    try:
+        result = subprocess.run(["grype", "db", "status", "-o", "json"], capture_output=True, text=True, timeout=60)
+        return json.loads(result.stdout).get("built") if result.returncode == 0 else None
+    except (OSError, subprocess.TimeoutExpired, ValueError, AttributeError):
+        return None
+
+
+def data_version(tool_name, max_age_hours=24, database_updated=None):
+    """
+    Version of the data a tool matches against, for the cache key: Grype's database build time,
+    the last Dependency-Check database update (database_updated), or for Safety's online database,
+    Semgrep's registry rules and whenever the version is unknown, the current max_age_hours period,
+    so cached results of these tools expire after at most max_age_hours.
+    :return: None for tools whose results only depend on the repository, tool and configuration.
+    """
+    if tool_name not in DATA_DEPENDENT_TOOLS:
+        return None
+    period = int(time.time() // (max_age_hours * 3600)) if max_age_hours else 0
+    if tool_name == "grype":
+        version = _grype_db_built(period)
+    elif tool_name == "dependency-check":
+        version = database_updated
+    else:
+        version = None
+    return str(version) if version is not None else f"period-{period}"
+
+
+def tool_config_hash(tool_name, config, scanner_module=None, extra=None):
+    """
+    Hash everything besides the repository content that can change a tool's output:
+    the scanner module source (which holds the command line), the relevant settings
+    and any per-repository settings passed in extra.
+    """
+    digest = hashlib.sha256()
+    if scanner_module is not None and getattr(scanner_module, "__file__", None):
+        with open(scanner_module.__file__, "rb") as f:
+            digest.update(f.read())
+    settings = {
+        "exclude_paths": config.get("exclude_paths", []),
+        "custom_rules": config.get("custom_rules", []),
+        "extra": extra,
+    }
+    if tool_name == "safety":
+        requirements_path = config["general"]["requirements_path"]
+        settings["requirements_path"] = requirements_path
+        if os.path.isfile(requirements_path):
+            with open(requirements_path, "rb") as f:
+                settings["requirements_sha256"] = hashlib.sha256(f.read()).hexdigest()
+    digest.update(json.dumps(settings, sort_keys=True).encode())
+    return digest.hexdigest()
+
+
+def report_outputs(report_dir, tool_name):
+    """List the report paths (relative to report_dir) a tool produces, whether files or directories."""
+    candidates = [
+        os.path.join("json", f"{tool_name}.json"),
+        os.path.join("html", f"{tool_name}.html"),
+        os.path.join("html", tool_name),
+        os.path.join("manifests", f"{tool_name}.json"),
+    ]
+    return [rel for rel in candidates if os.path.exists(os.path.join(report_dir, rel))]
+
+
+def _link_or_copy(src, dst):
+    """Hard-link a file (cheap and space-free) and fall back to a copy across filesystems."""
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+def _copy_tree(src, dst):
+    if os.path.isdir(src):
+        shutil.copytree(src, dst, copy_function=_link_or_copy, dirs_exist_ok=True)
+    else:
+        os.makedirs(os.path.dirname(dst), exist_ok=True)
+        _link_or_copy(src, dst)
+
+
+def _dir_size(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for file in files:
+            try:
+                total += os.path.getsize(os.path.join(root, file))
+            except OSError:
+                pass
+    return total
+
+
+class ResultCache:
+    """
+    Persistent scan-result cache keyed by (repo URL, commit SHA, tool, tool version, tool config hash)
+    plus, for tools matching against a vulnerability database or registry rules, the data version.
+    Entries hold the JSON and HTML reports of one tool run and are restored into a new
+    timestamped report directory by hard-linking, so a hit skips the scanner subprocess entirely.
+    """
+
+    def __init__(self, path=".scan_cache", max_entries=500, max_size_mb=2048, max_age_days=30):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_size_mb * 1024 * 1024 if max_size_mb else None
+        self.max_age_seconds = max_age_days * 86400 if max_age_days else None
+        self._lock = threading.Lock()
+        os.makedirs(self.path, exist_ok=True)
+
+    @staticmethod
+    def make_key(repo_url, commit, tool_name, tool_version, config_hash, data_version=None):
+        parts = [repo_url, commit, tool_name, tool_version, config_hash]
+        if data_version is not None:
+            parts.append(data_version)
+        return hashlib.sha256(json.dumps(parts).encode()).hexdigest()
+
+    def _entry_dir(self, key):
+        return os.path.join(self.path, key[:2], key)
+
+    def restore(self, key, report_dir, tool_name):
+        """Copy a cached tool result into report_dir. Returns True on a cache hit."""
+        entry_dir = self._entry_dir(key)
+        entry_path = os.path.join(entry_dir, ENTRY_FILE)
+        try:
+            with open(entry_path) as f:
+                entry = json.load(f)
+            for rel in entry["outputs"]:
+                _copy_tree(os.path.join(entry_dir, rel), os.path.join(report_dir, rel))
+        except FileNotFoundError:
+            return False
+        except (OSError, ValueError, KeyError) as e:
+            logging.warning(f"Discarding unreadable cache entry for {tool_name}: {e}")
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            return False
+        entry["last_used"] = time.time()
+        entry["hits"] = entry.get("hits", 0) + 1
+        with open(entry_path, "w") as f:
+            json.dump(entry, f)
+        logging.info(f"Cache hit for {tool_name} (commit {entry.get('commit', '?')[:12]})")
+        return True
+
+    def store(self, key, report_dir, tool_name, metadata=None):
+        """Save the reports a tool produced in report_dir under key."""
+        outputs = report_outputs(report_dir, tool_name)
+        if not any(rel.startswith("json") for rel in outputs):
+            return
+        entry_dir = self._entry_dir(key)
+        if os.path.exists(entry_dir):
+            return
+        # Build the entry in a private directory and rename it into place, so concurrent
+        # runs never see a half-written entry
+        staging_dir = os.path.join(self.path, f".tmp-{uuid.uuid4().hex}")
+        try:
+            for rel in outputs:
+                _copy_tree(os.path.join(report_dir, rel), os.path.join(staging_dir, rel))
+            entry = dict(metadata or {})
+            entry.update({
+                "tool": tool_name,
+                "outputs": outputs,
+                "created": time.time(),
+                "last_used": time.time(),
+                "size": _dir_size(staging_dir),
+            })
+            with open(os.path.join(staging_dir, ENTRY_FILE), "w") as f:
+                json.dump(entry, f)
+            os.makedirs(os.path.dirname(entry_dir), exist_ok=True)
+            os.rename(staging_dir, entry_dir)
+        except OSError as e:
+            logging.warning(f"Could not store {tool_name} result in cache: {e}")
+        finally:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+
+    def _entries(self):
+        entries = []
+        for prefix in os.listdir(self.path):
+            prefix_dir = os.path.join(self.path, prefix)
+            if prefix.startswith(".tmp-"):
+                # Leftover from an interrupted store, unless another run may still be writing it
+                try:
+                    if time.time() - os.path.getmtime(prefix_dir) > STAGING_GRACE_SECONDS:
+                        shutil.rmtree(prefix_dir, ignore_errors=True)
+                except OSError:
+                    pass
+                continue
+            if not os.path.isdir(prefix_dir):
+                continue
+            for key in os.listdir(prefix_dir):
+                entry_dir = os.path.join(prefix_dir, key)
+                try:
+                    with open(os.path.join(entry_dir, ENTRY_FILE)) as f:
+                        entry = json.load(f)
+                except (OSError, ValueError):
+                    entry = {"last_used": 0, "size": _dir_size(entry_dir)}
+                entries.append((entry_dir, entry))
+        return entries
+
+    def evict(self):
+        """Drop expired entries, then least recently used ones until the count and size limits hold."""
+        with self._lock:
+            entries = sorted(self._entries(), key=lambda e: e[1].get("last_used", 0))
+            now = time.time()
+            total_size = sum(entry.get("size", 0) for _, entry in entries)
+            removed = 0
+            while entries:
+                entry_dir, entry = entries[0]
+                expired = self.max_age_seconds and now - entry.get("last_used", 0) > self.max_age_seconds
+                too_many = self.max_entries and len(entries) > self.max_entries
+                too_big = self.max_bytes and total_size > self.max_bytes
+                if not (expired or too_many or too_big):
+                    break
+                shutil.rmtree(entry_dir, ignore_errors=True)
+                total_size -= entry.get("size", 0)
+                entries.pop(0)
+                removed += 1
+            if removed:
+                logging.info(f"Evicted {removed} scan cache entries ({len(entries)} left, {total_size / 1048576:.1f} MB)")
@@ -0,0 +1,209 @@
+import json
+import logging
+import os
+import statistics
+import threading
+import time
+from datetime import datetime
+
+# Measurements kept per tool run, as recorded in its manifest
+RESOURCE_FIELDS = ("duration", "cpu_user", "cpu_system", "max_rss_bytes", "output_bytes")
+# Measurements compared against history; tiny values are ignored so noise is not reported
+REGRESSION_FIELDS = {"duration": 5.0, "max_rss_bytes": 64 * 1024 * 1024}
+PROMETHEUS_METRICS = (
+    ("duration", "security_scan_tool_wall_seconds", "Wall-clock time of the scanner process"),
+    ("cpu_user", "security_scan_tool_cpu_user_seconds", "User CPU time of the scanner process"),
+    ("cpu_system", "security_scan_tool_cpu_system_seconds", "System CPU time of the scanner process"),
+    ("max_rss_bytes", "security_scan_tool_max_rss_bytes", "Peak resident set size of the scanner process"),
+    ("output_bytes", "security_scan_tool_output_bytes", "Bytes of output written by the scanner"),
+)
+
+
+# First guesses (seconds) for tools that have never run here; history replaces them
+DEFAULT_ESTIMATES = {
+    "dependency-check": 300.0, "semgrep": 120.0, "trufflehog": 60.0, "checkov": 60.0, "gitleaks": 30.0,
+    "syft": 20.0, "grype": 20.0, "bandit": 20.0, "safety": 10.0, "hadolint": 2.0,
+}
+DEFAULT_TASK_ESTIMATE = 1.0  # HTML renders, cache stores and unknown tools
+
+
+def load_history(history_path):
+    """Measured (not cached) tool runs from the history file per (repo, tool), oldest first."""
+    history = {}
+    try:
+        with open(history_path) as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if not record.get("cached"):
+                    history.setdefault((record["repo"], record["tool"]), []).append(record)
+    except FileNotFoundError:
+        pass
+    return history
+
+
+class DurationEstimator:
+    """
+    Expected wall time of a tool on a repository: the median of its recent runs on that
+    repository, else the tool's median seconds per MB of checkout times the repository size,
+    else the tool's median over all repositories, else DEFAULT_ESTIMATES.
+    """
+
+    def __init__(self, history_path=".scan_state/metrics_history.jsonl", history_runs=10):
+        self.by_repo_tool = {}
+        rates, durations = {}, {}
+        for (repo, tool), records in load_history(history_path).items():
+            recent = records[-history_runs:]
+            self.by_repo_tool[(repo, tool)] = statistics.median(record["duration"] for record in recent)
+            for record in recent:
+                durations.setdefault(tool, []).append(record["duration"])
+                if record.get("repo_bytes"):
+                    rates.setdefault(tool, []).append(record["duration"] / max(record["repo_bytes"] / 1048576, 1.0))
+        self.rate_by_tool = {tool: statistics.median(values) for tool, values in rates.items()}
+        self.by_tool = {tool: statistics.median(values) for tool, values in durations.items()}
+
+    def estimate(self, repo, tool, repo_bytes=None):
+        if (repo, tool) in self.by_repo_tool:
+            return self.by_repo_tool[(repo, tool)]
+        if repo_bytes and tool in self.rate_by_tool:
+            return self.rate_by_tool[tool] * max(repo_bytes / 1048576, 1.0)
+        return self.by_tool.get(tool, DEFAULT_ESTIMATES.get(tool, DEFAULT_TASK_ESTIMATE))
+
+
+def _escape_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class RunMetrics:
+    """
+    Resource usage of every scanner process in one run: wall time, user and system CPU,
+    peak RSS and output bytes per repository and tool. Written as one JSON file per run,
+    optionally as a Prometheus textfile, and appended to a history file that later runs
+    compare against to flag regressions.
+    """
+
+    def __init__(self, path="reports/metrics", history_path=".scan_state/metrics_history.jsonl",
+                 history_runs=10, regression_factor=1.5, prometheus_textfile=None):
+        self.path = path
+        self.history_path = history_path
+        self.history_runs = history_runs
+        self.regression_factor = regression_factor
+        self.prometheus_textfile = prometheus_textfile
+        self.started = time.time()
+        self.records = []
+        self.repo_sizes = {}
+        self.schedule = None
+        self._lock = threading.Lock()
+
+    def record(self, repo, tool_name, manifest, cached=False):
+        """
+        Record one tool run from its manifest. Cache hits are recorded with no cost, since no
+        process ran; the manifest restored with the report describes the run that produced it.
+        """
+        record = {"repo": repo, "tool": tool_name, "cached": cached,
+                  "exit_code": None if cached else manifest.get("exit_code"),
+                  "status": manifest.get("status")}
+        for field in RESOURCE_FIELDS:
+            record[field] = 0 if cached else manifest.get(field, 0)
+        with self._lock:
+            self.records.append(record)
+
+    def set_repo_size(self, repo, size_bytes):
+        """Checkout size of a repository, kept with its records so estimates can scale with size."""
+        with self._lock:
+            self.repo_sizes[repo] = size_bytes
+
+    def compare(self):
+        """
+        Attach the median of the last history_runs measurements of the same repository and tool
+        to each record, and return the measurements that grew past regression_factor.
+        """
+        history = load_history(self.history_path)
+        regressions = []
+        for record in self.records:
+            previous = history.get((record["repo"], record["tool"]), [])[-self.history_runs:]
+            if record["cached"] or not previous:
+                continue
+            record["baseline"] = {}
+            for field, floor in REGRESSION_FIELDS.items():
+                baseline = statistics.median(item.get(field, 0) for item in previous)
+                record["baseline"][field] = baseline
+                if record[field] >= floor and baseline and record[field] > baseline * self.regression_factor:
+                    regressions.append({
+                        "repo": record["repo"], "tool": record["tool"], "field": field,
+                        "value": record[field], "baseline": baseline, "ratio": round(record[field] / baseline, 2),
+                    })
+        return regressions
+
+    def write(self):
+        """Write the run's metrics JSON, the Prometheus textfile and the history entries. Returns the JSON path."""
+        with self._lock:
+            records = sorted(self.records, key=lambda record: (record["repo"], record["tool"]))
+            for record in records:
+                record.setdefault("repo_bytes", self.repo_sizes.get(record["repo"]))
+        self.records = records
+        regressions = self.compare()
+        for regression in regressions:
+            logging.warning(
+                f"Resource regression: {regression['tool']} on {regression['repo']} {regression['field']} "
+                f"{regression['value']} vs median {regression['baseline']} ({regression['ratio']}x)"
+            )
+        run = {
+            "started": self.started,
+            "finished": time.time(),
+            "totals": {field: round(sum(record[field] for record in records), 3) for field in RESOURCE_FIELDS},
+            "tools": records,
+            "regressions": regressions,
+        }
+        if self.schedule is not None:
+            run["schedule"] = self.schedule
+        os.makedirs(self.path, exist_ok=True)
+        path = os.path.join(self.path, f"{datetime.fromtimestamp(self.started).strftime('%Y-%m-%d_%H-%M-%S')}.json")
+        self._write_atomic(path, json.dumps(run, indent=4))
+        if self.prometheus_textfile:
+            self._write_atomic(self.prometheus_textfile, self.prometheus_text(records))
+        if self.history_path:
+            os.makedirs(os.path.dirname(self.history_path) or ".", exist_ok=True)
+            with open(self.history_path, "a") as f:
+                for record in records:
+                    entry = {key: value for key, value in record.items() if key != "baseline"}
+                    f.write(json.dumps(dict(entry, started=self.started)) + "\n")
+        logging.info(f"Run metrics for {len(records)} tool runs written to {path}")
+        return path
+
+    def flush(self):
+        """
+        Write the metrics recorded so far as one run (see write) and start a new period with no
+        records; long-running watch mode calls this after every scan.
+        """
+        with self._lock:
+            records, self.records = self.records, []
+            started, self.started = self.started, time.time()
+            repo_sizes = dict(self.repo_sizes)
+        period = RunMetrics(self.path, self.history_path, self.history_runs, self.regression_factor, self.prometheus_textfile)
+        period.started, period.records, period.repo_sizes = started, records, repo_sizes
+        return period.write()
+
+    def prometheus_text(self, records):
+        """Text exposition format for the node_exporter textfile collector (latest run only)."""
+        lines = []
+        for field, name, help_text in PROMETHEUS_METRICS:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} gauge")
+            for record in records:
+                labels = f'repo="{_escape_label(record["repo"])}",tool="{_escape_label(record["tool"])}",cached="{str(record["cached"]).lower()}"'
+                lines.append(f"{name}{{{labels}}} {record[field]}")
+        lines.append("# HELP security_scan_last_run_timestamp_seconds Start time of the last scan run")
+        lines.append("# TYPE security_scan_last_run_timestamp_seconds gauge")
+        lines.append(f"security_scan_last_run_timestamp_seconds {self.started}")
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _write_atomic(path, text):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(text)
+        os.replace(tmp_path, path)
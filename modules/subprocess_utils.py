@@ -1,17 +1,193 @@
 import logging
+import os
 import subprocess
+import sys
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
 
-def run_subprocess(command, timeout=None):
-    """Run a subprocess command with logging and error handling."""
+# Applied to every scanner run that does not ask for a specific timeout (seconds, None = no limit)
+DEFAULT_TIMEOUT = 3600
+# How much of a tool's stderr is kept for logging
+STDERR_TAIL_BYTES = 64 * 1024
+CHUNK_SIZE = 64 * 1024
+
+
+@dataclass
+class StreamResult:
+    """Outcome of a streamed scanner run, with the child's own resource usage."""
+    command: list
+    returncode: int
+    stderr: str
+    bytes_written: int
+    duration: float
+    user_cpu: float = 0.0
+    system_cpu: float = 0.0
+    max_rss_bytes: int = 0
+
+
+def set_default_timeout(timeout):
+    """Set the timeout applied to scanner runs that do not pass one explicitly."""
+    global DEFAULT_TIMEOUT
+    DEFAULT_TIMEOUT = timeout
+
+
+def _collect_tail(stream, tail, limit):
+    """Read a pipe in fixed-size chunks, keeping only the last `limit` bytes."""
+    size = 0
+    for chunk in iter(lambda: stream.read(CHUNK_SIZE), b""):
+        tail.append(chunk)
+        size += len(chunk)
+        while size - len(tail[0]) >= limit:
+            size -= len(tail.popleft())
+    stream.close()
+
+
+def _wait_with_usage(proc, timeout):
+    """
+    Wait for a child like proc.wait(timeout), reaping it with os.wait4 so its own CPU time and
+    peak RSS are known even while other scanners run concurrently (RUSAGE_CHILDREN would mix them).
+    :return: (reaper thread, usage dict). The dict is filled once the thread has finished; if the
+             thread is still alive the timeout expired and the caller must kill the child and join it.
+    """
+    usage = {}
+
+    def reap():
+        try:
+            _, status, rusage = os.wait4(proc.pid, 0)
+        except ChildProcessError:
+            # Already reaped by Popen (a kill() polls first); the exit code is known, the usage is not
+            proc.wait()
+            return
+        proc.returncode = os.waitstatus_to_exitcode(status)
+        # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+        scale = 1 if sys.platform == "darwin" else 1024
+        usage.update(user_cpu=rusage.ru_utime, system_cpu=rusage.ru_stime, max_rss_bytes=rusage.ru_maxrss * scale)
+
+    if not hasattr(os, "wait4"):
+        thread = threading.Thread(target=proc.wait, daemon=True)
+    else:
+        thread = threading.Thread(target=reap, daemon=True)
+    thread.start()
+    thread.join(timeout)
+    return thread, usage
+
+
+def run_streaming(command, output_path=None, timeout=None):
+    """
+    Run a scanner without holding its output in memory.
+    stdout goes straight to output_path (the child writes to the file descriptor, so
+    nothing is copied through Python) or is discarded when the tool writes its own
+    report file. Only the last STDERR_TAIL_BYTES of stderr are kept for logging.
+    A timeout kills the tool and removes its partial output.
+    :param command: Command and arguments.
+    :param output_path: File that receives stdout, or None.
+    :param timeout: Seconds before the tool is killed; defaults to DEFAULT_TIMEOUT.
+    :return: StreamResult, or None if the tool could not be started or timed out.
+    """
+    timeout = DEFAULT_TIMEOUT if timeout is None else timeout
+    start = time.monotonic()
+    stdout = open(output_path, "wb") if output_path else subprocess.DEVNULL
     try:
-        result = subprocess.run(
-            command, capture_output=True, text=True, timeout=timeout
-        )
-        if result.returncode != 0:
-            logging.warning(f"Command finished with warnings: {result.stderr}")
-        return result
-    except subprocess.TimeoutExpired:
-        logging.error(f"Command timed out: {' '.join(command)}")
-    except Exception as e:
+        try:
+            proc = subprocess.Popen(command, stdout=stdout, stderr=subprocess.PIPE)
+        except OSError:
+            logging.exception(f"Command failed: {' '.join(command)}")
+            if output_path:
+                stdout.close()
+                os.remove(output_path)
+            return None
+        tail = deque()
+        reader = threading.Thread(target=_collect_tail, args=(proc.stderr, tail, STDERR_TAIL_BYTES), daemon=True)
+        reader.start()
+        waiter, usage = _wait_with_usage(proc, timeout)
+        if waiter.is_alive():
+            proc.kill()
+            waiter.join()
+            reader.join()
+            logging.error(f"Command timed out after {timeout}s: {' '.join(command)}")
+            if output_path:
+                stdout.close()
+                os.remove(output_path)
+            return None
+        returncode = proc.returncode
+        reader.join()
+    finally:
+        if output_path and not stdout.closed:
+            stdout.close()
+    stderr = b"".join(tail)[-STDERR_TAIL_BYTES:].decode(errors="replace")
+    result = StreamResult(
+        command=command,
+        returncode=returncode,
+        stderr=stderr,
+        bytes_written=os.path.getsize(output_path) if output_path else 0,
+        duration=time.monotonic() - start,
+        **usage,
+    )
+    if returncode != 0:
+        logging.warning(f"Command finished with warnings: {stderr}")
+    return result
+
+
+def run_streaming_lines(command, on_line, timeout=None):
+    """
+    Run a tool and hand each stdout line (bytes) to on_line as soon as it arrives,
+    for tools whose line-oriented output is processed rather than stored verbatim.
+    Timeouts and stderr handling match run_streaming.
+    :return: StreamResult (bytes_written counts the stdout bytes read), or None if the
+             tool could not be started or timed out.
+    """
+    timeout = DEFAULT_TIMEOUT if timeout is None else timeout
+    start = time.monotonic()
+    try:
+        proc = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    except OSError:
         logging.exception(f"Command failed: {' '.join(command)}")
-    return None
+        return None
+    tail = deque()
+    reader = threading.Thread(target=_collect_tail, args=(proc.stderr, tail, STDERR_TAIL_BYTES), daemon=True)
+    reader.start()
+    timed_out = threading.Event()
+
+    def kill_on_timeout():
+        timed_out.set()
+        proc.kill()
+
+    timer = threading.Timer(timeout, kill_on_timeout) if timeout else None
+    if timer:
+        timer.daemon = True
+        timer.start()
+    bytes_read = 0
+    try:
+        for line in proc.stdout:
+            bytes_read += len(line)
+            on_line(line)
+    except BaseException:
+        if not timed_out.is_set():
+            # on_line raised; do not leave the tool running
+            proc.kill()
+        raise
+    finally:
+        proc.stdout.close()
+        # Not polled first: poll() would reap the child before wait4 could read its usage
+        _, usage = _wait_with_usage(proc, None)
+        returncode = proc.returncode
+        if timer:
+            timer.cancel()
+        reader.join()
+    if timed_out.is_set():
+        logging.error(f"Command timed out after {timeout}s: {' '.join(command)}")
+        return None
+    stderr = b"".join(tail)[-STDERR_TAIL_BYTES:].decode(errors="replace")
+    result = StreamResult(
+        command=command,
+        returncode=returncode,
+        stderr=stderr,
+        bytes_written=bytes_read,
+        duration=time.monotonic() - start,
+        **usage,
+    )
+    if returncode != 0:
+        logging.warning(f"Command finished with warnings: {stderr}")
+    return result
@@ -0,0 +1,346 @@
+import heapq
+import itertools
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from dataclasses import dataclass, field
+
+
+@dataclass
+class ToolTask:
+    """A unit of work for one repository (a scanner run or an HTML render)."""
+    name: str
+    func: callable
+    depends_on: list = field(default_factory=list)
+    requires: list = field(default_factory=list)  # Dependencies that must succeed, or this task is skipped
+    output_path: str = None
+    cached: bool = False  # Restored from the result cache; nothing runs
+
+
+@dataclass
+class ToolResult:
+    """Outcome of a single task."""
+    name: str
+    status: str  # "success", "failed" or "skipped"
+    duration: float = 0.0
+    error: str = None
+
+
+def _output_exists(path):
+    """Check that a report file (or Checkov report directory) was actually produced."""
+    if path is None:
+        return True
+    if os.path.isdir(path):
+        return any(files for _, _, files in os.walk(path))
+    return os.path.isfile(path) and os.path.getsize(path) > 0
+
+
+def _execute(task, results=None):
+    """Run a task, or skip it when a task it requires did not succeed (results holds the finished tasks)."""
+    for dep in task.requires:
+        result = (results or {}).get(dep)
+        if result is None or result.status != "success":
+            return ToolResult(task.name, "skipped", error=f"{dep} did not succeed")
+    start = time.monotonic()
+    try:
+        task.func()
+    except Exception as e:
+        logging.exception(f"Task {task.name} failed")
+        return ToolResult(task.name, "failed", time.monotonic() - start, str(e))
+    duration = time.monotonic() - start
+    if not _output_exists(task.output_path):
+        return ToolResult(task.name, "failed", duration, f"No output written to {task.output_path}")
+    return ToolResult(task.name, "success", duration)
+
+
+def run_tasks(tasks, max_workers=1):
+    """
+    Run tasks respecting their dependencies, using up to max_workers threads.
+    A task starts once every task it depends on has finished (successfully or not),
+    so one slow or failing tool never blocks unrelated tools.
+    :param tasks: List of ToolTask objects.
+    :param max_workers: Maximum number of tasks to run at the same time.
+    :return: Dict mapping task name to ToolResult, in task declaration order.
+    """
+    by_name = {task.name: task for task in tasks}
+    for task in tasks:
+        for dep in task.depends_on:
+            if dep not in by_name:
+                raise ValueError(f"Task '{task.name}' depends on unknown task '{dep}'")
+        for dep in task.requires:
+            if dep not in task.depends_on:
+                raise ValueError(f"Task '{task.name}' requires '{dep}' without depending on it")
+
+    results = {}
+    pending = list(tasks)
+    running = {}
+    with ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="scan") as executor:
+        while pending or running:
+            ready = [t for t in pending if all(dep in results for dep in t.depends_on)]
+            for task in ready:
+                pending.remove(task)
+                running[executor.submit(_execute, task, dict(results))] = task
+            if not running:
+                # Only reachable with a dependency cycle
+                for task in pending:
+                    results[task.name] = ToolResult(task.name, "skipped", error="Unresolvable dependency")
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                task = running.pop(future)
+                results[task.name] = future.result()
+                result = results[task.name]
+                if result.status == "success":
+                    logging.info(f"{task.name} finished in {result.duration:.1f}s")
+                else:
+                    logging.warning(f"{task.name} {result.status} after {result.duration:.1f}s: {result.error}")
+    return {task.name: results[task.name] for task in tasks}
+
+
+@dataclass
+class _Job:
+    """A task of one repository as seen by LptScheduler."""
+    repo: object
+    task: ToolTask
+    estimate: float
+    order: int
+    priority: float = 0.0
+    waiting: set = field(default_factory=set)
+    dependents: list = field(default_factory=list)
+    started: float = None
+    finished: float = None
+
+
+def _tool_of(task_name):
+    """Scanner a task belongs to ('grype-html' -> 'grype'); per-tool caps apply to the scanner task only."""
+    for suffix in ("-html", "-cache"):
+        if task_name.endswith(suffix):
+            return None
+    return task_name
+
+
+def _rank(jobs):
+    """Priority of each job: its estimate plus the longest chain of estimates that depends on it."""
+    for job in reversed(_topological(jobs)):
+        job.priority = job.estimate + max((dependent.priority for dependent in job.dependents), default=0.0)
+
+
+def _topological(jobs):
+    order = []
+    indegree = {id(job): len(job.waiting) for job in jobs}
+    queue = [job for job in jobs if not job.waiting]
+    while queue:
+        job = queue.pop()
+        order.append(job)
+        for dependent in job.dependents:
+            indegree[id(dependent)] -= 1
+            if indegree[id(dependent)] == 0:
+                queue.append(dependent)
+    return order
+
+
+def simulate_schedule(jobs, max_workers, tool_caps):
+    """
+    Replay the scheduling rule on estimates alone.
+    :param jobs: Iterable of (key, tool, estimate, priority, dependency keys).
+    :return: Dict mapping key to its predicted finish time (seconds from the start).
+    """
+    jobs = {key: (tool, estimate, priority, set(deps)) for key, tool, estimate, priority, deps in jobs}
+    dependents = {key: [] for key in jobs}
+    for key, (_, _, _, deps) in jobs.items():
+        for dep in deps:
+            dependents[dep].append(key)
+    waiting = {key: len(deps) for key, (_, _, _, deps) in jobs.items()}
+    ready = [key for key, count in waiting.items() if count == 0]
+    running, tool_running, finish, now = [], {}, {}, 0.0
+    while ready or running:
+        ready.sort(key=lambda key: -jobs[key][2])
+        for key in list(ready):
+            if len(running) >= max_workers:
+                break
+            tool = jobs[key][0]
+            if tool in tool_caps and tool_running.get(tool, 0) >= tool_caps[tool]:
+                continue
+            ready.remove(key)
+            tool_running[tool] = tool_running.get(tool, 0) + 1
+            heapq.heappush(running, (now + jobs[key][1], key))
+        now, key = heapq.heappop(running)
+        finish[key] = now
+        tool_running[jobs[key][0]] -= 1
+        for dependent in dependents[key]:
+            waiting[dependent] -= 1
+            if waiting[dependent] == 0:
+                ready.append(dependent)
+    return finish
+
+
+class LptScheduler:
+    """
+    Run the task graphs of many repositories on one shared pool of max_workers threads.
+    Whenever a worker is free, the ready task with the longest estimated remaining chain
+    (its own estimate plus everything that waits for it) starts first, so long scans begin
+    early instead of extending the end of the run. tool_caps limits how many runs of a tool
+    happen at once (e.g. one Dependency-Check JVM). Repositories are submitted as they are
+    cloned; completed() yields each one, with its results, once all its tasks finished.
+    """
+
+    def __init__(self, max_workers, tool_caps=None):
+        self.max_workers = max(1, max_workers)
+        self.tool_caps = {tool: max(1, cap) for tool, cap in (tool_caps or {}).items()}
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="scan")
+        self._lock = threading.Lock()
+        self._ready = []
+        self._running = 0
+        self._tool_running = {}
+        self._repos = {}  # id(repo) -> [repo, tasks, results, remaining]
+        self._jobs = []
+        self._completed = []
+        self._closed = False
+        self._changed = threading.Condition(self._lock)
+        self._started = None
+        self._order = itertools.count()
+
+    def submit(self, repo, tasks, estimates):
+        """
+        Queue one repository's tasks.
+        :param repo: Any object identifying the repository; completed() yields it back.
+        :param estimates: Dict mapping task name to its expected duration in seconds.
+        """
+        by_name = {
+            task.name: _Job(repo, task, 0.0 if task.cached else estimates.get(task.name, 1.0), next(self._order))
+            for task in tasks
+        }
+        for job in by_name.values():
+            for dep in job.task.depends_on:
+                if dep not in by_name:
+                    raise ValueError(f"Task '{job.task.name}' depends on unknown task '{dep}'")
+                job.waiting.add(dep)
+                by_name[dep].dependents.append(job)
+        jobs = list(by_name.values())
+        _rank(jobs)
+        results = {}
+        acyclic = {id(job) for job in _topological(jobs)}
+        for job in jobs:
+            if id(job) not in acyclic:
+                results[job.task.name] = ToolResult(job.task.name, "skipped", error="Unresolvable dependency")
+        runnable = [job for job in jobs if id(job) in acyclic]
+        with self._lock:
+            if self._started is None:
+                self._started = time.monotonic()
+            self._repos[id(repo)] = [repo, tasks, results, len(runnable)]
+            self._jobs.extend(runnable)
+            self._ready.extend(job for job in runnable if not job.waiting)
+            if not runnable:
+                self._finish_repo_locked(id(repo))
+            self._dispatch_locked()
+
+    def close(self):
+        """No more repositories will be submitted."""
+        with self._lock:
+            self._closed = True
+            self._changed.notify_all()
+
+    def completed(self):
+        """Yield (repo, results) for each repository as its last task finishes, until closed and drained."""
+        while True:
+            with self._lock:
+                while not self._completed and not (self._closed and not self._repos):
+                    self._changed.wait()
+                if not self._completed:
+                    break
+                item = self._completed.pop(0)
+            yield item
+        self._executor.shutdown()
+
+    def _next_ready_locked(self):
+        best = None
+        for job in self._ready:
+            tool = _tool_of(job.task.name)
+            if tool in self.tool_caps and self._tool_running.get(tool, 0) >= self.tool_caps[tool]:
+                continue
+            if best is None or (job.priority, -job.order) > (best.priority, -best.order):
+                best = job
+        return best
+
+    def _dispatch_locked(self):
+        while self._running < self.max_workers:
+            job = self._next_ready_locked()
+            if job is None:
+                return
+            self._ready.remove(job)
+            self._running += 1
+            tool = _tool_of(job.task.name)
+            self._tool_running[tool] = self._tool_running.get(tool, 0) + 1
+            job.started = time.monotonic()
+            self._executor.submit(self._run, job)
+
+    def _run(self, job):
+        with self._lock:
+            finished = dict(self._repos[id(job.repo)][2])
+        result = _execute(job.task, finished)
+        if result.status == "success":
+            logging.info(f"{job.task.name} finished in {result.duration:.1f}s (estimated {job.estimate:.1f}s)")
+        else:
+            logging.warning(f"{job.task.name} {result.status} after {result.duration:.1f}s: {result.error}")
+        with self._lock:
+            job.finished = time.monotonic()
+            self._running -= 1
+            self._tool_running[_tool_of(job.task.name)] -= 1
+            state = self._repos[id(job.repo)]
+            state[2][job.task.name] = result
+            state[3] -= 1
+            for dependent in job.dependents:
+                dependent.waiting.discard(job.task.name)
+                if not dependent.waiting:
+                    self._ready.append(dependent)
+            if state[3] == 0:
+                self._finish_repo_locked(id(job.repo))
+            self._dispatch_locked()
+
+    def _finish_repo_locked(self, key):
+        repo, tasks, results, _ = self._repos.pop(key)
+        self._completed.append((repo, {task.name: results[task.name] for task in tasks}))
+        self._changed.notify_all()
+
+    def report(self, label=lambda repo: str(repo)):
+        """
+        Predicted against actual completion: the run replayed on the estimates with the same
+        workers and caps, next to what happened, per repository and for the whole schedule.
+        :param label: Turns a submitted repo object into a name for the report.
+        """
+        with self._lock:
+            jobs = [job for job in self._jobs if job.finished is not None]
+        if not jobs:
+            return None
+        keys = {id(job): f"{label(job.repo)}:{job.task.name}" for job in jobs}
+        by_repo_task = {(id(job.repo), job.task.name): job for job in jobs}
+        predicted = simulate_schedule(
+            ((keys[id(job)], _tool_of(job.task.name), job.estimate, job.priority,
+              [keys[id(by_repo_task[(id(job.repo), dep)])] for dep in job.task.depends_on if (id(job.repo), dep) in by_repo_task])
+             for job in jobs),
+            self.max_workers, self.tool_caps,
+        )
+        repos = {}
+        for job in jobs:
+            entry = repos.setdefault(label(job.repo), {"predicted_finish": 0.0, "actual_finish": 0.0})
+            entry["predicted_finish"] = round(max(entry["predicted_finish"], predicted[keys[id(job)]]), 2)
+            entry["actual_finish"] = round(max(entry["actual_finish"], job.finished - self._started), 2)
+        misses = sorted(jobs, key=lambda job: -abs((job.finished - job.started) - job.estimate))[:10]
+        report = {
+            "workers": self.max_workers,
+            "tool_caps": self.tool_caps,
+            "predicted_seconds": round(max(predicted.values()), 2),
+            "actual_seconds": round(max(job.finished for job in jobs) - self._started, 2),
+            "repositories": repos,
+            "largest_estimate_errors": [
+                {"task": keys[id(job)], "estimate": round(job.estimate, 2), "actual": round(job.finished - job.started, 2)}
+                for job in misses
+            ],
+        }
+        logging.info(
+            f"Scan schedule: predicted {report['predicted_seconds']:.0f}s, actual {report['actual_seconds']:.0f}s "
+            f"on {self.max_workers} workers"
+        )
+        return report
@@ -0,0 +1,131 @@
+"""
+Timeline tracing of a scan run.
+
+span() records a nested, timed span (clone, scanner, render, summary, upload, ...) with repo
+and tool attributes. The spans of a run are written as a Chrome trace event file that opens in
+Perfetto (https://ui.perfetto.dev) or chrome://tracing. With profiling on, each thread's Python
+work inside its outermost span is also profiled with cProfile and dumped as one pstats file.
+When tracing is off span() returns a shared no-op context manager.
+"""
+import cProfile
+import json
+import logging
+import os
+import pstats
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+_NULL_SPAN = nullcontext()
+_tracer = None
+
+
+class Tracer:
+    def __init__(self, profile=False):
+        self.profile = profile
+        self.origin = time.perf_counter_ns()
+        self.pid = os.getpid()
+        self.events = []
+        self.profilers = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._threads = {}
+
+    def _thread_state(self):
+        state = self._local
+        if not hasattr(state, "depth"):
+            state.depth = 0
+            state.profiler = None
+            thread = threading.current_thread()
+            with self._lock:
+                self._threads[thread.ident] = thread.name
+        return state
+
+    def _start_profiler(self, state):
+        if state.profiler is None:
+            state.profiler = cProfile.Profile()
+            with self._lock:
+                self.profilers.append(state.profiler)
+        try:
+            state.profiler.enable()
+        except ValueError as e:
+            # Another profiler already owns this thread; leave it alone
+            logging.debug(f"Could not profile thread {threading.current_thread().name}: {e}")
+            state.profiler = None
+
+    @contextmanager
+    def span(self, name, category, attributes):
+        state = self._thread_state()
+        if self.profile and state.depth == 0:
+            self._start_profiler(state)
+        state.depth += 1
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            end = time.perf_counter_ns()
+            state.depth -= 1
+            if state.depth == 0 and state.profiler is not None:
+                state.profiler.disable()
+            event = {
+                "name": name,
+                "cat": category,
+                "ph": "X",
+                "ts": (start - self.origin) / 1000,
+                "dur": (end - start) / 1000,
+                "pid": self.pid,
+                "tid": threading.get_ident(),
+                "args": {key: value for key, value in attributes.items() if value is not None},
+            }
+            with self._lock:
+                self.events.append(event)
+
+    def write(self, trace_path, profile_path=None):
+        with self._lock:
+            events = list(self.events)
+            threads = dict(self._threads)
+        events += [
+            {"name": "thread_name", "ph": "M", "pid": self.pid, "tid": ident, "args": {"name": name}}
+            for ident, name in threads.items()
+        ]
+        os.makedirs(os.path.dirname(trace_path) or ".", exist_ok=True)
+        tmp_path = f"{trace_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+        os.replace(tmp_path, trace_path)
+        logging.info(f"Trace with {len(self.events)} spans written to {trace_path} (open it in https://ui.perfetto.dev)")
+        if profile_path and self.profilers:
+            stats = pstats.Stats(self.profilers[0])
+            for profiler in self.profilers[1:]:
+                stats.add(profiler)
+            stats.dump_stats(profile_path)
+            logging.info(f"Python profile written to {profile_path} (python -m pstats {profile_path})")
+            return stats
+        return None
+
+
+def start_tracing(profile=False):
+    """Turn tracing on for this process; with profile=True also profile the Python work in each span."""
+    global _tracer
+    _tracer = Tracer(profile=profile)
+    return _tracer
+
+
+def stop_tracing(trace_path, profile_path=None):
+    """Write the trace (and profile) and turn tracing off. Returns the pstats.Stats, or None."""
+    global _tracer
+    tracer, _tracer = _tracer, None
+    if tracer is None:
+        return None
+    return tracer.write(trace_path, profile_path if tracer.profile else None)
+
+
+def span(name, category="scan", **attributes):
+    """
+    Time a block as one span of the run's trace, e.g.
+        with span("gitleaks", "tool", repo=repo_name):
+    :param attributes: Shown with the span in the trace viewer (None values are left out).
+    """
+    if _tracer is None:
+        return _NULL_SPAN
+    return _tracer.span(name, category, attributes)
@@ -0,0 +1,222 @@
+import json
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class RepoWatcher:
+    """
+    Keep scanning the configured repositories as their branches move.
+    Each branch head is read with get_head(path, branch) every poll_interval seconds, spread by
+    +/- jitter so the checks do not bunch up, and a scan is queued only when the head differs from
+    the last scanned commit. At most max_concurrent scans run at once and a repository is never
+    queued twice. A failing check or scan is retried after an exponential backoff capped at backoff_max.
+    The queue and every repository's state are written to status_path (and served as JSON on
+    status_port when set); the last scanned commits are read back from that file on start.
+    """
+
+    def __init__(self, repos, get_head, scan, poll_interval=300, jitter=0.2, max_concurrent=1, check_workers=4,
+                 backoff_base=60, backoff_max=3600, status_path=".scan_state/watch.json", status_port=None,
+                 status_host="127.0.0.1"):
+        """
+        :param repos: List of repository settings, each with its path and branch resolved.
+        :param get_head: Function (path, branch) -> commit SHA, or None when the head cannot be read.
+        :param scan: Function (repo, head) -> the commit that was scanned; raises when the scan fails.
+        """
+        self.get_head = get_head
+        self.scan = scan
+        self.poll_interval = poll_interval
+        self.jitter = jitter
+        self.max_concurrent = max(1, max_concurrent)
+        self.check_workers = max(1, check_workers)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.status_path = status_path
+        self.status_port = status_port
+        self.status_host = status_host
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._queue = []
+        self._running = set()
+        self._checking = set()
+        self._repos = {}
+        self.started = time.time()
+        previous = self._load_status()
+        for repo in repos:
+            key = f"{repo['path']}@{repo['branch']}"
+            self._repos[key] = {
+                "repo": repo,
+                "path": repo["path"],
+                "branch": repo["branch"],
+                "status": "idle",
+                "scanned_commit": previous.get(key, {}).get("scanned_commit"),
+                "remote_commit": None,
+                "last_check": None,
+                "next_check": self.started,
+                "last_scan_finished": previous.get(key, {}).get("last_scan_finished"),
+                "last_scan_seconds": previous.get(key, {}).get("last_scan_seconds"),
+                "scans": 0,
+                "failures": 0,
+                "last_error": None,
+            }
+
+    def _load_status(self):
+        try:
+            with open(self.status_path) as f:
+                return {repo["key"]: repo for repo in json.load(f).get("repositories", [])}
+        except FileNotFoundError:
+            return {}
+        except (ValueError, KeyError, TypeError) as e:
+            logging.warning(f"Ignoring unreadable watch status {self.status_path}: {e}")
+            return {}
+
+    def _spread(self, seconds):
+        return seconds * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def status(self):
+        """Snapshot of the queue and of every repository's state."""
+        with self._lock:
+            return {
+                "started": self.started,
+                "updated": time.time(),
+                "poll_interval": self.poll_interval,
+                "max_concurrent": self.max_concurrent,
+                "running": sorted(self._running),
+                "queue": list(self._queue),
+                "repositories": [
+                    dict({key: value for key, value in state.items() if key != "repo"}, key=key)
+                    for key, state in self._repos.items()
+                ],
+            }
+
+    def _write_status(self):
+        os.makedirs(os.path.dirname(self.status_path) or ".", exist_ok=True)
+        tmp_path = f"{self.status_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.status(), f, indent=4)
+        os.replace(tmp_path, self.status_path)
+
+    def _failed_locked(self, state, error):
+        state["failures"] += 1
+        state["last_error"] = error
+        delay = self._spread(min(self.backoff_max, self.backoff_base * 2 ** (state["failures"] - 1)))
+        state["status"] = "backoff"
+        state["next_check"] = time.time() + delay
+        logging.warning(
+            f"{state['path']} ({state['branch']}): {error}; retrying in {delay:.0f}s (failure {state['failures']})"
+        )
+
+    def _check(self, key):
+        state = self._repos[key]
+        head = self.get_head(state["path"], state["branch"])
+        with self._lock:
+            self._checking.discard(key)
+            state["last_check"] = time.time()
+            if head is None:
+                self._failed_locked(state, "Could not read the branch head")
+            elif head != state["scanned_commit"]:
+                state["remote_commit"] = head
+                state["status"] = "queued"
+                self._queue.append(key)
+                logging.info(f"{state['path']} ({state['branch']}) moved to {head[:12]}, scan queued")
+            else:
+                state["remote_commit"] = head
+                state["status"] = "idle"
+                state["next_check"] = time.time() + self._spread(self.poll_interval)
+        self._wake.set()
+
+    def _scan(self, key):
+        state = self._repos[key]
+        start = time.time()
+        try:
+            commit = self.scan(state["repo"], state["remote_commit"])
+            error = None
+        except Exception as e:
+            logging.exception(f"Watch scan of {state['path']} failed")
+            commit, error = None, f"Scan failed: {e}"
+        with self._lock:
+            self._running.discard(key)
+            state["last_scan_seconds"] = round(time.time() - start, 1)
+            if error:
+                self._failed_locked(state, error)
+            else:
+                state["scanned_commit"] = commit or state["remote_commit"]
+                state["last_scan_finished"] = time.time()
+                state["scans"] += 1
+                state["failures"] = 0
+                state["last_error"] = None
+                state["status"] = "idle"
+                # Check again after a full interval; a push during the scan is picked up then
+                state["next_check"] = time.time() + self._spread(self.poll_interval)
+        self._wake.set()
+
+    def _serve_status(self):
+        watcher = self
+
+        class StatusHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path not in ("/", "/status"):
+                    self.send_error(404)
+                    return
+                body = json.dumps(watcher.status(), indent=4).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logging.debug(f"Watch status request: {format % args}")
+
+        server = ThreadingHTTPServer((self.status_host, self.status_port), StatusHandler)
+        threading.Thread(target=server.serve_forever, name="watch-status", daemon=True).start()
+        logging.info(f"Watch status served on http://{self.status_host}:{server.server_port}/status")
+        return server
+
+    def stop(self):
+        """End run() once the running scans finish; safe to call from a signal handler."""
+        self._stop.set()
+        self._wake.set()
+
+    def run(self):
+        """Check and scan until stop() is called, then let running scans finish."""
+        server = self._serve_status() if self.status_port is not None else None
+        checker = ThreadPoolExecutor(max_workers=self.check_workers, thread_name_prefix="watch-check")
+        scanner = ThreadPoolExecutor(max_workers=self.max_concurrent, thread_name_prefix="watch-scan")
+        logging.info(f"Watching {len(self._repos)} repositories every {self.poll_interval}s")
+        try:
+            while not self._stop.is_set():
+                self._wake.clear()
+                now = time.time()
+                with self._lock:
+                    for key, state in self._repos.items():
+                        if state["status"] in ("idle", "backoff") and state["next_check"] <= now and key not in self._checking:
+                            self._checking.add(key)
+                            state["status"] = "checking"
+                            checker.submit(self._check, key)
+                    while self._queue and len(self._running) < self.max_concurrent:
+                        key = self._queue.pop(0)
+                        self._running.add(key)
+                        self._repos[key]["status"] = "scanning"
+                        scanner.submit(self._scan, key)
+                    waiting = [state["next_check"] for state in self._repos.values() if state["status"] in ("idle", "backoff")]
+                self._write_status()
+                # Sleep until the next check is due, a check or scan finished, or stop was requested
+                timeout = min(waiting, default=now + 60) - now
+                self._wake.wait(max(0.1, min(timeout, 60)))
+        finally:
+            logging.info(f"Stopping watch mode; waiting for {len(self._running)} running scans")
+            checker.shutdown(wait=True)
+            with self._lock:
+                for key in self._queue:
+                    self._repos[key]["status"] = "idle"
+                self._queue.clear()
+            scanner.shutdown(wait=True)
+            self._write_status()
+            if server is not None:
+                server.shutdown()
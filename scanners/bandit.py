@@ -1,14 +1,98 @@
+import json
 import logging
-from modules.subprocess_utils import run_subprocess
+import os
+from modules.subprocess_utils import run_streaming
+from modules.incremental import repo_relative, write_json_report
 
-def run_bandit(target_path, report_path):
+APPLIES_TO = ("python",)  # Bandit only parses Python source
+EXIT_CODES = (0, 1)  # 1: issues found
+
+def run_bandit(target_path, report_path, exclusions=None):
     logging.info(f"Running Bandit on {target_path}")
     try:
         command = [
             "bandit", "-r", target_path, "-f", "json", "-o", report_path
         ]
-        result = run_subprocess(command)
+        if exclusions:
+            # -x takes comma-separated fnmatch globs, matched against paths below target_path
+            command += ["-x", ",".join(exclusions.globs(f"{target_path.rstrip('/')}/", "*/"))]
+        result = run_streaming(command)
         if result is None:
             logging.error("Bandit scan failed due to a subprocess error.")
+        return result
     except Exception as e:
         logging.exception("Bandit scan failed")
+
+def merge_bandit_reports(new_report, previous_report, target_path, stale_paths, previous_roots=()):
+    """
+    Combine findings for changed files with the previous findings for every unchanged file.
+    Carried findings are moved under target_path, as a full scan of it would report them.
+    :param previous_roots: Checkout paths the previous report was written under.
+    """
+    def current(name):
+        return os.path.join(target_path, repo_relative(name, target_path, previous_roots))
+
+    merged = dict(new_report)
+    carried = [
+        dict(r, filename=current(r.get("filename", ""))) for r in previous_report.get("results", [])
+        if repo_relative(r.get("filename", ""), target_path, previous_roots) not in stale_paths
+    ]
+    merged["results"] = carried + new_report.get("results", [])
+    metrics = {
+        current(name): values for name, values in previous_report.get("metrics", {}).items()
+        if name != "_totals" and repo_relative(name, target_path, previous_roots) not in stale_paths
+    }
+    metrics.update({name: values for name, values in new_report.get("metrics", {}).items() if name != "_totals"})
+    totals = {}
+    for values in metrics.values():
+        for key, value in values.items():
+            if isinstance(value, (int, float)):
+                totals[key] = totals.get(key, 0) + value
+    metrics["_totals"] = totals
+    merged["metrics"] = metrics
+    return merged
+
+def run_bandit_incremental(target_path, report_path, changes, exclusions=None):
+    """
+    Run Bandit on the changed Python files only and carry forward findings for the rest.
+    The change set is already filtered; exclusions apply to the full scan run without a previous report.
+    """
+    previous_path = changes.previous_report("bandit")
+    if previous_path is None:
+        return run_bandit(target_path, report_path, exclusions)
+    changed_files = changes.changed_with_suffix((".py",))
+    logging.info(f"Running Bandit incrementally on {len(changed_files)} changed files in {target_path}")
+    try:
+        with open(previous_path) as f:
+            previous_report = json.load(f)
+        new_report = {"results": [], "metrics": {}, "errors": []}
+        result = None
+        if changed_files:
+            command = [
+                "bandit", "-f", "json", "-o", report_path
+            ] + [os.path.join(target_path, path) for path in changed_files]
+            result = run_streaming(command)
+            if result is None or not os.path.exists(report_path):
+                logging.error("Bandit scan failed due to a subprocess error.")
+                return
+            with open(report_path) as f:
+                new_report = json.load(f)
+        write_json_report(merge_bandit_reports(
+            new_report, previous_report, target_path, changes.stale, changes.previous_roots
+        ), report_path)
+        return result
+    except Exception as e:
+        logging.exception("Bandit incremental scan failed")
+
+def normalize_bandit_report(report_path):
+    """Map a Bandit report to common finding records."""
+    with open(report_path) as f:
+        report = json.load(f)
+    for result in report.get("results", []):
+        yield {
+            "rule_id": result.get("test_id"),
+            "severity": result.get("issue_severity"),
+            "file": result.get("filename"),
+            "line": result.get("line_number"),
+            "message": result.get("issue_text"),
+        }
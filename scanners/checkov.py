@@ -1,8 +1,16 @@
+import json
 import logging
 import os
-from modules.subprocess_utils import run_subprocess
+from modules.subprocess_utils import run_streaming
+from modules.incremental import repo_relative, write_json_report
 
-def run_checkov(target_path, report_path):
+CHECK_LISTS = ("passed_checks", "failed_checks", "skipped_checks")
+RESULTS_FILE = "results_json.json"
+# Terraform, CloudFormation, Kubernetes, Helm, ARM/Bicep, CI pipelines and Dockerfiles
+APPLIES_TO = ("iac", "dockerfile")
+EXIT_CODES = (0, 1)  # 1: failed checks
+
+def run_checkov(target_path, report_path, exclusions=None):
     logging.info(f"Running Checkov on {target_path}")
     try:
         # Ensure the directory for the report path exists
@@ -11,8 +19,109 @@ def run_checkov(target_path, report_path):
         command = [
             "checkov", "-d", target_path, "--output", "json", "--output-file-path", report_path
         ]
-        result = run_subprocess(command)
+        for regex in exclusions.regexes(target_path) if exclusions else []:
+            command += ["--skip-path", regex]
+        result = run_streaming(command)
         if result is None:
             logging.error("Checkov scan failed due to a subprocess error.")
+        return result
     except Exception as e:
         logging.exception("Checkov scan failed")
+
+def _load_check_types(path):
+    """Load a checkov JSON report as a list of per-framework results (checkov writes a dict for a single framework)."""
+    with open(path) as f:
+        content = json.load(f)
+    if isinstance(content, dict):
+        content = [content]
+    return [entry for entry in content if isinstance(entry, dict) and "check_type" in entry]
+
+def merge_checkov_reports(new_check_types, previous_check_types, target_path, stale_paths, previous_roots=()):
+    """
+    Combine checks for changed files with the previous checks for every unchanged file, per framework.
+    :param previous_roots: Checkout paths the previous report was written under.
+    """
+    merged = {}
+    for entry in previous_check_types:
+        results = entry.get("results", {})
+        kept = dict(entry, results=dict(results))
+        for key in CHECK_LISTS:
+            kept["results"][key] = []
+            for check in results.get(key, []):
+                relative = repo_relative(check.get("file_path", ""), target_path, previous_roots)
+                if relative not in stale_paths:
+                    kept["results"][key].append(dict(check, file_path="/" + relative))
+        merged[entry["check_type"]] = kept
+    for entry in new_check_types:
+        results = entry.get("results", {})
+        for key in CHECK_LISTS:
+            # Report paths the same way a full directory scan does ("/<repo-relative path>")
+            for check in results.get(key, []):
+                check["file_path"] = "/" + repo_relative(check.get("file_path", ""), target_path)
+        if entry["check_type"] not in merged:
+            merged[entry["check_type"]] = entry
+            continue
+        target = merged[entry["check_type"]]
+        for key in CHECK_LISTS + ("parsing_errors",):
+            target["results"][key] = target["results"].get(key, []) + results.get(key, [])
+    for entry in merged.values():
+        results = entry["results"]
+        summary = dict(entry.get("summary", {}))
+        summary["passed"] = len(results.get("passed_checks", []))
+        summary["failed"] = len(results.get("failed_checks", []))
+        summary["skipped"] = len(results.get("skipped_checks", []))
+        summary["parsing_errors"] = len(results.get("parsing_errors", []))
+        entry["summary"] = summary
+    return list(merged.values())
+
+def run_checkov_incremental(target_path, report_path, changes, exclusions=None):
+    """
+    Run Checkov on the changed IaC files only and carry forward checks for the rest.
+    The change set is already filtered; exclusions apply to the full scan run without a previous report.
+    """
+    previous_path = changes.previous_report("checkov")
+    previous_file = os.path.join(previous_path, RESULTS_FILE) if previous_path else None
+    if not previous_file or not os.path.isfile(previous_file):
+        return run_checkov(target_path, report_path, exclusions)
+    changed_files = changes.changed_iac()
+    logging.info(f"Running Checkov incrementally on {len(changed_files)} changed IaC files in {target_path}")
+    try:
+        previous_check_types = _load_check_types(previous_file)
+        new_check_types = []
+        os.makedirs(report_path, exist_ok=True)
+        results_file = os.path.join(report_path, RESULTS_FILE)
+        result = None
+        if changed_files:
+            command = ["checkov", "--output", "json", "--output-file-path", report_path]
+            for path in changed_files:
+                command += ["-f", os.path.join(target_path, path)]
+            result = run_streaming(command)
+            if result is None:
+                logging.error("Checkov scan failed due to a subprocess error.")
+                return
+            if os.path.isfile(results_file):
+                new_check_types = _load_check_types(results_file)
+        merged = merge_checkov_reports(
+            new_check_types, previous_check_types, target_path, changes.stale, changes.previous_roots
+        )
+        write_json_report(merged, results_file)
+        return result
+    except Exception as e:
+        logging.exception("Checkov incremental scan failed")
+
+def normalize_checkov_report(report_path):
+    """Map every per-framework Checkov result file under report_path to common finding records (failed checks only)."""
+    for root, dirs, files in os.walk(report_path):
+        for file in sorted(files):
+            if not file.endswith(".json"):
+                continue
+            for entry in _load_check_types(os.path.join(root, file)):
+                for check in entry.get("results", {}).get("failed_checks", []):
+                    line_range = check.get("file_line_range") or [None]
+                    yield {
+                        "rule_id": check.get("check_id"),
+                        "severity": check.get("severity"),
+                        "file": check.get("file_path"),
+                        "line": line_range[0],
+                        "message": f"{check.get('check_name')} ({check.get('resource')})",
+                    }
@@ -1,8 +1,22 @@
+import json
 import logging
 import os
-from modules.subprocess_utils import run_subprocess
+import tempfile
+from modules.subprocess_utils import run_streaming
+from modules.dependency_db import wait_for_database
 
-def run_dependency_check(target_path, report_path):
+# Its analyzers read package manifests, lockfiles and packaged jars/assemblies
+APPLIES_TO = ("manifest", "lockfile", "archive")
+EXIT_CODES = (0,)
+
+def exclude_patterns(target_path, exclusions):
+    """--exclude takes Ant-style patterns matched against full paths, so rooted rules name the checkout."""
+    if not exclusions:
+        return []
+    root = os.path.normpath(target_path).lstrip("/")
+    return exclusions.globs(f"**/{root}/", "**/")
+
+def run_dependency_check(target_path, report_path, exclusions=None):
     logging.info(f"Running OWASP Dependency-Check on {target_path}")
     try:
         # Ensure the directory for the report path exists
@@ -11,8 +25,104 @@ def run_dependency_check(target_path, report_path):
         command = [
             "dependency-check", "--scan", target_path, "--format", "JSON", "--out", report_path
         ]
-        result = run_subprocess(command, timeout=600)  # Timeout set to 10 minutes
+        for pattern in exclude_patterns(target_path, exclusions):
+            command += ["--exclude", pattern]
+        if wait_for_database():
+            # The database lifecycle is managed by this run; never update it again per scan
+            command.append("--noupdate")
+        result = run_streaming(command)
         if result is None:
             logging.error("Dependency-Check scan failed due to a subprocess error.")
+        return result
     except Exception as e:
         logging.exception("Dependency-Check scan failed")
+
+def _owner(file_path, roots):
+    """Return the scanned root a dependency's file belongs to."""
+    path = os.path.abspath(file_path)
+    for root in roots:
+        if path == root or path.startswith(root + os.sep):
+            return root
+    return None
+
+def split_batch_report(combined, targets):
+    """
+    Split a combined Dependency-Check report into one report per scanned repository.
+    :param combined: Parsed combined report.
+    :param targets: List of (target_path, report_path) tuples.
+    :return: Dict mapping report_path to its per-repository report.
+    """
+    # Longest roots first so nested checkouts are matched to the most specific repository
+    roots = sorted({os.path.abspath(target): report for target, report in targets}.items(), key=lambda r: -len(r[0]))
+    root_paths = [root for root, _ in roots]
+    per_root = {root: [] for root in root_paths}
+    unassigned = 0
+    for dependency in combined.get("dependencies", []):
+        owner = _owner(dependency.get("filePath", ""), root_paths)
+        if owner is None:
+            unassigned += 1
+            continue
+        per_root[owner].append(dependency)
+    if unassigned:
+        logging.warning(f"{unassigned} dependencies in the batch report did not belong to any scanned repository")
+    reports = {}
+    for root, report_path in roots:
+        report = {key: value for key, value in combined.items() if key != "dependencies"}
+        report["projectInfo"] = dict(combined.get("projectInfo", {}), name=os.path.basename(root))
+        report["dependencies"] = per_root[root]
+        reports[report_path] = report
+    return reports
+
+def run_dependency_check_batch(targets, timeout=3600, exclusions=None):
+    """
+    Scan several repositories in a single Dependency-Check invocation, so the JVM starts and
+    loads the vulnerability database once, then write one report per repository.
+    :param targets: List of (target_path, report_path) tuples.
+    :param exclusions: Dict mapping a target_path to its PathExclusions.
+    :return: StreamResult of the batch run, or None on failure.
+    """
+    if not targets:
+        return None
+    logging.info(f"Running OWASP Dependency-Check on {len(targets)} repositories in one batch")
+    try:
+        with tempfile.TemporaryDirectory(prefix="dependency-check-") as out_dir:
+            combined_path = os.path.join(out_dir, "dependency-check-report.json")
+            command = ["dependency-check", "--project", "security-scan-batch", "--format", "JSON", "--out", combined_path]
+            for target_path, _ in targets:
+                command += ["--scan", target_path]
+            # Rooted rules name their checkout, so one pattern list serves every repository in the batch
+            patterns = dict.fromkeys(
+                pattern for target_path, _ in targets
+                for pattern in exclude_patterns(target_path, (exclusions or {}).get(target_path))
+            )
+            for pattern in patterns:
+                command += ["--exclude", pattern]
+            if wait_for_database():
+                command.append("--noupdate")
+            result = run_streaming(command, timeout=timeout)
+            if result is None or not os.path.isfile(combined_path):
+                logging.error("Dependency-Check batch scan failed due to a subprocess error.")
+                return None
+            with open(combined_path) as f:
+                combined = json.load(f)
+        for report_path, report in split_batch_report(combined, targets).items():
+            os.makedirs(os.path.dirname(report_path), exist_ok=True)
+            with open(report_path, "w") as f:
+                json.dump(report, f, indent=4)
+        return result
+    except Exception as e:
+        logging.exception("Dependency-Check batch scan failed")
+
+def normalize_dependency_check_report(report_path):
+    """Map a Dependency-Check report to common finding records, one per vulnerable dependency and CVE."""
+    with open(report_path) as f:
+        report = json.load(f)
+    for dependency in report.get("dependencies", []):
+        for vulnerability in dependency.get("vulnerabilities") or []:
+            yield {
+                "rule_id": vulnerability.get("name"),
+                "severity": vulnerability.get("severity"),
+                "file": dependency.get("filePath"),
+                "line": None,
+                "message": dependency.get("fileName"),
+            }
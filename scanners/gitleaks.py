@@ -1,10 +1,42 @@
+import json
 import logging
+import os
 import shutil
-from modules.subprocess_utils import run_subprocess
+import tempfile
+from modules.subprocess_utils import run_streaming
+from modules.incremental import write_json_report
 
-def run_gitleaks(target_repo, report_path):
+APPLIES_TO = None  # Secrets can be in any file or commit
+EXIT_CODES = (0, 1)  # 1: leaks found
+
+def write_exclusion_config(target_repo, exclusions):
+    """
+    Gitleaks has no path flag, so exclusions become the allowlist of a config that extends the
+    repository's own .gitleaks.toml (or the default rules when there is none).
+    :return: Path of the temporary config; the caller removes it.
+    """
+    repo_config = os.path.join(target_repo, ".gitleaks.toml")
+    extend = f"path = {json.dumps(os.path.abspath(repo_config))}" if os.path.isfile(repo_config) else "useDefault = true"
+    # Gitleaks matches allowlist paths against repo-relative file paths
+    paths = ",\n".join(f"    '''{regex}'''" for regex in exclusions.regexes())
+    fd, config_path = tempfile.mkstemp(prefix="gitleaks-", suffix=".toml")
+    with os.fdopen(fd, "w") as f:
+        f.write(f"[extend]\n{extend}\n\n[allowlist]\ndescription = \"exclude_paths\"\npaths = [\n{paths}\n]\n")
+    return config_path
+
+def _run(command, target_repo, exclusions):
+    config_path = write_exclusion_config(target_repo, exclusions) if exclusions else None
+    try:
+        if config_path:
+            command = command + ["--config", config_path]
+        return run_streaming(command)
+    finally:
+        if config_path:
+            os.remove(config_path)
+
+def run_gitleaks(target_repo, report_path, exclusions=None):
     logging.info(f"Running Gitleaks on {target_repo}")
-    
+
     if not shutil.which("gitleaks"):
         logging.error("Gitleaks is not installed. Please install it and try again.")
         return
@@ -13,8 +45,61 @@ def run_gitleaks(target_repo, report_path):
         command = [
             "gitleaks", "detect", "--source", target_repo, "--report-format", "json", "--report-path", report_path
         ]
-        result = run_subprocess(command)
+        result = _run(command, target_repo, exclusions)
         if result is None:
             logging.error("Gitleaks scan failed due to a subprocess error.")
+        return result
     except Exception as e:
         logging.exception("Gitleaks scan failed")
+
+def run_gitleaks_incremental(target_repo, report_path, changes, exclusions=None):
+    """
+    Scan only the commits added since the last scan. Leaks found earlier stay in the
+    history, so every previous finding is carried forward.
+    """
+    previous_path = changes.previous_report("gitleaks")
+    if previous_path is None:
+        return run_gitleaks(target_repo, report_path, exclusions)
+    if not shutil.which("gitleaks"):
+        logging.error("Gitleaks is not installed. Please install it and try again.")
+        return
+    log_range = f"{changes.base_commit}..{changes.head_commit}"
+    logging.info(f"Running Gitleaks on {target_repo} for commits {log_range}")
+    try:
+        with open(previous_path) as f:
+            previous_findings = json.load(f)
+        command = [
+            "gitleaks", "detect", "--source", target_repo, "--log-opts", log_range,
+            "--report-format", "json", "--report-path", report_path
+        ]
+        result = _run(command, target_repo, exclusions)
+        if result is None or not os.path.exists(report_path):
+            logging.error("Gitleaks scan failed due to a subprocess error.")
+            return
+        with open(report_path) as f:
+            new_findings = json.load(f)
+        seen = set()
+        merged = []
+        for finding in (previous_findings or []) + (new_findings or []):
+            fingerprint = finding.get("Fingerprint") or json.dumps(finding, sort_keys=True)
+            if fingerprint not in seen:
+                seen.add(fingerprint)
+                merged.append(finding)
+        write_json_report(merged, report_path)
+        return result
+    except Exception as e:
+        logging.exception("Gitleaks incremental scan failed")
+
+def normalize_gitleaks_report(report_path):
+    """Map a Gitleaks report to common finding records. Every leaked secret is treated as high severity."""
+    with open(report_path) as f:
+        findings = json.load(f)
+    for finding in findings or []:
+        yield {
+            "rule_id": finding.get("RuleID"),
+            "severity": "high",
+            "file": finding.get("File"),
+            "line": finding.get("StartLine"),
+            "message": finding.get("Description"),
+            "fingerprint": finding.get("Fingerprint"),
+        }
@@ -1,17 +1,77 @@
+import json
 import logging
-from modules.subprocess_utils import run_subprocess
+import os
+from modules.subprocess_utils import run_streaming
 
-def run_grype(target_path, report_path):
-    logging.info(f"Running Grype on {target_path}")
+# Syft JSON starts with its "artifacts" list; reading this much is enough to recognise it
+SBOM_HEAD_BYTES = 4096
+# Matches the packages Syft catalogues, so it applies wherever Syft does
+APPLIES_TO = ("manifest", "lockfile", "archive")
+EXIT_CODES = (0,)
+
+def is_valid_sbom(sbom_path):
+    """Cheaply check that a Syft JSON SBOM exists and looks complete, without parsing the whole file."""
+    if not sbom_path or not os.path.isfile(sbom_path) or os.path.getsize(sbom_path) == 0:
+        return False
+    with open(sbom_path, "rb") as f:
+        head = f.read(SBOM_HEAD_BYTES)
+        f.seek(-1, os.SEEK_END)
+        while True:
+            tail = f.read(1)
+            if not tail.isspace() or f.tell() <= 1:
+                break
+            f.seek(-2, os.SEEK_CUR)
+    return head.lstrip().startswith(b"{") and b'"artifacts"' in head and tail == b"}"
+
+def _grype(source, report_path, exclusions=None):
+    command = ["grype", source, "-o", "json"]
+    # Same glob syntax as Syft; an SBOM was already catalogued without the excluded paths
+    for glob in exclusions.globs("./", "**/") if exclusions else []:
+        command += ["--exclude", glob]
+    result = run_streaming(command, report_path)
+    if result is None or result.returncode != 0 or result.bytes_written == 0:
+        if os.path.exists(report_path):
+            os.remove(report_path)
+        return result, False
+    return result, True
+
+def run_grype(target_path, report_path, sbom_path=None, exclusions=None):
+    """
+    Match vulnerabilities with Grype. When Syft already catalogued the repository, Grype reads
+    that SBOM instead of walking the directory again, falling back to a directory scan if the
+    SBOM is missing, invalid or rejected.
+    """
     try:
-        command = [
-            "grype", target_path, "-o", "json"
-        ]
-        result = run_subprocess(command)
-        if result and result.stdout:
-            with open(report_path, "w") as f:
-                f.write(result.stdout)
-        else:
+        if is_valid_sbom(sbom_path):
+            logging.info(f"Running Grype on SBOM {sbom_path}")
+            result, ok = _grype(f"sbom:{sbom_path}", report_path)
+            if ok:
+                return result
+            logging.warning(f"Grype could not use SBOM {sbom_path}, scanning {target_path} directly")
+        elif sbom_path:
+            logging.warning(f"SBOM {sbom_path} is missing or invalid, scanning {target_path} directly")
+        logging.info(f"Running Grype on {target_path}")
+        result, ok = _grype(target_path, report_path, exclusions)
+        if not ok:
             logging.error("Grype scan failed due to a subprocess error or empty output.")
+        return result
     except Exception as e:
         logging.exception("Grype scan failed")
+
+def normalize_grype_report(report_path):
+    """Map a Grype report to common finding records, one per vulnerability and affected package location."""
+    with open(report_path) as f:
+        report = json.load(f)
+    for match in report.get("matches", []):
+        vulnerability = match.get("vulnerability", {})
+        artifact = match.get("artifact", {})
+        locations = artifact.get("locations") or [{}]
+        package = f"{artifact.get('name')} {artifact.get('version')}"
+        yield {
+            "rule_id": vulnerability.get("id"),
+            "severity": vulnerability.get("severity"),
+            "file": locations[0].get("path"),
+            "line": None,
+            "message": package,
+            "fingerprint": "|".join(str(part) for part in (vulnerability.get("id"), package, locations[0].get("path"))),
+        }
@@ -1,7 +1,12 @@
 import json
 import logging
 import os
-from modules.subprocess_utils import run_subprocess
+import shutil
+from modules.subprocess_utils import run_streaming
+from modules.incremental import repo_relative
+
+APPLIES_TO = ("dockerfile",)
+EXIT_CODES = (0, 1)  # 1: rule violations found
 
 def run_hadolint(dockerfile_path, report_path):
     logging.info(f"Running Hadolint on {dockerfile_path}")
@@ -20,19 +25,48 @@ def run_hadolint(dockerfile_path, report_path):
         command = [
             "hadolint", dockerfile_path, "-f", "json"
         ]
-        result = run_subprocess(command)
-        if result and result.stdout:
+        result = run_streaming(command, report_path)
+        if result and result.bytes_written:
             try:
-                output = json.loads(result.stdout)
+                # Hadolint output is small; reformat it like the other reports
+                with open(report_path) as f:
+                    output = json.load(f)
                 with open(report_path, "w") as f:
                     json.dump(output, f, indent=4)
             except json.JSONDecodeError:
                 logging.error("Hadolint produced invalid JSON output")
-                return
+                os.remove(report_path)
+                return result
             if not output:
                 logging.warning("Hadolint produced empty JSON output")
-                return
         else:
             logging.error("Hadolint scan failed due to a subprocess error or empty output.")
+            if os.path.exists(report_path):
+                os.remove(report_path)
+        return result
     except Exception as e:
         logging.exception("Hadolint scan failed")
+
+def run_hadolint_incremental(dockerfile_path, report_path, changes):
+    """Lint the Dockerfile again only if it changed; otherwise reuse the previous report."""
+    previous_path = changes.previous_report("hadolint")
+    target_path = os.path.dirname(dockerfile_path)
+    if previous_path is None or repo_relative(dockerfile_path, target_path) in changes.stale:
+        return run_hadolint(dockerfile_path, report_path)
+    logging.info(f"Dockerfile unchanged since {changes.base_commit[:12]}, reusing previous Hadolint report")
+    shutil.copyfile(previous_path, report_path)
+
+def normalize_hadolint_report(report_path):
+    """Map a Hadolint report to common finding records (the 'skipped' placeholder yields none)."""
+    with open(report_path) as f:
+        report = json.load(f)
+    if not isinstance(report, list):
+        return
+    for result in report:
+        yield {
+            "rule_id": result.get("code"),
+            "severity": result.get("level"),
+            "file": result.get("file"),
+            "line": result.get("line"),
+            "message": result.get("message"),
+        }
@@ -2,9 +2,11 @@ import json
 import logging
 import os
 import re
-import subprocess
+from modules.subprocess_utils import run_streaming
 
 API_KEY_ENV_VAR = "SAFETY_API_KEY"
+APPLIES_TO = None  # Scans general.requirements_path, not the checkout; skipped when that file is missing
+EXIT_CODES = (0, 64)  # 64: vulnerabilities found
 
 def extract_json_from_output(output):
     """Extract JSON data from Safety CLI output."""
@@ -57,24 +59,35 @@ def run_safety(requirements_path, report_path):
 
     logging.info(f"Running Safety on {requirements_path} with API key")
     try:
-        result = subprocess.run([
-            "safety", "scan", "--file", requirements_path, "--json", "--key", api_key
-        ], capture_output=True, text=True)
-        # Log raw output for debugging
-        logging.debug(f"Raw Safety output: {result.stdout}")
-
-        # Save raw output to a file for analysis
+        # Stream the raw output to a file for analysis, then parse it from there
         raw_output_path = report_path.replace(".json", "_raw_output.txt")
-        with open(raw_output_path, "w") as raw_file:
-            raw_file.write(result.stdout)
-
-        if result.returncode != 0:
-            logging.warning(f"Safety finished with warnings: {result.stderr}")
+        result = run_streaming([
+            "safety", "scan", "--file", requirements_path, "--json", "--key", api_key
+        ], raw_output_path)
+        if result is None:
+            logging.error("Safety scan failed due to a subprocess error.")
+            return None
 
         # Parse the structured text output
-        parsed_data = parse_safety_output(result.stdout)
+        with open(raw_output_path, encoding="utf-8", errors="replace") as raw_file:
+            parsed_data = parse_safety_output(raw_file.read())
         with open(report_path, "w") as f:
             json.dump(parsed_data, f, indent=4)
+        return result
 
     except Exception as e:
         logging.exception("Safety scan failed")
+
+def normalize_safety_report(report_path):
+    """Map the parsed Safety report to common finding records (Safety's text output carries no severity)."""
+    with open(report_path) as f:
+        report = json.load(f)
+    for dependency in report.get("dependencies", []):
+        for vulnerability in dependency.get("vulnerabilities", []):
+            yield {
+                "rule_id": vulnerability.get("id"),
+                "severity": None,
+                "file": None,
+                "line": None,
+                "message": dependency.get("name"),
+            }
@@ -1,13 +1,84 @@
+import json
 import logging
-import subprocess
+import os
+from modules.subprocess_utils import run_streaming
+from modules.incremental import repo_relative, write_json_report
 
-def run_semgrep(target_repo, report_path):
+# The registry rules cover source code as well as Terraform, YAML manifests and Dockerfiles
+APPLIES_TO = ("source", "iac", "dockerfile")
+EXIT_CODES = (0,)  # Exits 1 on findings only with --error, which is not passed
+
+def run_semgrep(target_repo, report_path, exclusions=None):
     logging.info(f"Running Semgrep on {target_repo}")
     try:
-        result = subprocess.run([
-            "semgrep", "--config", "auto", "--json", "--output", report_path, target_repo
-        ], capture_output=True, text=True)
-        if result.returncode != 0:
-            logging.warning(f"Semgrep finished with warnings: {result.stderr}")
+        command = [
+            "semgrep", "--config", "auto", "--json", "--output", report_path
+        ]
+        # --exclude takes .gitignore patterns, the same syntax as exclude_paths
+        for pattern in exclusions.patterns if exclusions else []:
+            command += ["--exclude", pattern]
+        result = run_streaming(command + [target_repo])
+        if result is None:
+            logging.error("Semgrep scan failed due to a subprocess error.")
+        return result
     except Exception as e:
         logging.exception("Semgrep scan failed")
+
+def merge_semgrep_reports(new_report, previous_report, target_repo, stale_paths, previous_roots=()):
+    """
+    Combine findings for changed files with the previous findings for every unchanged file.
+    Carried findings are moved under target_repo, as a full scan of it would report them.
+    :param previous_roots: Checkout paths the previous report was written under.
+    """
+    merged = dict(new_report)
+    carried = []
+    for r in previous_report.get("results", []):
+        relative = repo_relative(r.get("path", ""), target_repo, previous_roots)
+        if relative not in stale_paths:
+            carried.append(dict(r, path=os.path.join(target_repo, relative)))
+    merged["results"] = carried + new_report.get("results", [])
+    return merged
+
+def run_semgrep_incremental(target_repo, report_path, changes, exclusions=None):
+    """
+    Run Semgrep on the changed files only and carry forward findings for the rest.
+    The change set is already filtered; exclusions apply to the full scan run without a previous report.
+    """
+    previous_path = changes.previous_report("semgrep")
+    if previous_path is None:
+        return run_semgrep(target_repo, report_path, exclusions)
+    logging.info(f"Running Semgrep incrementally on {len(changes.changed)} changed files in {target_repo}")
+    try:
+        with open(previous_path) as f:
+            previous_report = json.load(f)
+        new_report = {"results": [], "errors": []}
+        result = None
+        if changes.changed:
+            result = run_streaming([
+                "semgrep", "--config", "auto", "--json", "--output", report_path
+            ] + [os.path.join(target_repo, path) for path in changes.changed])
+            if result is None or not os.path.exists(report_path):
+                logging.error("Semgrep produced no report")
+                return
+            with open(report_path) as f:
+                new_report = json.load(f)
+        write_json_report(merge_semgrep_reports(
+            new_report, previous_report, target_repo, changes.stale, changes.previous_roots
+        ), report_path)
+        return result
+    except Exception as e:
+        logging.exception("Semgrep incremental scan failed")
+
+def normalize_semgrep_report(report_path):
+    """Map a Semgrep report to common finding records."""
+    with open(report_path) as f:
+        report = json.load(f)
+    for result in report.get("results", []):
+        extra = result.get("extra", {})
+        yield {
+            "rule_id": result.get("check_id"),
+            "severity": extra.get("severity"),
+            "file": result.get("path"),
+            "line": result.get("start", {}).get("line"),
+            "message": extra.get("message"),
+        }
@@ -1,15 +1,21 @@
 import logging
-import subprocess
+from modules.subprocess_utils import run_streaming
 
-def run_syft(target_path, report_path):
+APPLIES_TO = ("manifest", "lockfile", "archive")
+EXIT_CODES = (0,)
+
+def run_syft(target_path, report_path, exclusions=None):
     logging.info(f"Running Syft on {target_path}")
     try:
-        result = subprocess.run([
+        command = [
             "syft", target_path, "-o", "json", "-q"
-        ], capture_output=True, text=True)
-        with open(report_path, "w") as f:
-            f.write(result.stdout)
-        if result.returncode != 0:
-            logging.warning(f"Syft finished with warnings: {result.stderr}")
+        ]
+        # --exclude globs must start with "./" (relative to the scan root) or "**/"
+        for glob in exclusions.globs("./", "**/") if exclusions else []:
+            command += ["--exclude", glob]
+        result = run_streaming(command, report_path)
+        if result is None:
+            logging.error("Syft scan failed due to a subprocess error.")
+        return result
     except Exception as e:
         logging.exception("Syft scan failed")
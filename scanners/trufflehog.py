@@ -1,55 +1,122 @@
+import hashlib
 import json
 import logging
-import subprocess
+import os
+import tempfile
+from modules.subprocess_utils import run_streaming_lines
 
-def run_trufflehog(target_repo, report_path):
+# Fields kept from the first hit of each distinct finding; the rest of TruffleHog's record is dropped
+KEPT_FIELDS = ("DetectorName", "DetectorDescription", "DetectorType", "DecoderName", "SourceMetadata", "Raw", "Redacted", "ExtraData")
+APPLIES_TO = None  # Scans the git history as well as the checked-out files
+EXIT_CODES = (0,)  # Exits 183 on results only with --fail, which is not passed
+
+def _location(record):
+    """Extract (file, line, commit) from a record's source metadata, whatever the source type."""
+    data = (record.get("SourceMetadata") or {}).get("Data") or {}
+    source = next(iter(data.values()), {}) if data else {}
+    if not isinstance(source, dict):
+        return None, None, None
+    return source.get("file"), source.get("line"), source.get("commit")
+
+def fingerprint(record):
+    """Stable fingerprint of a hit: detector + hash of the secret + location. The secret itself is never part of it."""
+    detector = record.get("DetectorName") or str(record.get("DetectorType", ""))
+    secret = record.get("RawV2") or record.get("Raw") or ""
+    secret_hash = hashlib.sha256(secret.encode(errors="replace")).hexdigest()
+    file_path, line, commit = _location(record)
+    key = json.dumps([detector, secret_hash, file_path, line, commit])
+    return hashlib.sha256(key.encode()).hexdigest()
+
+class FindingAggregator:
+    """Collapse repeated TruffleHog hits into one finding per fingerprint, counting occurrences."""
+
+    def __init__(self):
+        self.findings = {}
+        self.raw_hits = 0
+        self.invalid_lines = 0
+
+    def add_line(self, line):
+        if not line.strip():
+            return
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            self.invalid_lines += 1
+            return
+        if not isinstance(record, dict):
+            self.invalid_lines += 1
+            return
+        self.raw_hits += 1
+        key = fingerprint(record)
+        finding = self.findings.get(key)
+        if finding is None:
+            finding = {field: record[field] for field in KEPT_FIELDS if field in record}
+            finding.update({"fingerprint": key, "occurrences": 0, "Verified": False})
+            self.findings[key] = finding
+        finding["occurrences"] += 1
+        if record.get("Verified"):
+            finding["Verified"] = True
+        if record.get("VerificationError") and not finding["Verified"]:
+            finding["VerificationError"] = record["VerificationError"]
+
+    def report(self):
+        findings = sorted(self.findings.values(), key=lambda f: (not f["Verified"], -f["occurrences"]))
+        return {
+            "status": "completed",
+            "secrets_found": len(findings),
+            "raw_hits": self.raw_hits,
+            "verified": sum(1 for f in findings if f["Verified"]),
+            "results": findings,
+        }
+
+def run_trufflehog(target_repo, report_path, exclusions=None):
     logging.info(f"Running TruffleHog on {target_repo}")
+    exclude_file = None
     try:
         command = [
-            "trufflehog", "filesystem", "--json", target_repo
+            "trufflehog", "filesystem", "--json"
         ]
+        if exclusions:
+            # --exclude-paths reads one regular expression per line, matched against the paths it prints
+            fd, exclude_file = tempfile.mkstemp(prefix="trufflehog-exclude-", suffix=".txt")
+            with os.fdopen(fd, "w") as f:
+                f.write("\n".join(exclusions.regexes(target_repo)) + "\n")
+            command += ["--exclude-paths", exclude_file]
+        command.append(target_repo)
         logging.debug(f"Executing command: {' '.join(command)}")
-        result = subprocess.run(command, capture_output=True, text=True)
-
-        # Log raw output for debugging
-        logging.debug(f"Raw TruffleHog output: {result.stdout}")
-        logging.debug(f"Raw TruffleHog errors: {result.stderr}")
-
-        # Save raw output to a file for analysis
-        raw_output_path = report_path.replace(".json", "_raw_output.txt")
-        with open(raw_output_path, "w") as raw_file:
-            raw_file.write(result.stdout)
-
-        if result.returncode != 0:
-            logging.warning(f"TruffleHog finished with warnings: {result.stderr}")
+        aggregator = FindingAggregator()
+        result = run_streaming_lines(command, aggregator.add_line)
+        if result is None:
+            logging.error("TruffleHog scan failed due to a subprocess error.")
+            return None
+        if aggregator.invalid_lines:
+            logging.error(f"TruffleHog produced {aggregator.invalid_lines} invalid JSON lines")
 
-        # Check if the output is empty
-        if not result.stdout.strip():
+        report = aggregator.report()
+        if not report["results"]:
             logging.info("TruffleHog completed successfully but found no secrets.")
-            placeholder = {
-                "status": "completed",
-                "secrets_found": 0
-            }
-            with open(report_path, "w") as f:
-                json.dump(placeholder, f, indent=4)
-            return
-
-        try:
-            output = [json.loads(line) for line in result.stdout.splitlines() if line.strip()]
-            if not output:
-                logging.info("TruffleHog completed successfully but found no secrets.")
-                placeholder = {
-                    "status": "completed",
-                    "secrets_found": 0
-                }
-                with open(report_path, "w") as f:
-                    json.dump(placeholder, f, indent=4)
-                return
-            with open(report_path, "w") as f:
-                json.dump(output, f, indent=4)
-        except json.JSONDecodeError as e:
-            logging.error(f"TruffleHog produced invalid JSON output: {e}")
-            with open(report_path, "w") as f:
-                f.write(result.stdout)  # Save raw output for debugging
+        else:
+            logging.info(f"TruffleHog found {report['secrets_found']} distinct secrets in {report['raw_hits']} hits")
+        with open(report_path, "w") as f:
+            json.dump(report, f, separators=(",", ":"))
+        return result
     except Exception as e:
         logging.exception("TruffleHog scan failed")
+    finally:
+        if exclude_file:
+            os.remove(exclude_file)
+
+def normalize_trufflehog_report(report_path):
+    """Map the de-duplicated TruffleHog report to common finding records; verified secrets are critical."""
+    with open(report_path) as f:
+        report = json.load(f)
+    for finding in report.get("results", []):
+        file_path, line, _ = _location(finding)
+        yield {
+            "rule_id": finding.get("DetectorName"),
+            "severity": "critical" if finding.get("Verified") else "high",
+            "file": file_path,
+            "line": line,
+            "message": finding.get("DetectorDescription"),
+            "fingerprint": finding.get("fingerprint"),
+        }
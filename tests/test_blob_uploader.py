@@ -0,0 +1,63 @@
+import pytest
+
+pytest.importorskip("azure.storage.blob")
+
+from benchmarks.fake_blob_server import start_server  # noqa: E402
+from modules.blob_uploader import BlobUploader  # noqa: E402
+
+ACCOUNT_KEY = "Eby8vdM02xNOcqFeqCnf2P=="
+
+
+@pytest.fixture
+def blob_service():
+    server, store = start_server()
+    connection_string = (
+        f"DefaultEndpointsProtocol=http;AccountName=devstoreaccount1;AccountKey={ACCOUNT_KEY};"
+        f"BlobEndpoint=http://127.0.0.1:{server.server_port}/devstoreaccount1;"
+    )
+    yield BlobUploader(connection_string, max_concurrency=4), store
+    server.shutdown()
+
+
+def _report_dir(base, timestamp, files):
+    report_dir = base / "repo" / timestamp
+    for rel_path, content in files.items():
+        path = report_dir / rel_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(content)
+    return str(report_dir)
+
+
+FILES = {"json/grype.json": b'{"matches": []}', "html/grype.html": b"<html></html>", "summary.html": b"<p>0</p>"}
+
+
+def test_first_run_uploads_everything(tmp_path, blob_service):
+    uploader, store = blob_service
+    stats = uploader.upload_directory(_report_dir(tmp_path, "2024-01-01_00-00-00", FILES), "repo")
+    assert stats == {"uploaded": 3, "skipped": 0, "failed": 0, "bytes": sum(len(data) for data in FILES.values())}
+    assert set(store.containers["repo"]) == {f"2024-01-01_00-00-00/{path}" for path in FILES}
+
+
+def test_unchanged_files_are_copied_from_the_previous_run(tmp_path, blob_service):
+    uploader, store = blob_service
+    uploader.upload_directory(_report_dir(tmp_path, "2024-01-01_00-00-00", FILES), "repo")
+    changed = dict(FILES, **{"summary.html": b"<p>1</p>", "json/new.json": b"[]"})
+    stats = uploader.upload_directory(_report_dir(tmp_path, "2024-01-02_00-00-00", changed), "repo")
+    assert (stats["uploaded"], stats["skipped"], stats["failed"]) == (2, 2, 0)
+    assert stats["bytes"] == len(b"<p>1</p>") + len(b"[]")
+    # The new folder is complete on its own
+    blobs = store.containers["repo"]
+    for rel_path, content in changed.items():
+        assert blobs[f"2024-01-02_00-00-00/{rel_path}"]["data"] == content
+
+
+def test_compares_with_the_latest_earlier_folder_only(tmp_path, blob_service):
+    uploader, store = blob_service
+    uploader.upload_directory(_report_dir(tmp_path, "2024-01-01_00-00-00", FILES), "repo")
+    uploader.upload_directory(_report_dir(tmp_path, "2024-01-03_00-00-00", {"summary.html": b"other"}), "repo")
+    previous = uploader.previous_copies("repo", "2024-01-02_00-00-00")
+    assert set(previous) == {f"2024-01-02_00-00-00/{path}" for path in FILES}
+    assert previous["2024-01-02_00-00-00/summary.html"][0] == "2024-01-01_00-00-00/summary.html"
+    # Blobs outside any folder (report bundles) are not mistaken for a run
+    uploader.upload_files("repo", [(str(tmp_path / "repo" / "2024-01-01_00-00-00" / "summary.html"), "bundle.tar.gz")])
+    assert uploader.previous_copies("repo", "2024-01-01_00-00-00") == {}
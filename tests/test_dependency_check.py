@@ -0,0 +1,60 @@
+import os
+
+from scanners.dependency_check import split_batch_report
+
+
+def _dependency(path, vulnerabilities=1):
+    return {
+        "fileName": os.path.basename(path),
+        "filePath": path,
+        "vulnerabilities": [{"name": f"CVE-2024-{i}", "severity": "HIGH"} for i in range(vulnerabilities)],
+    }
+
+
+def _combined(dependencies):
+    return {
+        "reportSchema": "1.1",
+        "scanInfo": {"engineVersion": "9.0.9"},
+        "projectInfo": {"name": "security-scan-batch", "reportDate": "2024-01-01T00:00:00Z"},
+        "dependencies": dependencies,
+    }
+
+
+def test_dependencies_go_to_the_repository_they_were_found_in(tmp_path):
+    api, web = str(tmp_path / "api"), str(tmp_path / "web")
+    combined = _combined([
+        _dependency(f"{api}/requirements.txt", 2),
+        _dependency(f"{web}/package-lock.json"),
+        _dependency(f"{web}/dist/app.war/WEB-INF/lib/log4j.jar", 3),
+    ])
+    reports = split_batch_report(combined, [(api, "reports/api.json"), (web, "reports/web.json")])
+    assert [d["fileName"] for d in reports["reports/api.json"]["dependencies"]] == ["requirements.txt"]
+    assert [d["fileName"] for d in reports["reports/web.json"]["dependencies"]] == ["package-lock.json", "log4j.jar"]
+    # Everything but the dependencies is shared, with the project named after the repository
+    assert reports["reports/web.json"]["scanInfo"] == {"engineVersion": "9.0.9"}
+    assert reports["reports/web.json"]["projectInfo"] == {"name": "web", "reportDate": "2024-01-01T00:00:00Z"}
+    assert combined["projectInfo"]["name"] == "security-scan-batch"
+
+
+def test_nested_and_prefix_roots_match_the_most_specific_repository(tmp_path):
+    outer, inner, sibling = str(tmp_path / "mono"), str(tmp_path / "mono" / "vendor" / "lib"), str(tmp_path / "mono-tools")
+    combined = _combined([
+        _dependency(f"{outer}/pom.xml"),
+        _dependency(f"{inner}/pom.xml"),
+        _dependency(f"{sibling}/pom.xml"),
+    ])
+    reports = split_batch_report(combined, [(outer, "outer.json"), (inner, "inner.json"), (sibling, "sibling.json")])
+    assert [d["filePath"] for d in reports["outer.json"]["dependencies"]] == [f"{outer}/pom.xml"]
+    assert [d["filePath"] for d in reports["inner.json"]["dependencies"]] == [f"{inner}/pom.xml"]
+    assert [d["filePath"] for d in reports["sibling.json"]["dependencies"]] == [f"{sibling}/pom.xml"]
+
+
+def test_relative_targets_and_unassigned_dependencies(tmp_path, monkeypatch, caplog):
+    monkeypatch.chdir(tmp_path)
+    combined = _combined([_dependency(f"{tmp_path}/cloned_repos/api/setup.py"), _dependency("/elsewhere/pom.xml")])
+    reports = split_batch_report(combined, [("cloned_repos/api", "api.json"), ("cloned_repos/empty", "empty.json")])
+    assert len(reports["api.json"]["dependencies"]) == 1
+    # Every repository gets a report, even without dependencies
+    assert reports["empty.json"]["dependencies"] == []
+    assert "1 dependencies in the batch report did not belong" in caplog.text
+
@@ -0,0 +1,95 @@
+import re
+
+import pytest
+
+from modules.exclusions import PathExclusions, get_exclusions, walk_files
+
+
+@pytest.mark.parametrize("pattern, path, is_dir, excluded", [
+    # A bare name matches at any depth, and everything below a matching directory
+    ("node_modules", "node_modules", True, True),
+    ("node_modules", "web/node_modules/lodash/index.js", False, True),
+    ("node_modules", "src/node_modules_helper.py", False, False),
+    # A pattern with a "/" (or a leading "/") only matches from the root
+    ("docs/build", "docs/build/index.html", False, True),
+    ("docs/build", "site/docs/build/index.html", False, False),
+    ("/vendor", "vendor/lib.go", False, True),
+    ("/vendor", "cmd/vendor/lib.go", False, False),
+    ("./vendor", "vendor/lib.go", False, True),
+    # A trailing "/" only matches directories
+    ("dist/", "dist", True, True),
+    ("dist/", "dist", False, False),
+    ("dist/", "pkg/dist/app.js", False, True),
+    # "*" and "?" stay within one segment
+    ("*.min.js", "static/js/app.min.js", False, True),
+    ("*.min.js", "static/js/app.js", False, False),
+    ("src/*.py", "src/app.py", False, True),
+    ("src/*.py", "src/sub/app.py", False, False),
+    ("file?.txt", "file1.txt", False, True),
+    ("file?.txt", "file10.txt", False, False),
+    # "**" spans segments
+    ("tests/**/fixtures", "tests/fixtures/a.json", False, True),
+    ("tests/**/fixtures", "tests/unit/deep/fixtures/a.json", False, True),
+    ("tests/**/fixtures", "other/tests/fixtures/a.json", False, False),
+    ("**/generated", "a/b/generated/x.py", False, True),
+    ("logs/**", "logs/2024/app.log", False, True),
+    # Character classes, negated with "!"
+    ("[ab].txt", "a.txt", False, True),
+    ("[ab].txt", "c.txt", False, False),
+    ("[!ab].txt", "c.txt", False, True),
+])
+def test_glob_matching(pattern, path, is_dir, excluded):
+    assert (PathExclusions([pattern]).match(path, is_dir) is not None) == excluded
+
+
+@pytest.mark.parametrize("pattern, root, path, excluded", [
+    ("node_modules", None, "web/node_modules/x.js", True),
+    ("node_modules", None, "web/node_modules_x.js", False),
+    ("docs/build", None, "docs/build/x.html", True),
+    ("docs/build", "/tmp/repo", "/tmp/repo/docs/build/x.html", True),
+    ("docs/build", "/tmp/repo", "/tmp/repo/site/docs/build/x.html", False),
+    ("dist/", None, "pkg/dist/app.js", True),
+    ("dist/", None, "pkg/dist", False),
+])
+def test_regexes_match_like_the_rules(pattern, root, path, excluded):
+    (regex,) = PathExclusions([pattern]).regexes(root)
+    assert bool(re.search(regex, path)) == excluded
+
+
+def test_first_matching_rule_and_filter():
+    exclusions = PathExclusions(["*.min.js", "vendor", "*.min.js", " ", ""])
+    assert exclusions.patterns == ["*.min.js", "vendor"]
+    assert exclusions.match("vendor/a.min.js").pattern == "*.min.js"
+    assert exclusions.filter(["a.py", "vendor/b.py", "c.min.js", "d.js"]) == ["a.py", "d.js"]
+    assert not PathExclusions([])
+
+
+def test_get_exclusions_combines_global_and_repository_rules():
+    exclusions = get_exclusions({"exclude_paths": ["node_modules"]}, {"exclude_paths": ["docs/build"]})
+    assert exclusions.patterns == ["node_modules", "docs/build"]
+    assert get_exclusions({}, {}).patterns == []
+
+
+def test_walk_files_skips_and_counts_excluded(tmp_path):
+    files = {
+        "app.py": 10,
+        "node_modules/lib/index.js": 100,
+        "node_modules/lib/util.js": 50,
+        "static/app.min.js": 7,
+        ".git/HEAD": 5,
+    }
+    for rel_path, size in files.items():
+        path = tmp_path / rel_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"x" * size)
+    exclusions = PathExclusions(["node_modules", "*.min.js"])
+    walked = sorted(rel_path for _, rel_path in walk_files(str(tmp_path), exclusions))
+    assert walked == ["app.py"]
+    assert exclusions.to_dict() == {
+        "files": 3,
+        "bytes": 157,
+        "rules": [
+            {"pattern": "node_modules", "files": 2, "bytes": 150},
+            {"pattern": "*.min.js", "files": 1, "bytes": 7},
+        ],
+    }
@@ -0,0 +1,126 @@
+import argparse
+import json
+import sqlite3
+
+import pytest
+
+from modules.findings_store import FindingsStore, normalize_severity, run_query_command
+
+
+def _normalize(report_path):
+    with open(report_path) as f:
+        yield from json.load(f)
+
+
+def _load(store, tmp_path, run_id, repo, started, findings):
+    """Write one report per tool and load them as a run."""
+    report_dir = tmp_path / run_id
+    (report_dir / "json").mkdir(parents=True)
+    for tool, records in findings.items():
+        (report_dir / "json" / f"{tool}.json").write_text(json.dumps(records))
+    local_path = str(tmp_path / "checkout" / repo)
+    return store.load_run(
+        run_id, repo, "main", f"{run_id:0<40}", str(report_dir), local_path,
+        {tool: _normalize for tool in findings}, started=started,
+    )
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = FindingsStore(str(tmp_path / "findings.db"))
+    checkout = tmp_path / "checkout"
+    _load(store, tmp_path, "api-1", "api", 1000, {
+        "grype": [
+            {"rule_id": "CVE-2024-1", "severity": "Critical", "file": str(checkout / "api" / "requirements.txt")},
+            {"rule_id": "CVE-2024-2", "severity": "Low", "file": "requirements.txt"},
+        ],
+        "semgrep": [{"rule_id": "python.sqli", "severity": "ERROR", "file": "app/db.py", "line": 12}],
+    })
+    _load(store, tmp_path, "api-2", "api", 2000, {
+        "grype": [{"rule_id": "CVE-2024-1", "severity": "critical", "file": "requirements.txt"}],
+    })
+    _load(store, tmp_path, "web-1", "web", 1500, {
+        "gitleaks": [{"rule_id": "aws-key", "severity": "high", "file": "config.js", "line": 3, "fingerprint": "abc"}],
+        "hadolint": [{"rule_id": "DL3008", "severity": "warning", "file": "Dockerfile", "line": "n/a"}],
+    })
+    return store
+
+
+def _rows(result):
+    columns, rows = result
+    return [dict(zip(columns, row)) for row in rows]
+
+
+def test_normalize_severity_aliases():
+    assert normalize_severity("ERROR") == "high"
+    assert normalize_severity(" Moderate ") == "medium"
+    assert normalize_severity("style") == "info"
+    assert normalize_severity(None) == "unknown"
+    assert normalize_severity("bogus") == "unknown"
+
+
+def test_query_orders_by_severity_then_time(store):
+    rows = _rows(store.query())
+    assert len(rows) == 6
+    assert [row["severity"] for row in rows] == ["critical", "critical", "high", "high", "medium", "low"]
+    # The newer of the two critical findings comes first
+    assert rows[0]["commit_sha"] == "api-2".ljust(12, "0")
+
+
+def test_query_filters(store):
+    assert {row["tool"] for row in _rows(store.query(repo="web"))} == {"gitleaks", "hadolint"}
+    assert len(_rows(store.query(repo="a%"))) == 4
+    assert len(_rows(store.query(tool="grype"))) == 3
+    assert len(_rows(store.query(rule="CVE-2024-%"))) == 3
+    assert len(_rows(store.query(rule="CVE-2024-1"))) == 2
+    assert {row["severity"] for row in _rows(store.query(severity="high"))} == {"critical", "high"}
+    assert len(_rows(store.query(since=1500))) == 3
+    assert len(_rows(store.query(limit=2))) == 2
+
+
+def test_query_latest_run_per_repository(store):
+    rows = _rows(store.query(latest=True))
+    assert sorted((row["repo"], row["rule_id"]) for row in rows) == [
+        ("api", "CVE-2024-1"), ("web", "DL3008"), ("web", "aws-key"),
+    ]
+
+
+def test_query_group_by(store):
+    rows = _rows(store.query(group_by="rule_id"))
+    assert rows[0]["rule_id"] == "CVE-2024-1"
+    assert rows[0]["findings"] == 2
+    assert rows[0]["repos"] == 1
+    with pytest.raises(ValueError):
+        store.query(group_by="message; DROP TABLE findings")
+
+
+def test_load_run_relativizes_files_and_keeps_integer_lines(store):
+    rows = _rows(store.query_sql("SELECT run_id, file, line, fingerprint FROM findings ORDER BY id"))
+    assert rows[0]["file"] == "requirements.txt"
+    assert {row["line"] for row in rows if row["run_id"] == "web-1"} == {3, None}
+    assert "abc" in {row["fingerprint"] for row in rows}
+
+
+def test_reloading_a_run_replaces_its_findings(store, tmp_path):
+    _load(store, tmp_path / "again", "api-2", "api", 2000, {"semgrep": []})
+    assert _rows(store.query(repo="api", since=2000)) == []
+
+
+def test_query_sql_is_read_only(store):
+    with pytest.raises(sqlite3.OperationalError):
+        store.query_sql("DELETE FROM findings")
+
+
+def test_run_query_command(store, capsys):
+    args = argparse.Namespace(
+        sql=None, repo="api", tool=None, rule=None, severity="critical", since=None,
+        latest=False, group_by=None, limit=10, json=True,
+    )
+    assert run_query_command(store.path, args) == 0
+    printed = json.loads(capsys.readouterr().out)
+    assert [row["rule_id"] for row in printed] == ["CVE-2024-1", "CVE-2024-1"]
+    assert run_query_command(store.path, argparse.Namespace(**dict(vars(args), group_by="nope"))) == 1
+
+
+def test_run_query_command_without_store(tmp_path):
+    assert run_query_command(str(tmp_path / "missing.db"), argparse.Namespace()) == 1
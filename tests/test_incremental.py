@@ -0,0 +1,184 @@
+import json
+import subprocess
+
+import pytest
+
+from modules.incremental import ChangeSet, IncrementalState, compute_change_set, repo_relative
+from scanners import bandit, checkov, hadolint, semgrep
+
+ROOT = "/tmp/checkouts/api"
+
+
+@pytest.mark.parametrize("path, expected", [
+    ("/tmp/checkouts/api/app/db.py", "app/db.py"),
+    ("tmp/checkouts/api/app/db.py", "app/db.py"),
+    ("./app/db.py", "app/db.py"),
+    ("/app/db.py", "app/db.py"),
+    ("app/../app/db.py", "app/db.py"),
+])
+def test_repo_relative(path, expected):
+    assert repo_relative(path, ROOT) == expected
+
+
+def test_change_set_views():
+    changes = ChangeSet("a", "b", "/reports", changed=["main.tf", "app.py", "Dockerfile", "k8s/deploy.yaml"], deleted=["old.py"])
+    assert changes.stale == {"main.tf", "app.py", "Dockerfile", "k8s/deploy.yaml", "old.py"}
+    assert changes.changed_with_suffix((".py",)) == ["app.py"]
+    assert changes.changed_iac() == ["main.tf", "Dockerfile", "k8s/deploy.yaml"]
+    assert changes.previous_report("bandit") is None
+
+
+def test_bandit_merge_replaces_findings_of_stale_files():
+    previous = {
+        "results": [
+            {"filename": f"{ROOT}/app/db.py", "test_id": "B608"},
+            {"filename": f"{ROOT}/app/old.py", "test_id": "B101"},
+            {"filename": f"{ROOT}/app/util.py", "test_id": "B105"},
+        ],
+        "metrics": {
+            f"{ROOT}/app/db.py": {"loc": 10, "SEVERITY.HIGH": 1},
+            f"{ROOT}/app/old.py": {"loc": 5, "SEVERITY.HIGH": 0},
+            f"{ROOT}/app/util.py": {"loc": 20, "SEVERITY.HIGH": 1},
+            "_totals": {"loc": 35, "SEVERITY.HIGH": 2},
+        },
+    }
+    new = {
+        "results": [{"filename": f"{ROOT}/app/db.py", "test_id": "B611"}],
+        "metrics": {f"{ROOT}/app/db.py": {"loc": 12, "SEVERITY.HIGH": 0}, "_totals": {"loc": 12}},
+        "errors": [],
+    }
+    merged = bandit.merge_bandit_reports(new, previous, ROOT, {"app/db.py", "app/old.py"})
+    assert [(r["filename"], r["test_id"]) for r in merged["results"]] == [
+        (f"{ROOT}/app/util.py", "B105"), (f"{ROOT}/app/db.py", "B611"),
+    ]
+    assert set(merged["metrics"]) == {f"{ROOT}/app/db.py", f"{ROOT}/app/util.py", "_totals"}
+    assert merged["metrics"]["_totals"] == {"loc": 32, "SEVERITY.HIGH": 1}
+    assert merged["errors"] == []
+
+
+def test_semgrep_merge_carries_unchanged_files():
+    previous = {"results": [{"path": f"{ROOT}/a.py", "check_id": "x"}, {"path": f"{ROOT}/b.py", "check_id": "y"}]}
+    new = {"results": [{"path": f"{ROOT}/a.py", "check_id": "z"}], "errors": [], "version": "1.50.0"}
+    merged = semgrep.merge_semgrep_reports(new, previous, ROOT, {"a.py"})
+    assert [(r["path"], r["check_id"]) for r in merged["results"]] == [(f"{ROOT}/b.py", "y"), (f"{ROOT}/a.py", "z")]
+    assert merged["version"] == "1.50.0"
+
+
+def _framework(kind, failed, passed=()):
+    return {
+        "check_type": kind,
+        "results": {
+            "failed_checks": [{"check_id": check_id, "file_path": path} for check_id, path in failed],
+            "passed_checks": [{"check_id": check_id, "file_path": path} for check_id, path in passed],
+            "skipped_checks": [],
+            "parsing_errors": [],
+        },
+        "summary": {"checkov_version": "3.0.0", "failed": 99},
+    }
+
+
+def test_checkov_merge_per_framework():
+    previous = [
+        _framework("terraform", [("CKV_AWS_1", "/main.tf"), ("CKV_AWS_2", "/modules/s3.tf")], [("CKV_AWS_3", "/main.tf")]),
+        _framework("dockerfile", [("CKV_DOCKER_2", "/Dockerfile")]),
+    ]
+    new = [
+        _framework("terraform", [("CKV_AWS_9", f"{ROOT}/main.tf")]),
+        _framework("kubernetes", [("CKV_K8S_1", f"{ROOT}/k8s/deploy.yaml")]),
+    ]
+    merged = {entry["check_type"]: entry for entry in checkov.merge_checkov_reports(new, previous, ROOT, {"main.tf", "k8s/deploy.yaml"})}
+    terraform = merged["terraform"]
+    assert [(c["check_id"], c["file_path"]) for c in terraform["results"]["failed_checks"]] == [
+        ("CKV_AWS_2", "/modules/s3.tf"), ("CKV_AWS_9", "/main.tf"),
+    ]
+    assert terraform["results"]["passed_checks"] == []
+    assert terraform["summary"] == {"checkov_version": "3.0.0", "failed": 2, "passed": 0, "skipped": 0, "parsing_errors": 0}
+    # Untouched frameworks are kept, new ones are added with repo-relative paths
+    assert merged["dockerfile"]["summary"]["failed"] == 1
+    assert merged["kubernetes"]["results"]["failed_checks"][0]["file_path"] == "/k8s/deploy.yaml"
+    # The previous report is not modified
+    assert len(previous[0]["results"]["failed_checks"]) == 2
+
+
+def test_hadolint_reuses_report_while_dockerfile_is_unchanged(tmp_path, monkeypatch):
+    (tmp_path / "previous" / "json").mkdir(parents=True)
+    (tmp_path / "previous" / "json" / "hadolint.json").write_text(json.dumps([{"code": "DL3008"}]))
+    dockerfile = str(tmp_path / "repo" / "Dockerfile")
+    report_path = tmp_path / "hadolint.json"
+    linted = []
+    monkeypatch.setattr(hadolint, "run_hadolint", lambda path, report: linted.append(path))
+    hadolint.run_hadolint_incremental(dockerfile, str(report_path), ChangeSet("a", "b", str(tmp_path / "previous"), changed=["app.py"]))
+    assert json.loads(report_path.read_text()) == [{"code": "DL3008"}]
+    hadolint.run_hadolint_incremental(dockerfile, str(report_path), ChangeSet("a", "b", str(tmp_path / "previous"), changed=["Dockerfile"]))
+    assert linted == [dockerfile]
+
+
+def _git(repo, *args):
+    return subprocess.run(
+        ["git", "-c", "user.name=test", "-c", "user.email=test@example.com", *args],
+        cwd=repo, check=True, capture_output=True, text=True,
+    ).stdout.strip()
+
+
+def _commit(repo, files):
+    for rel_path, content in files.items():
+        path = repo / rel_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+    _git(repo, "add", "-A")
+    _git(repo, "commit", "-q", "-m", "change")
+    return _git(repo, "rev-parse", "HEAD")
+
+
+def test_findings_from_another_checkout_root_are_replaced(tmp_path):
+    """The previous scan ran on another worker's clone; its paths must still match the changed files."""
+    repo = tmp_path / "worker-2" / "api"
+    repo.mkdir(parents=True)
+    _git(repo, "init", "-q", "-b", "main")
+    first = _commit(repo, {"app/db.py": "query = 1\n", "app/util.py": "x = 1\n"})
+    old_root = "/srv/worker-1/cloned_repos/api"
+    previous_dir = tmp_path / "reports" / "1"
+    (previous_dir / "json").mkdir(parents=True)
+    (previous_dir / "json" / "semgrep.json").write_text(json.dumps({"results": [
+        {"path": f"{old_root}/app/db.py", "check_id": "sqli"},
+        {"path": f"{old_root}/app/util.py", "check_id": "eval"},
+    ]}))
+    state = IncrementalState(str(tmp_path / "state.json"))
+    state.record("https://example.com/api.git", "main", first, None, str(previous_dir), [old_root])
+    head = _commit(repo, {"app/db.py": "query = 2\n"})
+
+    state = IncrementalState(str(tmp_path / "state.json"))
+    changes = compute_change_set(str(repo), "main", state.get("https://example.com/api.git", "main"), head)
+    assert changes.changed == ["app/db.py"]
+    assert old_root in changes.previous_roots
+    with open(changes.previous_report("semgrep")) as f:
+        previous = json.load(f)
+    new = {"results": [{"path": f"{repo}/app/db.py", "check_id": "fixed-sqli"}]}
+    merged = semgrep.merge_semgrep_reports(new, previous, str(repo), changes.stale, changes.previous_roots)
+    # The stale db.py finding is dropped, and util.py is carried forward under the current checkout
+    assert [(r["path"], r["check_id"]) for r in merged["results"]] == [
+        (f"{repo}/app/util.py", "eval"), (f"{repo}/app/db.py", "fixed-sqli"),
+    ]
+
+
+def test_merges_strip_previous_roots():
+    old_root = "/home/ci/clones/api-0123456789"
+    stale = {"main.tf", "app.py"}
+    bandit_merged = bandit.merge_bandit_reports(
+        {"results": []},
+        {"results": [{"filename": f"{old_root}/app.py"}, {"filename": f"{old_root}/lib.py"}],
+         "metrics": {f"{old_root}/app.py": {"loc": 1}, f"{old_root}/lib.py": {"loc": 2}}},
+        ROOT, stale, [old_root],
+    )
+    assert [r["filename"] for r in bandit_merged["results"]] == [f"{ROOT}/lib.py"]
+    assert set(bandit_merged["metrics"]) == {f"{ROOT}/lib.py", "_totals"}
+    checkov_merged = checkov.merge_checkov_reports(
+        [], [_framework("terraform", [("CKV_AWS_1", f"{old_root}/main.tf"), ("CKV_AWS_2", f"{old_root}/s3.tf")])],
+        ROOT, stale, [old_root],
+    )
+    assert [c["file_path"] for c in checkov_merged[0]["results"]["failed_checks"]] == ["/s3.tf"]
+
+
+def test_state_without_scan_roots_forces_a_full_scan(tmp_path):
+    previous = {"commit": "a" * 40, "report_dir": str(tmp_path), "exclude_paths": []}
+    assert compute_change_set(str(tmp_path), "main", previous, "b" * 40) is None
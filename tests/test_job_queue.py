@@ -0,0 +1,122 @@
+import os
+import threading
+import time
+
+import pytest
+
+from modules.job_queue import DirectoryJobQueue, SqliteJobQueue, get_queue
+
+
+@pytest.fixture(params=["sqlite", "directory"])
+def queue(request, tmp_path):
+    path = str(tmp_path / ("jobs.db" if request.param == "sqlite" else "jobs"))
+    return get_queue({"backend": request.param, "path": path, "max_attempts": 2})
+
+
+def lease_expired(queue, worker):
+    """Lease a job with a lease that has already run out."""
+    job = queue.lease(worker, -60)
+    if isinstance(queue, DirectoryJobQueue):
+        # The directory backend also counts the leased file's modification time as a heartbeat
+        past = time.time() - 60
+        os.utime(queue._file("leased", job.id), (past, past))
+    return job
+
+
+def test_get_queue_backends(tmp_path):
+    assert isinstance(get_queue({"backend": "sqlite", "path": str(tmp_path / "q.db")}), SqliteJobQueue)
+    assert isinstance(get_queue({"backend": "directory", "path": str(tmp_path / "q")}), DirectoryJobQueue)
+    with pytest.raises(ValueError):
+        get_queue({"backend": "redis"})
+
+
+def test_jobs_are_leased_in_order_once(queue):
+    queue.enqueue("run", [{"repo": name} for name in "abc"])
+    leased = [queue.lease("w1", 60) for _ in range(3)]
+    assert [job.payload["repo"] for job in leased] == ["a", "b", "c"]
+    assert all(job.status == "leased" and job.worker == "w1" and job.attempts == 1 for job in leased)
+    assert queue.lease("w2", 60) is None
+    assert queue.counts("run") == {"pending": 0, "leased": 3, "done": 0, "failed": 0}
+
+
+def test_complete_records_result(queue):
+    queue.enqueue("run", [{"repo": "a"}])
+    queue.enqueue("other", [{"repo": "b"}])
+    job = queue.lease("w1", 60)
+    assert queue.heartbeat(job, 60)
+    assert queue.complete(job, {"findings": 3})
+    (done,) = [j for j in queue.jobs("run") if j.id == job.id]
+    assert (done.status, done.result) == ("done", {"findings": 3})
+    assert queue.counts("run")["done"] == 1
+    assert queue.counts("other")["pending"] == 1
+    # A finished job cannot be completed or kept alive again
+    assert not queue.complete(job, {})
+    assert not queue.heartbeat(job, 60)
+
+
+def test_expired_lease_is_requeued_and_old_lease_loses_the_job(queue):
+    queue.enqueue("run", [{"repo": "a"}])
+    first = lease_expired(queue, "w1")
+    second = queue.lease("w2", 60)
+    assert second is not None and second.id == first.id
+    assert (second.worker, second.attempts) == ("w2", 2)
+    # The first worker's lease token no longer matches
+    assert not queue.heartbeat(first, 60)
+    assert not queue.complete(first, {"stale": True})
+    assert queue.complete(second, {"fresh": True})
+    (job,) = queue.jobs("run")
+    assert job.result == {"fresh": True}
+
+
+def test_job_fails_after_max_attempts_of_expired_leases(queue):
+    queue.enqueue("run", [{"repo": "a"}])
+    for _ in range(2):
+        lease_expired(queue, "w1")
+    assert queue.requeue_expired() == 1
+    assert queue.lease("w1", 60) is None
+    (job,) = queue.jobs("run")
+    assert job.status == "failed"
+    assert "expired" in job.error
+
+
+def test_fail_retries_until_max_attempts(queue):
+    queue.enqueue("run", [{"repo": "a"}])
+    assert queue.fail(queue.lease("w1", 60), "clone failed")
+    assert queue.counts("run")["pending"] == 1
+    assert queue.fail(queue.lease("w1", 60), "clone failed again")
+    (job,) = queue.jobs("run")
+    assert (job.status, job.error, job.attempts) == ("failed", "clone failed again", 2)
+
+
+def test_live_lease_is_not_requeued(queue):
+    queue.enqueue("run", [{"repo": "a"}])
+    queue.lease("w1", 60)
+    assert queue.requeue_expired() == 0
+    assert queue.lease("w2", 60) is None
+
+
+def test_concurrent_workers_never_share_a_job(queue):
+    ids = set(queue.enqueue("run", [{"n": n} for n in range(40)]))
+    leased, lock = [], threading.Lock()
+
+    def work(worker):
+        while (job := queue.lease(worker, 60)) is not None:
+            with lock:
+                leased.append(job.id)
+            assert queue.complete(job)
+
+    threads = [threading.Thread(target=work, args=(f"w{i}",)) for i in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(leased) == sorted(ids)
+    assert queue.counts("run")["done"] == 40
+
+
+def test_purge_removes_only_old_finished_jobs(queue):
+    queue.enqueue("run", [{"repo": "a"}, {"repo": "b"}])
+    queue.complete(queue.lease("w1", 60))
+    assert queue.purge(1) == 0
+    assert queue.purge(-1) == 1
+    assert queue.counts("run") == {"pending": 1, "leased": 0, "done": 0, "failed": 0}
@@ -0,0 +1,56 @@
+import json
+
+import pytest
+
+from modules import json_to_html
+
+
+def _check(check_id, result):
+    return {"check_id": check_id, "check_name": "name", "file_path": "/main.tf", "check_result": {"result": result}}
+
+
+def _framework(kind, failed, passed):
+    return {
+        "check_type": kind,
+        "results": {
+            "failed_checks": [_check(f"{kind}-F{i}", "FAILED") for i in range(failed)],
+            "passed_checks": [_check(f"{kind}-P{i}", "PASSED") for i in range(passed)],
+            "skipped_checks": [],
+            "parsing_errors": [],
+        },
+        "summary": {"resource_count": 1, "checkov_version": "3.0.0"},
+    }
+
+
+@pytest.fixture
+def page_size():
+    json_to_html.set_page_size(3)
+    yield 3
+    json_to_html.set_page_size(0)
+
+
+def test_checkov_pages_keep_frameworks_with_their_checks():
+    report = [_framework("terraform", 2, 1), _framework("dockerfile", 1, 2)]
+    rows, page_data = json_to_html._paged_rows(report, "checkov")
+    assert len(rows) == 6
+    first, second = page_data(rows[:3]), page_data(rows[3:])
+    assert [framework["check_type"] for framework in first] == ["terraform"]
+    assert [check["check_id"] for check in first[0]["results"]["failed_checks"]] == ["terraform-F0", "terraform-F1"]
+    assert [framework["check_type"] for framework in second] == ["dockerfile"]
+    assert len(second[0]["results"]["passed_checks"]) == 2
+    # The report itself is left untouched
+    assert len(report[0]["results"]["failed_checks"]) == 2
+
+
+def test_checkov_single_framework_report_is_paged(tmp_path, page_size):
+    json_path = tmp_path / "results_json.json"
+    json_path.write_text(json.dumps(_framework("kubernetes", 4, 3)))
+    html_path = tmp_path / "html" / "results_json.html"
+    json_to_html.render_html_from_json(str(json_path), str(html_path), "Checkov Report", "checkov")
+    pages = sorted((tmp_path / "html" / "results_json").glob("page-*.html"))
+    assert len(pages) == 3
+    texts = [page.read_text() for page in pages]
+    assert sum(text.count('<tr class="failed"') for text in texts) == 4
+    assert sum(text.count('<tr class="passed"') for text in texts) == 3
+    assert all("Page " in text for text in texts)
+    assert "page-0001.html" in html_path.read_text()
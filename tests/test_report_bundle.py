@@ -0,0 +1,104 @@
+import json
+import zipfile
+
+import pytest
+
+from modules.report_bundle import LocalBundleReader, bundle_paths, create_bundle, extract, select_members
+
+REPORTS = {
+    "json/gitleaks.json": json.dumps([{"RuleID": "aws-key", "File": "config.js"}] * 50),
+    "json/checkov.json/results_json.json": json.dumps([{"check_type": "terraform"}]),
+    "json/checkov.json/terraform/results_json.json": json.dumps({"check_type": "terraform"}),
+    "html/gitleaks.html": "<html>" + "<tr><td>aws-key</td></tr>" * 100 + "</html>",
+    "html/checkov/page-0001.html": "<html>page 1</html>",
+    "html/checkov.html": "<html>index</html>",
+    "summary.html": "<html>summary</html>",
+}
+
+
+@pytest.fixture
+def bundle(tmp_path):
+    report_dir = tmp_path / "repo" / "2024-01-01_00-00-00"
+    for rel_path, content in REPORTS.items():
+        path = report_dir / rel_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+    return str(report_dir), create_bundle(str(report_dir))
+
+
+def test_bundle_is_a_standard_zip_next_to_the_folder(bundle):
+    report_dir, (bundle_path, index_path) = bundle
+    assert (bundle_path, index_path) == bundle_paths(report_dir)
+    with zipfile.ZipFile(bundle_path) as archive:
+        assert sorted(archive.namelist()) == sorted(REPORTS)
+        assert archive.read("summary.html").decode() == REPORTS["summary.html"]
+    with open(index_path) as f:
+        index = json.load(f)
+    assert set(index["members"]) == set(REPORTS)
+    assert index["members"]["html/gitleaks.html"]["length"] < index["members"]["html/gitleaks.html"]["size"]
+
+
+@pytest.mark.parametrize("open_with", ["bundle", "index"])
+def test_every_member_reads_from_its_offset(bundle, open_with):
+    _, (bundle_path, index_path) = bundle
+    reader = LocalBundleReader(bundle_path if open_with == "bundle" else index_path)
+    for name, content in REPORTS.items():
+        assert reader.read(name).decode() == content
+
+
+def test_corrupted_member_fails_its_crc_check(bundle):
+    _, (bundle_path, _) = bundle
+    reader = LocalBundleReader(bundle_path)
+    member = reader.index["members"]["summary.html"]
+    reader.index["members"]["summary.html"] = dict(member, crc32=member["crc32"] ^ 1)
+    with pytest.raises(ValueError):
+        reader.read("summary.html")
+
+
+def test_select_members(bundle):
+    _, (bundle_path, _) = bundle
+    index = LocalBundleReader(bundle_path).index
+    assert select_members(index, "gitleaks") == ["json/gitleaks.json"]
+    assert select_members(index, "gitleaks", html=True) == ["html/gitleaks.html"]
+    assert select_members(index, "checkov") == [
+        "json/checkov.json/results_json.json", "json/checkov.json/terraform/results_json.json",
+    ]
+    assert select_members(index, "checkov", html=True) == ["html/checkov.html", "html/checkov/page-0001.html"]
+    assert select_members(index, "summary.html") == ["summary.html"]
+    assert select_members(index, "grype") == []
+
+
+def test_extract(bundle, tmp_path, capsysbinary):
+    _, (bundle_path, _) = bundle
+    reader = LocalBundleReader(bundle_path)
+    output = tmp_path / "out"
+    assert extract(reader, "checkov", str(output)) == select_members(reader.index, "checkov")
+    assert (output / "json" / "checkov.json" / "terraform" / "results_json.json").read_text() == REPORTS[
+        "json/checkov.json/terraform/results_json.json"
+    ]
+    extract(reader, "gitleaks")
+    assert capsysbinary.readouterr().out.decode() == REPORTS["json/gitleaks.json"]
+    with pytest.raises(KeyError):
+        extract(reader, "grype")
+
+
+def test_blob_reader_reads_members_from_blob_storage(bundle):
+    pytest.importorskip("azure.storage.blob")
+    from benchmarks.fake_blob_server import start_server
+    from modules.blob_uploader import BlobUploader
+    from modules.report_bundle import BlobBundleReader
+
+    _, (bundle_path, index_path) = bundle
+    server, store = start_server()
+    try:
+        connection_string = (
+            "DefaultEndpointsProtocol=http;AccountName=devstoreaccount1;AccountKey=Eby8vdM02xNOcqFeqCnf2P==;"
+            f"BlobEndpoint=http://127.0.0.1:{server.server_port}/devstoreaccount1;"
+        )
+        BlobUploader(connection_string).upload_files("repo", [
+            (bundle_path, "2024-01-01_00-00-00.zip"), (index_path, "2024-01-01_00-00-00.index.json"),
+        ])
+        reader = BlobBundleReader(connection_string, "repo", "2024-01-01_00-00-00")
+        assert reader.read("json/gitleaks.json").decode() == REPORTS["json/gitleaks.json"]
+    finally:
+        server.shutdown()
@@ -0,0 +1,67 @@
+import json
+import re
+from types import SimpleNamespace
+
+from modules.report_generator import generate_summary_report
+from modules.report_manifest import write_manifest, write_skipped_manifest
+
+
+def _normalize(report_path):
+    with open(report_path) as f:
+        for finding in json.load(f):
+            yield {"severity": finding["severity"]}
+
+
+def _report(report_dir, tool, content):
+    path = report_dir / "json" / f"{tool}.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(content)
+    return str(path)
+
+
+def _rows(html):
+    """The summary table as {tool: cell text}, with whitespace collapsed."""
+    rows = {}
+    for row in re.findall(r"<tr>(.*?)</tr>", html, re.S):
+        cells = [
+            re.sub(r"\s+", " ", re.sub(r"<[^>]+>", "", cell)).strip()
+            for cell in re.findall(r"<td[^>]*>(.*?)</td>", row, re.S)
+        ]
+        if cells:
+            rows[cells[0]] = " | ".join(cells[1:])
+    return rows
+
+
+def test_summary_lists_failed_and_invalid_tools(tmp_path):
+    report_dir = tmp_path / "report"
+    findings = json.dumps([{"severity": "high"}, {"severity": "low"}])
+    write_manifest(str(report_dir), "bandit", _report(report_dir, "bandit", findings), _normalize, SimpleNamespace(returncode=1), exit_codes=(0, 1))
+    # Exited with an unexpected code after writing a report
+    write_manifest(str(report_dir), "semgrep", _report(report_dir, "semgrep", findings), _normalize, SimpleNamespace(returncode=2))
+    # Crashed before writing anything, so there is no JSON report at all
+    write_manifest(str(report_dir), "grype", str(report_dir / "json" / "grype.json"), _normalize, SimpleNamespace(returncode=137))
+    write_manifest(str(report_dir), "safety", _report(report_dir, "safety", "[{"), _normalize, SimpleNamespace(returncode=0))
+    write_skipped_manifest(str(report_dir), "hadolint", "no Dockerfile")
+
+    output = tmp_path / "summary.html"
+    generate_summary_report(str(report_dir), str(output))
+    html = output.read_text()
+    rows = _rows(html)
+    assert rows["bandit"].startswith("2 | Low | high: 1, low: 1")
+    assert rows["semgrep"].startswith("Failed (exit code 2)")
+    assert rows["grype"].startswith("Failed (exit code 137, no report written)")
+    assert rows["safety"].startswith("Invalid (exit code 0, report could not be parsed)")
+    assert rows["hadolint"] == "Skipped: not applicable (no Dockerfile)"
+    # Only counted findings go into the total
+    assert "<strong>Total Issues Found:</strong> 2" in html
+
+
+def test_summary_without_manifests_counts_reports(tmp_path):
+    report_dir = tmp_path / "report"
+    _report(report_dir, "gitleaks", json.dumps([{"RuleID": "aws"}] * 7))
+    _report(report_dir, "trufflehog", "")
+    output = tmp_path / "summary.html"
+    generate_summary_report(str(report_dir), str(output))
+    rows = _rows(output.read_text())
+    assert rows["gitleaks"].startswith("7 | High")
+    assert "trufflehog" not in rows
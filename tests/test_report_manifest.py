@@ -0,0 +1,120 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from modules import report_manifest
+from modules.report_manifest import count_findings_streaming, load_manifest, write_manifest
+
+# Strings that look like JSON structure, so a tokenizer that misreads them miscounts
+TRICKY = ['"]}', '{[', 'a\\"b', 'back\\\\slash', '\\\\"', 'line\nbreak', 'unié☃', ',:', '']
+
+
+def _write(tmp_path, data, raw=None):
+    path = tmp_path / "report.json"
+    path.write_text(raw if raw is not None else json.dumps(data, indent=2))
+    return str(path)
+
+
+@pytest.fixture(params=[1, 7, 64, 1024 * 1024], ids=lambda size: f"read{size}")
+def read_size(request, monkeypatch):
+    """Run each test with reads small enough to split every token and string across chunks."""
+    monkeypatch.setattr(report_manifest, "READ_SIZE", request.param)
+    return request.param
+
+
+def test_top_level_list(tmp_path, read_size):
+    findings = [{"Description": text, "Tags": [text, {"nested": [text]}]} for text in TRICKY]
+    assert count_findings_streaming(_write(tmp_path, findings)) == len(TRICKY)
+
+
+def test_results_list_with_nested_strings(tmp_path, read_size):
+    report = {
+        "errors": [{"message": '"results": [1, 2, 3]'}],
+        "results": [{"check_id": text, "extra": {"lines": text, "metadata": {"refs": [text, text]}}} for text in TRICKY],
+        "paths": {"scanned": ["a", "b"]},
+    }
+    assert count_findings_streaming(_write(tmp_path, report)) == len(TRICKY)
+
+
+def test_grype_matches(tmp_path, read_size):
+    report = {"matches": [{"vulnerability": {"id": f"CVE-{i}", "description": TRICKY[i % len(TRICKY)]}} for i in range(25)],
+              "source": {"target": {"userInput": "[{"}}}
+    assert count_findings_streaming(_write(tmp_path, report)) == 25
+
+
+def test_checkov_frameworks(tmp_path, read_size):
+    frameworks = [
+        {"check_type": kind, "results": {"passed_checks": [{"id": "x"}] * 4, "failed_checks": [{"id": text} for text in TRICKY[:count]]}}
+        for kind, count in (("terraform", 3), ("dockerfile", 5))
+    ]
+    assert count_findings_streaming(_write(tmp_path, frameworks)) == 8
+    assert count_findings_streaming(_write(tmp_path, frameworks[0])) == 3
+
+
+def test_dependency_check_counts_vulnerabilities(tmp_path, read_size):
+    report = {
+        "projectInfo": {"name": "[demo]", "credits": {"NVD": "\"quoted\""}},
+        "dependencies": [
+            {"fileName": text, "vulnerabilities": [{"name": f"CVE-{i}", "description": text} for i in range(n)]}
+            for n, text in enumerate(TRICKY)
+        ] + [{"fileName": "clean.jar"}],
+    }
+    assert count_findings_streaming(_write(tmp_path, report)) == sum(range(len(TRICKY)))
+
+
+def test_matches_json_load_on_compact_output(tmp_path, read_size):
+    findings = [{"k": text} for text in TRICKY * 3]
+    raw = json.dumps(findings, separators=(",", ":"), ensure_ascii=False)
+    assert count_findings_streaming(_write(tmp_path, None, raw)) == len(json.loads(raw))
+
+
+def test_empty_containers(tmp_path, read_size):
+    assert count_findings_streaming(_write(tmp_path, [])) == 0
+    assert count_findings_streaming(_write(tmp_path, {"results": []})) == 0
+
+
+@pytest.mark.parametrize("cut", [1, 10, -1, -2, -20])
+def test_truncated_input_raises(tmp_path, read_size, cut):
+    raw = json.dumps({"results": [{"message": text} for text in TRICKY]})
+    with pytest.raises(ValueError):
+        count_findings_streaming(_write(tmp_path, None, raw[:cut]))
+
+
+def test_unterminated_string_raises(tmp_path, read_size):
+    with pytest.raises(ValueError):
+        count_findings_streaming(_write(tmp_path, None, '[{"message": "no end}]'))
+
+
+def _normalize(report_path):
+    with open(report_path) as f:
+        for finding in json.load(f):
+            yield {"severity": finding["severity"]}
+
+
+def test_manifest_accepts_tool_exit_codes(tmp_path):
+    report = _write(tmp_path, [{"severity": "HIGH"}, {"severity": "low"}])
+    manifest = write_manifest(str(tmp_path), "gitleaks", report, _normalize, SimpleNamespace(returncode=1), exit_codes=(0, 1))
+    assert manifest["status"] == "success"
+    assert manifest["count"] == 2
+    assert load_manifest(str(tmp_path), "gitleaks") == manifest
+
+
+def test_manifest_rejects_other_exit_codes(tmp_path):
+    report = _write(tmp_path, [{"severity": "high"}])
+    manifest = write_manifest(str(tmp_path), "syft", report, _normalize, SimpleNamespace(returncode=2), exit_codes=(0,))
+    assert manifest["status"] == "failed"
+    assert manifest["exit_code"] == 2
+    assert manifest["count"] is None
+
+
+def test_manifest_without_process_uses_report(tmp_path):
+    report = _write(tmp_path, [{"severity": "high"}])
+    assert write_manifest(str(tmp_path), "hadolint", report, _normalize)["status"] == "success"
+    assert write_manifest(str(tmp_path), "hadolint", str(tmp_path / "missing.json"), _normalize)["status"] == "failed"
+
+
+def test_manifest_unparseable_report_is_invalid(tmp_path):
+    report = _write(tmp_path, None, "[{")
+    manifest = write_manifest(str(tmp_path), "bandit", report, _normalize, SimpleNamespace(returncode=0))
+    assert manifest["status"] == "invalid"
@@ -0,0 +1,109 @@
+import json
+import os
+import time
+
+import pytest
+
+from modules import result_cache
+from modules.result_cache import ResultCache, data_version, tool_config_hash
+
+CONFIG = {"general": {"requirements_path": "requirements.txt"}, "exclude_paths": ["node_modules"]}
+
+
+def _reports(report_dir, tool, content="[]"):
+    """Write the JSON, HTML and manifest a tool run leaves behind."""
+    for rel, text in ((f"json/{tool}.json", content), (f"html/{tool}.html", "<html></html>"),
+                      (f"manifests/{tool}.json", json.dumps({"status": "success"}))):
+        path = report_dir / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text)
+    return str(report_dir)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ResultCache(str(tmp_path / "cache"))
+
+
+def test_key_changes_with_every_part():
+    base = ("https://example.com/repo.git", "a" * 40, "grype", "0.74.0", "cfg")
+    keys = {ResultCache.make_key(*base)}
+    for i in range(len(base)):
+        keys.add(ResultCache.make_key(*(base[:i] + ("other",) + base[i + 1:])))
+    keys.add(ResultCache.make_key(*base, data_version="2024-01-01"))
+    assert len(keys) == len(base) + 2
+    # Tools without data keep the key they had before data versions existed
+    assert ResultCache.make_key(*base, data_version=None) == ResultCache.make_key(*base)
+
+
+def test_config_hash_follows_settings_and_extra():
+    assert tool_config_hash("bandit", CONFIG) == tool_config_hash("bandit", dict(CONFIG))
+    assert tool_config_hash("bandit", CONFIG) != tool_config_hash("bandit", dict(CONFIG, exclude_paths=[]))
+    assert tool_config_hash("bandit", CONFIG) != tool_config_hash("bandit", CONFIG, extra={"dockerfile": "Dockerfile"})
+
+
+def test_store_and_restore(cache, tmp_path):
+    key = ResultCache.make_key("repo", "sha", "bandit", "1.7", "cfg")
+    assert not cache.restore(key, str(tmp_path / "run1"), "bandit")
+    cache.store(key, _reports(tmp_path / "run0", "bandit", '[{"id": 1}]'), "bandit", {"commit": "sha"})
+    restored = tmp_path / "run1"
+    assert cache.restore(key, str(restored), "bandit")
+    assert (restored / "json" / "bandit.json").read_text() == '[{"id": 1}]'
+    assert (restored / "html" / "bandit.html").exists()
+    assert (restored / "manifests" / "bandit.json").exists()
+    entries = [entry for _, entry in cache._entries()]
+    assert [entry["hits"] for entry in entries] == [1]
+
+
+def test_store_needs_a_json_report(cache, tmp_path):
+    (tmp_path / "run0" / "html").mkdir(parents=True)
+    (tmp_path / "run0" / "html" / "bandit.html").write_text("<html></html>")
+    key = ResultCache.make_key("repo", "sha", "bandit", "1.7", "cfg")
+    cache.store(key, str(tmp_path / "run0"), "bandit")
+    assert not cache.restore(key, str(tmp_path / "run1"), "bandit")
+
+
+def test_unreadable_entry_is_discarded(cache, tmp_path):
+    key = ResultCache.make_key("repo", "sha", "bandit", "1.7", "cfg")
+    cache.store(key, _reports(tmp_path / "run0", "bandit"), "bandit")
+    with open(os.path.join(cache._entry_dir(key), result_cache.ENTRY_FILE), "w") as f:
+        f.write("{")
+    assert not cache.restore(key, str(tmp_path / "run1"), "bandit")
+    assert not os.path.exists(cache._entry_dir(key))
+
+
+def test_data_version(monkeypatch):
+    assert data_version("bandit") is None
+    assert data_version("dependency-check", database_updated="2024-01-01T00:00") == "2024-01-01T00:00"
+    monkeypatch.setattr(result_cache, "_grype_db_built", lambda period: "2024-02-02T00:00:00Z")
+    assert data_version("grype") == "2024-02-02T00:00:00Z"
+    # Without a known data version, the result expires with the max_age_hours period
+    monkeypatch.setattr(result_cache, "_grype_db_built", lambda period: None)
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now)
+    assert data_version("safety", 24) == data_version("semgrep", 24) == f"period-{int(now // 86400)}"
+    later = now + 86400
+    monkeypatch.setattr(time, "time", lambda: later)
+    assert data_version("safety", 24) == f"period-{int(later // 86400)}" != f"period-{int(now // 86400)}"
+    assert data_version("grype", 24).startswith("period-")
+
+
+def test_new_data_version_misses_the_cache(cache, tmp_path):
+    old = ResultCache.make_key("repo", "sha", "grype", "0.74", "cfg", data_version="db-1")
+    cache.store(old, _reports(tmp_path / "run0", "grype"), "grype")
+    assert cache.restore(old, str(tmp_path / "run1"), "grype")
+    new = ResultCache.make_key("repo", "sha", "grype", "0.74", "cfg", data_version="db-2")
+    assert not cache.restore(new, str(tmp_path / "run2"), "grype")
+
+
+def test_evict_least_recently_used(tmp_path):
+    cache = ResultCache(str(tmp_path / "cache"), max_entries=2)
+    keys = [ResultCache.make_key("repo", f"sha{i}", "bandit", "1.7", "cfg") for i in range(3)]
+    for i, key in enumerate(keys):
+        cache.store(key, _reports(tmp_path / f"run{i}", "bandit"), "bandit")
+        time.sleep(0.01)
+    cache.restore(keys[0], str(tmp_path / "hit"), "bandit")
+    cache.evict()
+    assert os.path.exists(cache._entry_dir(keys[0]))
+    assert not os.path.exists(cache._entry_dir(keys[1]))
+    assert os.path.exists(cache._entry_dir(keys[2]))
@@ -0,0 +1,192 @@
+import threading
+import time
+
+import pytest
+
+from modules.tool_runner import LptScheduler, ToolTask, run_tasks, simulate_schedule
+
+
+def _task(name, calls, depends_on=(), requires=(), fail=False, output_path=None, delay=0.0):
+    def func():
+        time.sleep(delay)
+        calls.append(name)
+        if fail:
+            raise RuntimeError(f"{name} broke")
+    return ToolTask(name, func, depends_on=list(depends_on), requires=list(requires), output_path=output_path)
+
+
+def test_dependents_start_after_their_dependencies():
+    calls = []
+    results = run_tasks([
+        _task("grype-html", calls, depends_on=["grype"]),
+        _task("grype", calls, depends_on=["syft"]),
+        _task("syft", calls, delay=0.05),
+    ], max_workers=3)
+    assert calls == ["syft", "grype", "grype-html"]
+    assert list(results) == ["grype-html", "grype", "syft"]
+    assert {result.status for result in results.values()} == {"success"}
+
+
+def test_failure_skips_only_the_tasks_that_require_it():
+    calls = []
+    results = run_tasks([
+        _task("syft", calls, fail=True),
+        _task("grype", calls, depends_on=["syft"], requires=["syft"]),
+        _task("grype-html", calls, depends_on=["grype"], requires=["grype"]),
+        _task("syft-html", calls, depends_on=["syft"]),
+        _task("bandit", calls),
+    ], max_workers=2)
+    assert results["syft"].status == "failed"
+    assert results["syft"].error == "syft broke"
+    assert results["grype"].status == "skipped"
+    assert results["grype"].error == "syft did not succeed"
+    # A skip propagates down the chain of required tasks
+    assert results["grype-html"].status == "skipped"
+    # Depending without requiring only orders the tasks; the dependent still runs
+    assert results["syft-html"].status == "success"
+    assert results["bandit"].status == "success"
+    assert "grype" not in calls and "grype-html" not in calls
+
+
+def test_missing_output_fails_the_task(tmp_path):
+    empty = tmp_path / "empty.json"
+    empty.write_text("")
+    report_dir = tmp_path / "checkov"
+    (report_dir / "nested").mkdir(parents=True)
+    (report_dir / "nested" / "results_json.json").write_text("[]")
+    calls = []
+    results = run_tasks([
+        _task("missing", calls, output_path=str(tmp_path / "missing.json")),
+        _task("empty", calls, output_path=str(empty)),
+        _task("checkov", calls, output_path=str(report_dir)),
+        _task("missing-html", calls, depends_on=["missing"], requires=["missing"]),
+    ])
+    assert results["missing"].status == "failed"
+    assert "No output written" in results["missing"].error
+    assert results["empty"].status == "failed"
+    assert results["checkov"].status == "success"
+    assert results["missing-html"].status == "skipped"
+
+
+def test_independent_tasks_run_in_parallel():
+    running, peak, lock = [0], [0], threading.Lock()
+
+    def func():
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.05)
+        with lock:
+            running[0] -= 1
+
+    run_tasks([ToolTask(f"tool{i}", func) for i in range(4)], max_workers=4)
+    assert peak[0] > 1
+
+
+def test_invalid_graphs():
+    with pytest.raises(ValueError):
+        run_tasks([ToolTask("grype", lambda: None, depends_on=["syft"])])
+    with pytest.raises(ValueError):
+        run_tasks([ToolTask("syft", lambda: None), ToolTask("grype", lambda: None, requires=["syft"])])
+    results = run_tasks([
+        ToolTask("a", lambda: None, depends_on=["b"]),
+        ToolTask("b", lambda: None, depends_on=["a"]),
+    ])
+    assert {result.status for result in results.values()} == {"skipped"}
+
+
+def test_simulate_schedule_longest_chain_first():
+    # Two workers: the long chain starts first, so the short jobs fill in beside it
+    finish = simulate_schedule([
+        ("short1", "bandit", 1.0, 1.0, []),
+        ("short2", "semgrep", 1.0, 1.0, []),
+        ("long", "grype", 3.0, 4.0, []),
+        ("long-html", None, 1.0, 1.0, ["long"]),
+    ], max_workers=2, tool_caps={})
+    assert finish == {"long": 3.0, "short1": 1.0, "short2": 2.0, "long-html": 4.0}
+
+
+def test_simulate_schedule_tool_caps():
+    jobs = [(f"repo{i}", "dependency-check", 2.0, 2.0, []) for i in range(3)]
+    assert max(simulate_schedule(jobs, max_workers=3, tool_caps={}).values()) == 2.0
+    assert sorted(simulate_schedule(jobs, max_workers=3, tool_caps={"dependency-check": 1}).values()) == [2.0, 4.0, 6.0]
+
+
+def _record(order, lock, name, delay=0.0, fail=False):
+    def func():
+        with lock:
+            order.append(name)
+        time.sleep(delay)
+        if fail:
+            raise RuntimeError(name)
+    return func
+
+
+def test_scheduler_starts_the_longest_chain_first():
+    order, lock, submitted = [], threading.Lock(), threading.Event()
+    scheduler = LptScheduler(max_workers=1)
+    scheduler.submit("small", [ToolTask("bandit", submitted.wait)], {"bandit": 1.0})
+    # Submitted while the only worker is busy, so the order among the rest follows the estimates
+    scheduler.submit("big", [
+        ToolTask("syft", _record(order, lock, "big:syft")),
+        ToolTask("grype", _record(order, lock, "big:grype"), depends_on=["syft"], requires=["syft"]),
+    ], {"syft": 2.0, "grype": 20.0})
+    scheduler.submit("medium", [ToolTask("semgrep", _record(order, lock, "medium:semgrep"))], {"semgrep": 10.0})
+    submitted.set()
+    scheduler.close()
+    completed = dict(scheduler.completed())
+    assert order == ["big:syft", "big:grype", "medium:semgrep"]
+    assert set(completed) == {"small", "big", "medium"}
+    assert list(completed["big"]) == ["syft", "grype"]
+
+
+def test_scheduler_propagates_failures_and_caps_tools():
+    order, lock = [], threading.Lock()
+    running, peak = [0], [0]
+
+    def dependency_check():
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.03)
+        with lock:
+            running[0] -= 1
+
+    scheduler = LptScheduler(max_workers=4, tool_caps={"dependency-check": 1})
+    for repo in ("api", "web", "cli"):
+        scheduler.submit(repo, [
+            ToolTask("syft", _record(order, lock, f"{repo}:syft", fail=repo == "web")),
+            ToolTask("grype", lambda: None, depends_on=["syft"], requires=["syft"]),
+            ToolTask("dependency-check", dependency_check),
+            ToolTask("dependency-check-html", lambda: None, depends_on=["dependency-check"]),
+        ], {})
+    scheduler.close()
+    completed = dict(scheduler.completed())
+    assert completed["web"]["syft"].status == "failed"
+    assert completed["web"]["grype"].status == "skipped"
+    assert completed["api"]["grype"].status == "success"
+    # Four workers, but never more than one Dependency-Check at a time
+    assert peak[0] == 1
+    assert completed["cli"]["dependency-check-html"].status == "success"
+    report = scheduler.report()
+    assert report["tool_caps"] == {"dependency-check": 1}
+    assert set(report["repositories"]) == {"api", "web", "cli"}
+
+
+def test_scheduler_cached_tasks_and_cycles():
+    scheduler = LptScheduler(max_workers=2)
+    cached = ToolTask("gitleaks", lambda: None)
+    cached.cached = True
+    scheduler.submit("api", [cached], {"gitleaks": 30.0})
+    scheduler.submit("loop", [
+        ToolTask("a", lambda: None, depends_on=["b"]),
+        ToolTask("b", lambda: None, depends_on=["a"]),
+    ], {})
+    with pytest.raises(ValueError):
+        scheduler.submit("bad", [ToolTask("grype", lambda: None, depends_on=["syft"])], {})
+    scheduler.close()
+    completed = dict(scheduler.completed())
+    assert {result.status for result in completed["loop"].values()} == {"skipped"}
+    assert completed["api"]["gitleaks"].status == "success"
+    # A cached task is expected to take no time
+    assert scheduler.report()["largest_estimate_errors"][0]["estimate"] == 0.0
@@ -0,0 +1,79 @@
+import json
+
+from scanners.trufflehog import FindingAggregator, fingerprint, normalize_trufflehog_report
+
+
+def _hit(secret="AKIAEXAMPLE", file="config.py", line=3, commit=None, source="Filesystem", **extra):
+    location = {"file": file, "line": line}
+    if commit:
+        location["commit"] = commit
+    record = {
+        "DetectorName": "AWS",
+        "DetectorDescription": "AWS access key",
+        "Raw": secret,
+        "SourceMetadata": {"Data": {source: location}},
+        "Verified": False,
+    }
+    record.update(extra)
+    return json.dumps(record)
+
+
+def _aggregate(*lines):
+    aggregator = FindingAggregator()
+    for line in lines:
+        aggregator.add_line(line)
+    return aggregator
+
+
+def test_repeated_hits_collapse_into_one_finding():
+    aggregator = _aggregate(_hit(), _hit(), _hit(DecoderName="BASE64"))
+    report = aggregator.report()
+    assert (report["secrets_found"], report["raw_hits"]) == (1, 3)
+    (finding,) = report["results"]
+    assert finding["occurrences"] == 3
+    # Fields come from the first hit
+    assert "DecoderName" not in finding
+
+
+def test_fingerprint_distinguishes_secret_detector_and_location():
+    base = json.loads(_hit())
+    assert fingerprint(base) == fingerprint(json.loads(_hit()))
+    assert fingerprint(base) != fingerprint(json.loads(_hit(secret="AKIAOTHER")))
+    assert fingerprint(base) != fingerprint(json.loads(_hit(line=4)))
+    assert fingerprint(base) != fingerprint(json.loads(_hit(file="other.py")))
+    assert fingerprint(base) != fingerprint(json.loads(_hit(commit="abc", source="Git")))
+    assert fingerprint(base) != fingerprint(dict(base, DetectorName="Generic"))
+    # RawV2 takes precedence over Raw when present
+    assert fingerprint(dict(base, RawV2="AKIAEXAMPLEsecret")) != fingerprint(base)
+    # The secret never appears in the fingerprint
+    assert "AKIAEXAMPLE" not in fingerprint(base)
+
+
+def test_verified_if_any_hit_was_verified():
+    aggregator = _aggregate(
+        _hit(VerificationError="timeout"),
+        _hit(Verified=True),
+        _hit(VerificationError="timeout again"),
+        _hit(secret="other", file="b.py"),
+        _hit(secret="other", file="b.py"),
+        _hit(secret="third", file="c.py"),
+    )
+    report = aggregator.report()
+    assert report["verified"] == 1
+    # Verified findings first, then by number of occurrences
+    assert [(f["Verified"], f["occurrences"]) for f in report["results"]] == [(True, 3), (False, 2), (False, 1)]
+
+
+def test_invalid_and_blank_lines_are_counted_separately():
+    aggregator = _aggregate("", "  ", "not json", "[1, 2]", _hit())
+    assert aggregator.invalid_lines == 2
+    assert aggregator.raw_hits == 1
+    assert len(aggregator.findings) == 1
+
+
+def test_normalize_report(tmp_path):
+    report_path = tmp_path / "trufflehog.json"
+    report_path.write_text(json.dumps(_aggregate(_hit(Verified=True), _hit(secret="x", file="a.py", line=9)).report()))
+    findings = list(normalize_trufflehog_report(str(report_path)))
+    assert [(f["severity"], f["file"], f["line"]) for f in findings] == [("critical", "config.py", 3), ("high", "a.py", 9)]
+    assert all(f["fingerprint"] for f in findings)
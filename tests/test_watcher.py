@@ -0,0 +1,136 @@
+import threading
+import time
+
+import pytest
+
+from modules.watcher import RepoWatcher
+
+REPOS = [{"path": "https://example.com/api.git", "branch": "main"}, {"path": "https://example.com/web.git", "branch": "dev"}]
+API, WEB = "https://example.com/api.git@main", "https://example.com/web.git@dev"
+
+
+def _watcher(tmp_path, heads, scan=None, **kwargs):
+    """A watcher whose branch heads come from the heads dict (path -> SHA, or None when unreadable)."""
+    settings = dict(poll_interval=0.05, jitter=0, backoff_base=10, backoff_max=25, status_path=str(tmp_path / "watch.json"))
+    settings.update(kwargs)
+    return RepoWatcher(REPOS, lambda path, branch: heads.get(path), scan or (lambda repo, head: head), **settings)
+
+
+def _wait_for(condition, timeout=5):
+    deadline = time.time() + timeout
+    while not condition():
+        if time.time() > deadline:
+            raise AssertionError("Timed out waiting for the watcher")
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def running():
+    """Run a watcher in the background and stop it at the end of the test."""
+    threads = []
+
+    def start(watcher):
+        thread = threading.Thread(target=watcher.run)
+        thread.start()
+        threads.append((watcher, thread))
+        return watcher
+
+    yield start
+    for watcher, thread in threads:
+        watcher.stop()
+        thread.join(timeout=5)
+
+
+def test_only_a_moved_head_queues_a_scan(tmp_path):
+    heads = {"https://example.com/api.git": "a" * 40, "https://example.com/web.git": "b" * 40}
+    watcher = _watcher(tmp_path, heads)
+    watcher._repos[API]["scanned_commit"] = "a" * 40
+    watcher._check(API)
+    watcher._check(WEB)
+    assert watcher._queue == [WEB]
+    assert watcher._repos[API]["status"] == "idle"
+    assert watcher._repos[WEB]["status"] == "queued"
+    assert watcher._repos[WEB]["remote_commit"] == "b" * 40
+
+
+def test_repeated_polls_during_a_scan_do_not_queue_it_again(tmp_path, running):
+    heads = {"https://example.com/api.git": "a" * 40, "https://example.com/web.git": "b" * 40}
+    release, scans = threading.Event(), []
+
+    def scan(repo, head):
+        scans.append((repo["path"], head))
+        if repo["path"] == "https://example.com/api.git":
+            release.wait()
+        return head
+
+    watcher = running(_watcher(tmp_path, heads, scan, max_concurrent=2))
+    _wait_for(lambda: watcher._repos[WEB]["scans"] == 1)
+    # Several poll intervals pass while the api scan is still running
+    time.sleep(0.3)
+    assert watcher.status()["running"] == [API]
+    release.set()
+    _wait_for(lambda: watcher._repos[API]["scans"] == 1)
+    time.sleep(0.3)
+    assert sorted(scans) == [("https://example.com/api.git", "a" * 40), ("https://example.com/web.git", "b" * 40)]
+    # A push is picked up on the next check after the scan
+    heads["https://example.com/api.git"] = "c" * 40
+    _wait_for(lambda: watcher._repos[API]["scanned_commit"] == "c" * 40)
+    assert len(scans) == 3
+
+
+def test_max_concurrent_scans(tmp_path, running):
+    heads = {"https://example.com/api.git": "a" * 40, "https://example.com/web.git": "b" * 40}
+    release, started = threading.Event(), []
+
+    def scan(repo, head):
+        started.append(repo["path"])
+        release.wait()
+        return head
+
+    watcher = running(_watcher(tmp_path, heads, scan, max_concurrent=1))
+    _wait_for(lambda: started)
+    time.sleep(0.2)
+    assert len(started) == 1
+    assert len(watcher.status()["queue"]) == 1
+    release.set()
+    _wait_for(lambda: len(started) == 2)
+
+
+def test_failures_back_off_exponentially_up_to_the_cap(tmp_path):
+    watcher = _watcher(tmp_path, {})
+    delays = []
+    for _ in range(3):
+        before = time.time()
+        watcher._check(API)
+        delays.append(watcher._repos[API]["next_check"] - before)
+    state = watcher._repos[API]
+    assert (state["status"], state["failures"], state["last_error"]) == ("backoff", 3, "Could not read the branch head")
+    assert [round(delay) for delay in delays] == [10, 20, 25]
+    assert watcher._queue == []
+
+
+def test_failed_scan_backs_off_and_keeps_the_last_scanned_commit(tmp_path):
+    def scan(repo, head):
+        raise RuntimeError("clone failed")
+
+    watcher = _watcher(tmp_path, {"https://example.com/api.git": "a" * 40}, scan)
+    watcher._check(API)
+    watcher._scan(watcher._queue.pop(0))
+    state = watcher._repos[API]
+    assert state["status"] == "backoff"
+    assert state["scanned_commit"] is None
+    assert state["last_error"] == "Scan failed: clone failed"
+
+
+def test_scanned_commits_survive_a_restart(tmp_path):
+    heads = {"https://example.com/api.git": "a" * 40, "https://example.com/web.git": "b" * 40}
+    watcher = _watcher(tmp_path, heads)
+    thread = threading.Thread(target=watcher.run)
+    thread.start()
+    _wait_for(lambda: all(state["scans"] == 1 for state in watcher._repos.values()))
+    watcher.stop()
+    thread.join(timeout=5)
+    restarted = _watcher(tmp_path, heads)
+    assert restarted._repos[API]["scanned_commit"] == "a" * 40
+    restarted._check(API)
+    assert restarted._queue == []